@@ -178,6 +178,97 @@ def init(path: str):
     click.echo(f"Created new AtlasVibe project at {project_path}")
 
 
+@cli.command()
+@click.argument('flowcharts', nargs=-1, required=True, type=click.Path(exists=True))
+@click.option('--output-dir', '-o', default='outputs', type=click.Path(), help='Directory the outputs are written to')
+@click.option('--output', 'outputs', multiple=True, help='Node id or label to save (the sinks by default)')
+@click.option('--format', 'output_format', default='npz', type=click.Choice(['npz', 'json']), help='Output file format')
+@click.option('--backend', default='thread', type=click.Choice(['thread', 'process']), help='Where the blocks run')
+@click.option('--workers', default=4, help='Maximum number of concurrent blocks')
+@click.option('--project', default=None, type=click.Path(exists=True), help='Project directory with custom blocks')
+@click.option('--incremental', is_flag=True, help='Reuse the results of unchanged nodes between flowcharts')
+@click.option('--fuse', is_flag=True, help='Run the linear chains of blocks as single jobs')
+def batch(flowcharts: tuple[str, ...], output_dir: str, outputs: tuple[str, ...], output_format: str,
+          backend: str, workers: int, project: str | None, incremental: bool, fuse: bool):
+    """Run flowcharts without the server and save their outputs."""
+    from captain.services.runtime.headless import run_flowchart_files
+
+    runs = run_flowchart_files(
+        list(flowcharts),
+        output_dir,
+        outputs=list(outputs) or None,
+        output_format=output_format,
+        worker_backend=backend,
+        max_workers=workers,
+        project_path=project,
+        incremental=incremental,
+        fuse_chains=fuse,
+    )
+    for run in runs:
+        if run.succeeded:
+            click.echo(f"{run.name}: {len(run.files)} outputs written in {run.run_time:.2f}s")
+        else:
+            reason = 'timed out' if run.timed_out else ', '.join(run.errors)
+            click.echo(f"{run.name}: failed ({reason})", err=True)
+    if not all(run.succeeded for run in runs):
+        sys.exit(1)
+
+
+def parse_sweep_values(values: str) -> list:
+    """Parse comma separated values, each one as JSON or else as a string."""
+    import json
+
+    parsed = []
+    for value in values.split(','):
+        try:
+            parsed.append(json.loads(value))
+        except json.JSONDecodeError:
+            parsed.append(value)
+    return parsed
+
+
+@cli.command()
+@click.argument('flowchart', type=click.Path(exists=True))
+@click.option('--param', 'params', multiple=True, required=True, help='Swept ctrl as NODE.CTRL=V1,V2,... (node id or label)')
+@click.option('--output', 'outputs', multiple=True, help='Node id or label to collect (the sinks by default)')
+@click.option('--table', '-o', default='sweep.csv', type=click.Path(), help='Result table, .csv or .json')
+@click.option('--backend', default='process', type=click.Choice(['thread', 'process']), help='Where the blocks run')
+@click.option('--workers', default=4, help='Maximum number of concurrent blocks')
+@click.option('--parallel', default=4, help='Number of variants running at the same time')
+@click.option('--project', default=None, type=click.Path(exists=True), help='Project directory with custom blocks')
+@click.option('--fuse', is_flag=True, help='Run the linear chains of blocks as single jobs')
+def sweep(flowchart: str, params: tuple[str, ...], outputs: tuple[str, ...], table: str, backend: str,
+          workers: int, parallel: int, project: str | None, fuse: bool):
+    """Run a flowchart over every combination of the given ctrl values."""
+    import json
+    from captain.services.runtime.sweep import run_sweep
+
+    grid = {}
+    for param in params:
+        name, _, values = param.partition('=')
+        if not values:
+            raise click.BadParameter(f"expected NODE.CTRL=V1,V2,... got '{param}'", param_hint='--param')
+        grid[name] = parse_sweep_values(values)
+
+    with open(flowchart) as f:
+        result = run_sweep(
+            json.load(f),
+            grid,
+            outputs=list(outputs) or None,
+            max_parallel=parallel,
+            name=Path(flowchart).stem,
+            worker_backend=backend,
+            max_workers=workers,
+            project_path=project,
+            fuse_chains=fuse,
+        )
+    path = result.write(table)
+    failed = sum(not run.succeeded for run in result.runs)
+    click.echo(f"{len(result.runs)} variants, {failed} failed, table written to {path}")
+    if failed:
+        sys.exit(1)
+
+
 def main():
     """Main entry point."""
     cli()
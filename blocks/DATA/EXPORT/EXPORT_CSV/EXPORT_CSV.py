@@ -8,11 +8,12 @@ from atlasvibe import (
     atlasvibe,
     DataContainer,
     Directory,
+    DataStream,
 )
 from typing import Optional
 
 
-@atlasvibe
+@atlasvibe(streaming=True)
 def EXPORT_CSV(
     dc: OrderedPair | OrderedTriple | DataFrame | Matrix,
     dir: Directory,
@@ -23,7 +24,7 @@ def EXPORT_CSV(
     Parameters
     ----------
     dc : OrderedPair|OrderedTriple|DataFrame
-        The DataContainer to export.
+        The DataContainer to export. A stream is written a chunk at a time.
     dir : Directory
         The directory to export to.
     filename : str
@@ -39,20 +40,30 @@ def EXPORT_CSV(
 
     path = os.path.join(dir.unwrap(), filename)
 
+    if isinstance(dc, DataStream):
+        for i, chunk in enumerate(dc.chunks()):
+            write_csv(chunk, path, append=i > 0)
+    else:
+        write_csv(dc, path)
+
+    return None
+
+
+def write_csv(dc: DataContainer, path: str, append: bool = False):
+    # the chunks of a stream after the first one are appended without a header
+    mode = "a" if append else "w"
     match dc:
         case OrderedPair() | OrderedTriple():
             df = pd.DataFrame(dc)
             df = df.drop(columns=["type", "extra"])
-            df.to_csv(path, index=False)
+            df.to_csv(path, index=False, mode=mode, header=not append)
         case DataFrame():
             df = dc.m
-            df.to_csv(path, index=False)
+            df.to_csv(path, index=False, mode=mode, header=not append)
         case Matrix():
             df = pd.DataFrame(dc.m)
-            df.to_csv(path, index=False, header=False)
+            df.to_csv(path, index=False, header=False, mode=mode)
         case _:
             raise ValueError(
                 f"Invalid DataContainer type: {dc.type} cannot be exported as CSV."
             )
-
-    return None
@@ -1,9 +1,10 @@
+import numpy as np
 from scipy import signal
-from atlasvibe import atlasvibe, OrderedPair
+from atlasvibe import atlasvibe, OrderedPair, DataStream
 from typing import Literal
 
 
-@atlasvibe
+@atlasvibe(streaming=True)
 def BUTTER(
     default: OrderedPair,
     filter_order: int = 1,
@@ -18,7 +19,7 @@ def BUTTER(
     Inputs
     ------
     default : OrderedPair
-        The data to apply the butter filter to.
+        The data to apply the butter filter to, or a stream of chunks of it.
 
     Parameters
     ----------
@@ -39,14 +40,25 @@ def BUTTER(
         y: filtered signal
     """
 
-    sig = default.y
     order: int = filter_order
     wn: int = critical_frequency  # hz
     btype: str = btype
     fs: int = sample_rate  # hz
 
     sos = signal.butter(N=order, Wn=wn, btype=btype, fs=fs, output="sos")
+    if isinstance(default, DataStream):
+        return DataStream(filter_chunks, default, sos)
     #    sos = signal.butter(10, 15, "hp", fs=1000, output="sos")
+    sig = default.y
     filtered = signal.sosfilt(sos, sig)
 
     return OrderedPair(x=default.x, y=filtered)
+
+
+def filter_chunks(stream: DataStream, sos: np.ndarray):
+    # the state of the filter is carried from a chunk to the next, the output is
+    # the same as filtering the whole signal at once
+    zi = np.zeros((sos.shape[0], 2))
+    for chunk in stream.chunks():
+        filtered, zi = signal.sosfilt(sos, chunk.y, zi=zi)
+        yield OrderedPair(x=chunk.x, y=filtered)
@@ -1,10 +1,11 @@
-from atlasvibe import atlasvibe, DataFrame
+from atlasvibe import atlasvibe, DataFrame, DataStream
 import pandas as pd
 
 
-@atlasvibe
+@atlasvibe(streaming=True)
 def READ_CSV(
     file_path: str = "https://raw.githubusercontent.com/cs109/2014_data/master/countries.csv",
+    chunk_size: int = 0,
 ) -> DataFrame:
     """Read a .csv file from disk or a URL, and then return it as a dataframe.
 
@@ -12,6 +13,9 @@ def READ_CSV(
     ----------
     file_path : str
         File path to the .csv file or an URL of a .csv file.
+    chunk_size : int
+        Rows read at a time. If greater than 0, the file is streamed to the
+        next blocks in dataframes of that many rows instead of being loaded at once.
 
     Returns
     -------
@@ -19,5 +23,13 @@ def READ_CSV(
         DataFrame loaded from .csv file
     """
 
+    if chunk_size > 0:
+        return DataStream(read_chunks, file_path, chunk_size)
     df = pd.read_csv(file_path)  # type: ignore
     return DataFrame(df=df)
+
+
+def read_chunks(file_path: str, chunk_size: int):
+    with pd.read_csv(file_path, chunksize=chunk_size) as reader:  # type: ignore
+        for chunk in reader:
+            yield DataFrame(df=chunk)
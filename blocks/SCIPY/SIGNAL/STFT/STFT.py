@@ -1,11 +1,11 @@
-from atlasvibe import OrderedPair, atlasvibe, Matrix, Scalar
+from atlasvibe import OrderedPair, atlasvibe, Matrix, Scalar, DataStream
 import numpy as np
-from typing import Literal
+from typing import Any, Literal
 
 import scipy.signal
 
 
-@atlasvibe
+@atlasvibe(streaming=True)
 def STFT(
     default: OrderedPair | Matrix,
     fs: float = 1.0,
@@ -29,6 +29,14 @@ def STFT(
 
         STFTs can be used as a way of quantifying the change of a nonstationary signal's frequency and phase content over time.
 
+    Inputs
+    ------
+    default : OrderedPair | Matrix
+        The signal, or a stream of chunks of it. For a stream, 't' and 'Zxx'
+        are streamed too, one row per segment ('Zxx' transposed), with the
+        times of the segments as x. With a boundary other than 'zeros' or
+        None, or for 'f', the stream is collected first.
+
     Parameters
     ----------
     select_return : 'f', 't', 'Zxx'
@@ -102,6 +110,27 @@ def STFT(
         type 'ordered pair', 'scalar', or 'matrix'
     """
 
+    if isinstance(default, DataStream):
+        if select_return != "f" and boundary in ("zeros", None):
+            return DataStream(
+                stft_chunks,
+                default,
+                select_return,
+                boundary,
+                padded,
+                fs=fs,
+                window=window,
+                nperseg=nperseg,
+                noverlap=noverlap,
+                nfft=nfft,
+                detrend=detrend,
+                return_onesided=return_onesided,
+                scaling=scaling,
+            )
+        # the other boundaries extend the signal with its last samples, and
+        # the frequencies don't depend on the signal
+        default = default.collect()
+
     result = scipy.signal.stft(
         x=default.y,
         fs=fs,
@@ -137,3 +166,68 @@ def STFT(
         result = Scalar(c=float(result))
 
     return result
+
+
+def stft_chunks(
+    stream: DataStream,
+    select_return: str,
+    boundary: str | None,
+    padded: bool,
+    **kwargs: Any,
+):
+    # the segments are cut across the chunks, the samples of the segments not
+    # complete yet (at least the `noverlap` shared with the next one) are
+    # carried to the next chunk, so the output is the same as the STFT of the
+    # whole signal
+    nperseg = kwargs["nperseg"]
+    step = nperseg - kwargs["noverlap"]
+    if step <= 0:
+        raise ValueError("noverlap must be less than nperseg.")
+    edge = nperseg // 2 if boundary == "zeros" else 0
+    # scipy counts the times from the first sample of the signal
+    shift = nperseg / 2 if boundary is not None else 0
+    carry: np.ndarray | None = None
+    done = 0  # samples of the extended signal before `carry`
+    for chunk in stream.chunks():
+        if carry is None:
+            carry = np.concatenate([np.zeros(edge, dtype=chunk.y.dtype), chunk.y])
+        else:
+            carry = np.concatenate([carry, chunk.y])
+        count = segment_count(len(carry), nperseg, step)
+        if count:
+            yield stft_segments(carry, count, done - shift, select_return, **kwargs)
+            carry = carry[count * step :]
+            done += count * step
+    if carry is None:
+        return
+    carry = np.concatenate([carry, np.zeros(edge, dtype=carry.dtype)])
+    if padded:
+        # zeros up to the end of the last segment, as scipy pads
+        missing = (-(done + len(carry) - nperseg) % step) % nperseg
+        carry = np.concatenate([carry, np.zeros(missing, dtype=carry.dtype)])
+    count = segment_count(len(carry), nperseg, step)
+    if count:
+        yield stft_segments(carry, count, done - shift, select_return, **kwargs)
+
+
+def segment_count(length: int, nperseg: int, step: int) -> int:
+    return (length - nperseg) // step + 1 if length >= nperseg else 0
+
+
+def stft_segments(
+    samples: np.ndarray,
+    count: int,
+    start: float,  # position of the first sample, in samples
+    select_return: str,
+    **kwargs: Any,
+) -> OrderedPair:
+    nperseg = kwargs["nperseg"]
+    step = nperseg - kwargs["noverlap"]
+    _, t, zxx = scipy.signal.stft(
+        samples[: (count - 1) * step + nperseg],
+        boundary=None,
+        padded=False,
+        **kwargs,
+    )
+    t = t + start / kwargs["fs"]
+    return OrderedPair(x=t, y=t if select_return == "t" else zxx.T)
@@ -10,3 +10,36 @@ def test_STFT(mock_atlasvibe_decorator):
 
     # check that the outputs are one of the correct types.
     assert isinstance(res, Scalar | OrderedPair | Matrix)
+
+
+def test_STFT_stream(mock_atlasvibe_decorator):
+    import STFT
+    from atlasvibe import DataStream
+
+    x = np.arange(1000) / 100
+    y = np.sin(2 * np.pi * 3 * x) + np.random.default_rng(0).normal(size=1000)
+    bounds = [0, 7, 100, 433, 434, 900, 1000]
+
+    def chunks():
+        for start, end in zip(bounds, bounds[1:]):
+            yield OrderedPair(x=x[start:end], y=y[start:end])
+
+    for boundary, padded in [("zeros", True), ("zeros", False), (None, True)]:
+        params = dict(
+            fs=100.0, nperseg=64, noverlap=40, nfft=64, boundary=boundary, padded=padded
+        )
+        whole = OrderedPair(x=x, y=y)
+        stream = DataStream(chunks)
+        for select_return in ["t", "Zxx"]:
+            once = STFT.STFT(default=whole, select_return=select_return, **params)
+            streamed = STFT.STFT(default=stream, select_return=select_return, **params)
+            assert isinstance(streamed, DataStream)
+            parts = [chunk.y for chunk in streamed.chunks()]
+            if select_return == "Zxx":
+                np.testing.assert_allclose(np.concatenate(parts).T, once.y, atol=1e-12)
+            else:
+                np.testing.assert_allclose(np.concatenate(parts), once.y)
+
+    # the frequencies don't depend on the signal, the stream is collected
+    f = STFT.STFT(default=DataStream(chunks), select_return="f", nperseg=64, nfft=64)
+    assert isinstance(f, OrderedPair) and len(f.y) == 33
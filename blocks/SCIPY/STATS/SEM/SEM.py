@@ -1,10 +1,10 @@
-from atlasvibe import OrderedPair, atlasvibe, Matrix, Scalar
+from atlasvibe import OrderedPair, atlasvibe, Matrix, Scalar, DataStream
 import numpy as np
 
 import scipy.stats
 
 
-@atlasvibe
+@atlasvibe(streaming=True)
 def SEM(
     default: OrderedPair | Matrix,
     axis: int = 0,
@@ -44,6 +44,12 @@ def SEM(
         type 'ordered pair', 'scalar', or 'matrix'
     """
 
+    if isinstance(default, DataStream):
+        # a stream is reduced a chunk at a time over all its values
+        if axis == 0:
+            return Scalar(c=stream_sem(default, ddof, nan_policy))
+        default = default.collect()
+
     result = scipy.stats.sem(
         a=default.y,
         axis=axis,
@@ -60,3 +66,29 @@ def SEM(
         result = Scalar(c=float(result))
 
     return result
+
+
+def stream_sem(stream: DataStream, ddof: int, nan_policy: str) -> float:
+    # count, mean and sum of squared deviations of the chunks read so far,
+    # merged with those of every chunk (Chan et al.)
+    count, mean, m2 = 0, 0.0, 0.0
+    for chunk in stream.chunks():
+        y = np.ravel(chunk.y).astype(float)
+        nans = np.isnan(y)
+        if nans.any():
+            if nan_policy == "raise":
+                raise ValueError("The input contains nan values")
+            if nan_policy == "omit":
+                y = y[~nans]
+        if not y.size:
+            continue
+        chunk_mean = float(np.mean(y))
+        chunk_m2 = float(np.sum((y - chunk_mean) ** 2))
+        total = count + y.size
+        delta = chunk_mean - mean
+        mean += delta * y.size / total
+        m2 += chunk_m2 + delta**2 * count * y.size / total
+        count = total
+    if count - ddof <= 0:
+        return float("nan")
+    return float(np.sqrt(m2 / (count - ddof) / count))
@@ -1,10 +1,10 @@
-from atlasvibe import OrderedPair, atlasvibe, Matrix, Scalar
+from atlasvibe import OrderedPair, atlasvibe, Matrix, Scalar, DataStream
 import numpy as np
 
 import scipy.stats
 
 
-@atlasvibe
+@atlasvibe(streaming=True)
 def TMAX(
     default: OrderedPair | Matrix,
     upperlimit: float = 0.1,
@@ -48,6 +48,12 @@ def TMAX(
         type 'ordered pair', 'scalar', or 'matrix'
     """
 
+    if isinstance(default, DataStream):
+        # a stream is reduced a chunk at a time over all its values
+        if axis == 0:
+            return Scalar(c=stream_tmax(default, upperlimit, inclusive, nan_policy))
+        default = default.collect()
+
     result = scipy.stats.tmax(
         a=default.y,
         upperlimit=upperlimit,
@@ -65,3 +71,21 @@ def TMAX(
         result = Scalar(c=float(result))
 
     return result
+
+
+def stream_tmax(
+    stream: DataStream, upperlimit: float, inclusive: bool, nan_policy: str
+) -> float:
+    # the trimmed maximum of the whole data is the largest one of the chunks
+    maximums: list[float] = []
+    for chunk in stream.chunks():
+        y = np.ravel(chunk.y)
+        trimmed = y > upperlimit if inclusive else y >= upperlimit
+        kept = y[~trimmed]
+        if kept.size:
+            maximums.append(
+                float(scipy.stats.tmax(kept, None, axis=None, nan_policy=nan_policy))
+            )
+    if not maximums:
+        raise ValueError("No array values within given limits")
+    return float(np.nanmax(maximums) if nan_policy == "omit" else np.max(maximums))
@@ -1,10 +1,10 @@
-from atlasvibe import OrderedPair, atlasvibe, Matrix, Scalar
+from atlasvibe import OrderedPair, atlasvibe, Matrix, Scalar, DataStream
 import numpy as np
 
 import scipy.stats
 
 
-@atlasvibe
+@atlasvibe(streaming=True)
 def TMIN(
     default: OrderedPair | Matrix,
     lowerlimit: float = 0.1,
@@ -48,6 +48,12 @@ def TMIN(
         type 'ordered pair', 'scalar', or 'matrix'
     """
 
+    if isinstance(default, DataStream):
+        # a stream is reduced a chunk at a time over all its values
+        if axis == 0:
+            return Scalar(c=stream_tmin(default, lowerlimit, inclusive, nan_policy))
+        default = default.collect()
+
     result = scipy.stats.tmin(
         a=default.y,
         lowerlimit=lowerlimit,
@@ -65,3 +71,21 @@ def TMIN(
         result = Scalar(c=float(result))
 
     return result
+
+
+def stream_tmin(
+    stream: DataStream, lowerlimit: float, inclusive: bool, nan_policy: str
+) -> float:
+    # the trimmed minimum of the whole data is the smallest one of the chunks
+    minimums: list[float] = []
+    for chunk in stream.chunks():
+        y = np.ravel(chunk.y)
+        trimmed = y < lowerlimit if inclusive else y <= lowerlimit
+        kept = y[~trimmed]
+        if kept.size:
+            minimums.append(
+                float(scipy.stats.tmin(kept, None, axis=None, nan_policy=nan_policy))
+            )
+    if not minimums:
+        raise ValueError("No array values within given limits")
+    return float(np.nanmin(minimums) if nan_policy == "omit" else np.min(minimums))
@@ -0,0 +1,164 @@
+import argparse
+import asyncio
+import time
+from queue import Queue
+from threading import Thread
+from typing import Any, cast
+
+import networkx as nx
+from pkgs.atlasvibe.atlasvibe import JobService, JobSuccess  # noqa: F401
+
+from captain.models.job_queue import JobPriorityQueue
+from captain.models.topology import Topology
+from captain.services.consumer.worker import Worker
+from captain.services.producer.producer import Producer
+from captain.services.runtime.asyncio_runtime import AsyncRuntime
+from captain.types.worker import PoisonPill
+
+"""
+Measures the dispatch latency between dependent nodes.
+
+Runs a chain of blocks that return immediately with the thread runtime (worker
+and producer threads) and with the asyncio runtime, so the time per node is the
+time spent handing a finished job over to its successor. Signals to the
+front-end are simulated by a signaler sleeping `--signal-latency` ms. The
+asyncio runtime runs once with the blocks in its thread pool and once with the
+blocks known to be quick, running them on the event loop.
+
+    python -m captain.benchmarks.dispatch_latency_bench --chain 500
+"""
+
+
+class SleepingSignaler:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def send(self, *args: Any):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    signal_current_running_node = send
+    signal_node_results = send
+    signal_failed_nodes = send
+    signal_standby = send
+    signal_run_profile = send
+
+
+def block(node_id: str, jobset_id: str, **kwargs: Any):
+    return JobSuccess(result=None, fn=node_id, node_id=node_id, jobset_id=jobset_id)
+
+
+def build_chain(length: int) -> nx.MultiDiGraph:
+    graph = nx.MultiDiGraph()
+    for i in range(length):
+        graph.add_node(f"N{i}", cmd="ADD", label=f"N{i}", ctrls={})
+        if i:
+            graph.add_edge(
+                f"N{i - 1}", f"N{i}", label="default", target_label="default"
+            )
+    return graph
+
+
+def record_finish(topology: Topology) -> dict[str, float]:
+    """
+    Records when the topology processed the last response.
+    """
+    finish: dict[str, float] = {}
+    process_worker_response = topology.process_worker_response
+
+    def process_and_record(response: Any):
+        new_jobs = process_worker_response(response)
+        if new_jobs is None:
+            finish["at"] = time.perf_counter()
+        return new_jobs
+
+    setattr(topology, "process_worker_response", process_and_record)
+    return finish
+
+
+def make_worker(
+    graph: nx.MultiDiGraph, task_queue: Queue[Any], finish_queue: Queue[Any]
+):
+    return Worker(
+        task_queue=task_queue,
+        finish_queue=finish_queue,
+        imported_functions={job_id: block for job_id in graph.nodes},
+        observe_blocks=[],
+    )
+
+
+def run_threads(graph: nx.MultiDiGraph, signal_latency: float) -> float:
+    topology = Topology(graph, jobset_id="bench")
+    finish = record_finish(topology)
+    task_queue: Queue[Any] = JobPriorityQueue()
+    finish_queue: Queue[Any] = Queue()
+    signaler = cast(Any, SleepingSignaler(signal_latency))
+    worker = make_worker(graph, task_queue, finish_queue)
+    worker.signaler = signaler
+    producer = Producer(
+        task_queue,
+        finish_queue,
+        topology.process_worker_response,
+        topology.run_job,
+        topology.run,
+        signaler,
+    )
+    start = time.perf_counter()
+    threads = [
+        Thread(target=lambda: asyncio.run(worker.run()), daemon=True),
+        Thread(target=lambda: asyncio.run(producer.run()), daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
+    while "at" not in finish:
+        time.sleep(0.001)
+    task_queue.put(PoisonPill())
+    finish_queue.put(PoisonPill())
+    for thread in threads:
+        thread.join()
+    return finish["at"] - start
+
+
+def run_asyncio(
+    graph: nx.MultiDiGraph, signal_latency: float, inline: bool = False
+) -> float:
+    topology = Topology(graph, jobset_id="bench")
+    finish = record_finish(topology)
+    worker = make_worker(graph, Queue(), Queue())
+    runtime = AsyncRuntime(
+        topology,
+        worker,
+        1,
+        cast(Any, SleepingSignaler(signal_latency)),
+        block_durations={"ADD": 0.0} if inline else None,
+    )
+
+    start = time.perf_counter()
+    asyncio.run(runtime.run())
+    return finish["at"] - start
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Dispatch latency of the thread and asyncio runtimes"
+    )
+    parser.add_argument("--chain", type=int, default=500, help="blocks in the chain")
+    parser.add_argument(
+        "--signal-latency",
+        type=float,
+        default=0.5,
+        help="simulated time to send a signal to the front-end, in ms",
+    )
+    args = parser.parse_args()
+    graph = build_chain(args.chain)
+    signal_latency = args.signal_latency / 1000
+    for name, elapsed in [
+        ("threads", run_threads(graph, signal_latency)),
+        ("asyncio", run_asyncio(graph, signal_latency)),
+        ("asyncio (inline)", run_asyncio(graph, signal_latency, inline=True)),
+    ]:
+        print(f"{name + ':':<18} {elapsed / args.chain * 1e6:.1f} us per node")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import argparse
+import asyncio
+import statistics
+import time
+from queue import Queue
+from threading import Event, Thread
+from typing import Any
+
+import networkx as nx
+from pkgs.atlasvibe.atlasvibe import JobService, JobSuccess  # noqa: F401
+
+from captain.internal.manager import Manager
+from captain.models.job_queue import JobPriorityQueue
+from captain.models.topology import Topology
+from captain.services.consumer.block_process_pool import BlockProcessPool, _warm_up
+from captain.services.consumer.worker import Worker
+from captain.services.producer.producer import Producer
+from captain.types.worker import PoisonPill
+from captain.utils.flowchart_utils import prewarm_manager, spawn_producer, spawn_workers
+
+"""
+Measures the time to first node of short flowcharts run back to back.
+
+"spawned" starts new worker and producer threads (each with its own event loop)
+for every run and stops them with poison pills at the end, as the server used
+to. "pooled" goes through the `Manager`, whose worker pool and run pool are
+started once (`prewarm_manager`) and serve every run. The time to first node is
+measured from the start of the run to the start of its first block.
+
+With `--processes`, also measures the first job sent to a new block process
+pool against one started with `BlockProcessPool.warm_up`.
+
+    python -m captain.benchmarks.first_node_latency_bench --runs 200
+"""
+
+
+def build_graph(width: int) -> nx.MultiDiGraph:
+    graph = nx.MultiDiGraph()
+    graph.add_node("SOURCE", cmd="CONSTANT", label="SOURCE", ctrls={})
+    for i in range(width):
+        graph.add_node(f"N{i}", cmd="ADD", label=f"N{i}", ctrls={})
+        graph.add_edge("SOURCE", f"N{i}", label="default", target_label="default")
+    return graph
+
+
+class FirstNode:
+    def __init__(self):
+        self.started_at = 0.0
+        self.event = Event()
+
+    def block(self, node_id: str, jobset_id: str, **kwargs: Any):
+        if not self.event.is_set():
+            self.started_at = time.perf_counter()
+            self.event.set()
+        return JobSuccess(result=None, fn=node_id, node_id=node_id, jobset_id=jobset_id)
+
+
+def run_spawned(graph: nx.MultiDiGraph, workers: int) -> float:
+    first = FirstNode()
+    done = Event()
+    start = time.perf_counter()
+    topology = Topology(graph, jobset_id="bench")
+    task_queue: Queue[Any] = JobPriorityQueue()
+    finish_queue: Queue[Any] = Queue()
+    worker = Worker(
+        task_queue=task_queue,
+        finish_queue=finish_queue,
+        imported_functions={job_id: first.block for job_id in graph.nodes},
+        observe_blocks=[],
+    )
+    producer = Producer(
+        task_queue,
+        finish_queue,
+        topology.process_worker_response,
+        topology.run_job,
+        topology.run,
+        on_done=lambda _: done.set(),
+    )
+    threads = [
+        Thread(target=lambda: asyncio.run(worker.run()), daemon=True)
+        for _ in range(workers)
+    ]
+    threads.append(Thread(target=lambda: asyncio.run(producer.run()), daemon=True))
+    for thread in threads:
+        thread.start()
+    first.event.wait()
+    done.wait()
+    for _ in range(workers):
+        task_queue.put(PoisonPill())
+    finish_queue.put(PoisonPill())
+    for thread in threads:
+        thread.join()
+    return first.started_at - start
+
+
+def run_pooled(manager: Manager, graph: nx.MultiDiGraph, workers: int) -> float:
+    first = FirstNode()
+    start = time.perf_counter()
+    run = manager.start_run("bench", Topology(graph, jobset_id="bench"))
+    funcs = {job_id: first.block for job_id in graph.nodes}
+    spawn_workers(manager, run, funcs, [], 0, workers)
+    spawn_producer(manager, run)
+    first.event.wait()
+    while manager.get_run("bench") is run:
+        time.sleep(0.0001)
+    return first.started_at - start
+
+
+def first_process_job(pool: BlockProcessPool) -> float:
+    start = time.perf_counter()
+    pool.executor.submit(_warm_up, [], None).result()
+    return time.perf_counter() - start
+
+
+def summary(latencies: list[float]) -> str:
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    return f"median {statistics.median(latencies) * 1e6:.0f} us, p95 {p95 * 1e6:.0f} us"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time to first node with spawned and pooled threads"
+    )
+    parser.add_argument("--runs", type=int, default=200, help="runs back to back")
+    parser.add_argument("--width", type=int, default=4, help="blocks after the source")
+    parser.add_argument("--workers", type=int, default=4, help="worker threads")
+    parser.add_argument(
+        "--processes", type=int, default=0, help="size of the block process pool"
+    )
+    args = parser.parse_args()
+    graph = build_graph(args.width)
+
+    spawned = [run_spawned(graph, args.workers) for _ in range(args.runs)]
+    manager = Manager()
+    prewarm_manager(manager, args.workers)
+    pooled = [run_pooled(manager, graph, args.workers) for _ in range(args.runs)]
+    print(f"{'spawned:':<9} {summary(spawned)}")
+    print(f"{'pooled:':<9} {summary(pooled)}")
+
+    if args.processes:
+        pool = BlockProcessPool(args.processes)
+        cold = first_process_job(pool)
+        pool.shutdown()
+        pool = BlockProcessPool(args.processes)
+        pool.warm_up([])
+        warm = first_process_job(pool)
+        pool.shutdown()
+        print(f"first process job: {cold * 1e3:.0f} ms cold, {warm * 1e3:.1f} ms warm")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import argparse
+import statistics
+import time
+
+import networkx as nx
+import numpy as np
+from pkgs.atlasvibe.atlasvibe import Vector, atlasvibe
+
+from captain.services.runtime.headless import HeadlessRunner, PreparedFlowchart
+
+"""
+Measures the time per node of a long chain of arithmetic blocks, run with and
+without fusing the chain (`HeadlessRunner(fuse_chains=True)`).
+
+Unfused, every block is a job of its own: queued, picked by a worker, fetching
+its input from the job store and posting its result there. Fused, the chain
+but its observed sink runs as one job and each block gets the output of the
+previous one directly. The arrays are small so the time measured is the
+overhead per node rather than the arithmetic.
+
+    python -m captain.benchmarks.fused_chain_bench --chain 200 --runs 20
+"""
+
+
+@atlasvibe
+def SOURCE(size: int = 100) -> Vector:
+    return Vector(v=np.arange(float(size)))
+
+
+@atlasvibe
+def SCALE(default: Vector, factor: float = 1.0) -> Vector:
+    return Vector(v=default.v * factor)
+
+
+def prepare_chain(length: int, size: int) -> PreparedFlowchart:
+    graph = nx.MultiDiGraph()
+    size_ctrl = {"size": {"param": "size", "value": size, "type": "int"}}
+    graph.add_node("N0", cmd="SOURCE", label="N0", ctrls=size_ctrl)
+    for i in range(1, length):
+        factor = {"factor": {"param": "factor", "value": 1.001, "type": "float"}}
+        graph.add_node(f"N{i}", cmd="SCALE", label=f"N{i}", ctrls=factor)
+        graph.add_edge(
+            f"N{i - 1}",
+            f"N{i}",
+            label="default",
+            target_label="default",
+            multiple=False,
+        )
+    prepared = PreparedFlowchart("chain", graph, [f"N{length - 1}"])
+    prepared.functions = {
+        node_id: SOURCE if cmd == "SOURCE" else SCALE
+        for node_id, cmd in graph.nodes(data="cmd")
+    }
+    return prepared
+
+
+def time_runs(runner: HeadlessRunner, prepared: PreparedFlowchart, runs: int):
+    times: list[float] = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        run = runner.run_prepared(prepared)
+        times.append(time.perf_counter() - start)
+        assert run.succeeded, run.errors
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time per node of a chain with and without fusion"
+    )
+    parser.add_argument("--chain", type=int, default=200, help="blocks in the chain")
+    parser.add_argument("--size", type=int, default=100, help="length of the arrays")
+    parser.add_argument("--runs", type=int, default=20, help="runs of each mode")
+    parser.add_argument(
+        "--backend", default="thread", choices=["thread", "process"], help="backend"
+    )
+    args = parser.parse_args()
+    prepared = prepare_chain(args.chain, args.size)
+
+    for fuse_chains in [False, True]:
+        runner = HeadlessRunner(
+            worker_backend=args.backend, max_workers=1, fuse_chains=fuse_chains
+        )
+        time_runs(runner, prepared, 1)  # warm up
+        median = time_runs(runner, prepared, args.runs)
+        runner.close()
+        name = "fused:" if fuse_chains else "unfused:"
+        print(
+            f"{name:<9} {median * 1e3:.2f} ms per run, "
+            f"{median / args.chain * 1e6:.1f} us per node"
+        )
+
+
+if __name__ == "__main__":
+    main()
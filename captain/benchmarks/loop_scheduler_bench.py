@@ -0,0 +1,131 @@
+import argparse
+import time
+from collections import deque
+from queue import Queue
+
+import networkx as nx
+from pkgs.atlasvibe.atlasvibe import JobSuccess
+
+from captain.models.topology import Topology
+
+"""
+Measures the scheduler overhead of loop iterations.
+
+Builds a flowchart with an outer LOOP whose body holds an inner LOOP, the inner
+body being a chain of blocks ending with a BREAK. Blocks are not executed, the
+benchmark plays the results of the LOOP and BREAK blocks back to the topology
+so only the time spent scheduling is measured.
+
+    python -m captain.benchmarks.loop_scheduler_bench --outer 10 --inner 1000
+"""
+
+FLOW_TO_DIRECTIONS = "__flow_to_directions__"
+
+
+def add_block(graph: nx.MultiDiGraph, node_id: str, cmd: str):
+    graph.add_node(node_id, cmd=cmd, label=node_id, ctrls={})
+
+
+def add_edge(graph: nx.MultiDiGraph, source: str, target: str, label: str = "default"):
+    graph.add_edge(source, target, label=label, target_label="default")
+
+
+def build_nested_loops(body_size: int) -> nx.MultiDiGraph:
+    graph = nx.MultiDiGraph()
+    for node_id, cmd in [
+        ("START", "CONSTANT"),
+        ("OUTER", "LOOP"),
+        ("INNER", "LOOP"),
+        ("BREAK", "BREAK"),
+        ("INNER_END", "ADD"),
+        ("END", "ADD"),
+    ]:
+        add_block(graph, node_id, cmd)
+    add_edge(graph, "START", "OUTER")
+    add_edge(graph, "OUTER", "INNER", "body")
+    add_edge(graph, "OUTER", "END", "end")
+    previous = "INNER"
+    label = "body"
+    for i in range(body_size):
+        node_id = f"BODY_{i}"
+        add_block(graph, node_id, "ADD")
+        add_edge(graph, previous, node_id, label)
+        previous, label = node_id, "default"
+    add_edge(graph, previous, "BREAK")
+    add_edge(graph, "INNER", "INNER_END", "end")
+    return graph
+
+
+def run(outer: int, inner: int, break_at: int, body_size: int):
+    graph = build_nested_loops(body_size)
+    build_start = time.perf_counter()
+    topology = Topology(graph, jobset_id="bench")
+    build_time = time.perf_counter() - build_start
+
+    iterations = {"OUTER": 0, "INNER": 0}
+    loop_limits = {"OUTER": outer, "INNER": inner}
+    broken = False
+
+    def get_result(job_id: str):
+        nonlocal broken
+        if job_id in iterations:
+            iterations[job_id] += 1
+            finished = iterations[job_id] > loop_limits[job_id]
+            if job_id == "INNER" and broken:
+                finished, broken = True, False
+            if finished:
+                iterations[job_id] = 0
+            return {FLOW_TO_DIRECTIONS: ["end" if finished else "body"]}
+        if job_id == "BREAK" and break_at and iterations["INNER"] >= break_at:
+            broken = True
+        return None
+
+    task_queue: Queue[object] = Queue()
+    pending: deque[str] = deque()
+    jobs = 0
+    inner_iterations = 0
+    start = time.perf_counter()
+    topology.run(task_queue)
+    while not task_queue.empty():
+        pending.append(task_queue.get().job_id)
+    while pending and not topology.is_finished():
+        job_id = pending.popleft()
+        jobs += 1
+        if job_id == "INNER":
+            inner_iterations += 1
+        response = JobSuccess(
+            result=get_result(job_id), fn=job_id, node_id=job_id, jobset_id="bench"
+        )
+        for next_job in topology.process_worker_response(response) or []:
+            topology.run_job(next_job, task_queue)
+            pending.append(task_queue.get().job_id)
+    elapsed = time.perf_counter() - start
+
+    print(f"body size:          {body_size} blocks")
+    print(f"topology build:     {build_time * 1e3:.2f} ms")
+    print(f"jobs scheduled:     {jobs}")
+    print(f"inner iterations:   {inner_iterations}")
+    print(f"total:              {elapsed:.3f} s")
+    print(f"per job:            {elapsed / max(jobs, 1) * 1e6:.1f} us")
+    print(f"per inner iteration: {elapsed / max(inner_iterations, 1) * 1e6:.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Scheduler overhead of nested LOOP/BREAK flowcharts"
+    )
+    parser.add_argument("--outer", type=int, default=10, help="outer loop count")
+    parser.add_argument("--inner", type=int, default=1000, help="inner loop count")
+    parser.add_argument(
+        "--break-at",
+        type=int,
+        default=0,
+        help="inner iteration at which BREAK ends the inner loop (0: never)",
+    )
+    parser.add_argument("--body", type=int, default=50, help="blocks in the body")
+    args = parser.parse_args()
+    run(args.outer, args.inner, args.break_at, args.body)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+import argparse
+import multiprocessing
+import resource
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from captain.services.runtime.headless import HeadlessRunner
+
+"""
+Measures the peak memory of copying a generated CSV file through the
+READ_CSV -> EXPORT_CSV blocks, the file read at once and then streamed in
+chunks (the `chunk_size` of READ_CSV). Each mode runs in a fresh process whose
+resident memory is sampled (Linux only): loaded at once its peak grows with the
+file, streamed it stays about the size of a few chunks (see `--buffer`).
+
+    python -m captain.benchmarks.streaming_bench --rows 2000000 --chunk-size 50000
+"""
+
+
+def make_node(node_id: str, func: str, ctrls: dict[str, Any], inputs: list[str]):
+    return {
+        "id": node_id,
+        "position": {"x": 0, "y": 0},
+        "data": {
+            "func": func,
+            "label": node_id,
+            "ctrls": {
+                name: {"param": name, "value": value, "type": value_type}
+                for name, (value, value_type) in ctrls.items()
+            },
+            "inputs": [
+                {"id": name, "name": name, "multiple": False} for name in inputs
+            ],
+        },
+    }
+
+
+def make_flowchart(source: Path, chunk_size: int) -> dict[str, Any]:
+    read = make_node(
+        "READ",
+        "READ_CSV",
+        {"file_path": (str(source), "str"), "chunk_size": (chunk_size, "int")},
+        [],
+    )
+    export = make_node(
+        "EXPORT",
+        "EXPORT_CSV",
+        {"dir": (str(source.parent), "Directory"), "filename": ("copy.csv", "str")},
+        ["dc"],
+    )
+    edge = {
+        "id": "READ->EXPORT",
+        "source": "READ",
+        "target": "EXPORT",
+        "sourceHandle": "default",
+        "targetHandle": "dc",
+    }
+    return {"nodes": [read, export], "edges": [edge]}
+
+
+def resident_memory() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * resource.getpagesize()
+
+
+def measure(source: Path, chunk_size: int, buffer: int) -> tuple[float, float]:
+    """
+    Copies the file in this process, returns the increase of the peak resident
+    memory in MiB and the time taken in seconds.
+    """
+    runner = HeadlessRunner(stream_buffer=buffer)
+    warm_up = source.with_name("warm_up.csv")
+    pd.DataFrame({"index": np.arange(10)}).to_csv(warm_up, index=False)
+    runner.run(make_flowchart(warm_up, chunk_size), ["EXPORT"])  # imports the blocks
+    flowchart = make_flowchart(source, chunk_size)
+
+    before = resident_memory()
+    peak = before
+    done = threading.Event()
+
+    def sample():
+        nonlocal peak
+        while not done.wait(0.002):
+            peak = max(peak, resident_memory())
+
+    sampler = threading.Thread(target=sample)
+    sampler.start()
+    start = time.perf_counter()
+    run = runner.run(flowchart, ["EXPORT"])
+    elapsed = time.perf_counter() - start
+    done.set()
+    sampler.join()
+    runner.close()
+    assert run.succeeded, run.errors
+    return (peak - before) / 2**20, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Peak memory of a CSV copy, loaded at once and streamed"
+    )
+    parser.add_argument("--rows", type=int, default=2_000_000, help="rows of the file")
+    parser.add_argument(
+        "--chunk-size", type=int, default=50_000, help="rows of a streamed chunk"
+    )
+    parser.add_argument(
+        "--buffer", type=int, default=4, help="chunks read ahead between blocks"
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        source = Path(directory) / "source.csv"
+        rng = np.random.default_rng(0)
+        pd.DataFrame(
+            {
+                "index": np.arange(args.rows),
+                "a": rng.random(args.rows),
+                "b": rng.random(args.rows),
+            }
+        ).to_csv(source, index=False)
+        print(f"file: {source.stat().st_size / 2**20:.1f} MiB")
+
+        context = multiprocessing.get_context("spawn")
+        for chunk_size in [0, args.chunk_size]:
+            with ProcessPoolExecutor(1, mp_context=context) as executor:
+                peak, elapsed = executor.submit(
+                    measure, source, chunk_size, args.buffer
+                ).result()
+            name = "streamed:" if chunk_size else "at once:"
+            print(f"{name:<9} +{peak:.1f} MiB peak, {elapsed:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,23 @@
 import asyncio
 import threading
 import time
-
-from queue import Queue
 from typing import Any
 
 from captain.internal.wsmanager import ConnectionManager
+from captain.models.job_queue import (
+    RESULT_QUEUE_SIZE,
+    TASK_QUEUE_SIZE,
+    BoundedQueue,
+    FairJobQueue,
+    QueueStats,
+)
+from captain.models.result_cache import ResultCache
+from captain.models.run_profile import RunProfiler
 from captain.models.test_sequencer import MsgState, StatusTypes
 from captain.models.topology import Topology
+from captain.services.consumer.block_process_pool import BlockProcessPool
 from captain.services.consumer.blocks_watcher import BlocksWatcher
+from captain.services.runtime.run_pool import RunPool
 from captain.types.test_sequence import TestSequenceMessage
 from captain.types.worker import PoisonPill
 from captain.utils.logger import logger
@@ -101,20 +110,125 @@ class TSManager(WSManager):
             self.pause = False
 
 
+class JobsetRun:
+    """
+    Scheduling state of one running flowchart.
+    """
+
+    def __init__(
+        self,
+        jobset_id: str,
+        topology: Topology,
+        result_stats: QueueStats | None = None,  # shared with the other runs
+    ):
+        self.jobset_id = jobset_id
+        self.topology = topology
+        # worker responses, processed by the producer of the run, the workers
+        # wait when it falls behind
+        self.finish_queue = BoundedQueue(RESULT_QUEUE_SIZE, stats=result_stats)
+        # `Worker` running the jobs of the run in the shared worker pool
+        self.worker: Any = None
+        # `AsyncRuntime` running the flowchart when the asyncio runtime is used
+        self.async_runtime: Any = None
+
+    def stop(self):
+        if not self.topology.is_cancelled():
+            self.topology.cancel()
+        self.finish_queue.put(PoisonPill())  # stops the producer
+        self.finish_queue.close()  # the workers don't wait for it anymore
+        if self.async_runtime is not None:
+            self.async_runtime.stop()
+
+
 # Manager for flowchart activities (main manager)
 class Manager(WSManager):
     def __init__(self):
         super().__init__()
-        self.running_topology: Topology | None = None  # holds the topology
         self.debug_mode = False
-        self.task_queue: Queue[Any] = Queue()
-        self.finish_queue: Queue[Any] = Queue()
-        self.thread_count = 0
-
-    def end_worker_threads(self):
-        for _ in range(self.thread_count):
-            self.task_queue.put(PoisonPill())  # poison pill
-            self.finish_queue.put(PoisonPill())  # poison pill
+        # flowcharts running side by side, by jobset id
+        self.runs: dict[str, JobsetRun] = {}
+        self.runs_lock = threading.Lock()
+        # ready jobs of every run, served in turn to the shared worker pool
+        self.task_queue = FairJobQueue(
+            TASK_QUEUE_SIZE, overflow=self.is_result_queue_full
+        )
+        self.result_stats = QueueStats()  # of the result queues of all the runs
+        self.signal_stats = QueueStats()  # of the signals of the asyncio runtimes
+        self.pool_threads: list[threading.Thread] = []
+        # threads running the producers (or asyncio runtimes) of the runs
+        self.run_pool = RunPool()
+        # kept between runs so the processes keep their imported blocks
+        self.block_process_pool: BlockProcessPool | None = None
+        # results of the previous runs, used by incremental runs
+        self.result_cache = ResultCache()
+        self.run_profiler = RunProfiler()
+
+    def get_block_process_pool(self, max_workers: int) -> BlockProcessPool:
+        # a larger pool is kept, the runs don't use more processes than workers
+        if self.block_process_pool is None or (
+            self.block_process_pool.max_workers < max_workers
+            # other runs may be using the pool
+            and len(self.runs) <= 1
+        ):
+            if self.block_process_pool is not None:
+                self.block_process_pool.shutdown()
+            self.block_process_pool = BlockProcessPool(max_workers)
+        return self.block_process_pool
+
+    def start_run(self, jobset_id: str, topology: Topology) -> JobsetRun:
+        self.end_run(jobset_id)  # a jobset posted again replaces its previous run
+        run = JobsetRun(jobset_id, topology, self.result_stats)
+        with self.runs_lock:
+            self.runs[jobset_id] = run
+        return run
+
+    def get_run(self, jobset_id: str) -> JobsetRun | None:
+        return self.runs.get(jobset_id)
+
+    def get_run_worker(self, jobset_id: str) -> Any:
+        run = self.runs.get(jobset_id)
+        if run is None or run.topology.is_cancelled():
+            return None
+        return run.worker
+
+    def get_run_finish_queue(self, jobset_id: str) -> BoundedQueue | None:
+        run = self.runs.get(jobset_id)
+        return None if run is None else run.finish_queue
+
+    def end_run(self, jobset_id: str, run: JobsetRun | None = None):
+        """
+        Stops the run of `jobset_id`, if `run` is given only when it is still
+        the current run of the jobset.
+        """
+        with self.runs_lock:
+            current = self.runs.get(jobset_id)
+            if current is None or (run is not None and current is not run):
+                return
+            del self.runs[jobset_id]
+        self.task_queue.discard(jobset_id)
+        current.stop()
+
+    def end_runs(self):
+        for jobset_id in list(self.runs):
+            self.end_run(jobset_id)
+
+    def is_result_queue_full(self) -> bool:
+        # a producer waiting for the workers while they wait for a producer to
+        # take their results would never resume, its new jobs go through
+        with self.runs_lock:
+            return any(run.finish_queue.is_full() for run in self.runs.values())
+
+    def get_queue_stats(self) -> dict[str, Any]:
+        """
+        Depth and stall time of the queues between the producers, the workers
+        and the front-end, to tune their sizes.
+        """
+        return {
+            "tasks": self.task_queue.stats.summary(),
+            "results": self.result_stats.summary(),
+            "signals": self.signal_stats.summary(),
+            "websockets": self.ws.get_outbox_stats(),
+        }
 
 
 class WatchManager(object):
@@ -1,16 +1,173 @@
 from captain.types.test_sequence import TestSequenceMessage
-from fastapi import WebSocket
-from fastapi.websockets import WebSocketState
+from starlette.websockets import WebSocket, WebSocketState
 from pkgs.atlasvibe.atlasvibe.utils import PlotlyJSONEncoder
 from queue import Queue
+from collections import deque
 from typing import Any, Union
+import asyncio
 import json
+import time
+from captain.models.job_queue import QueueStats
 from captain.types.worker import WorkerJobResponse
+from captain.utils.binary_frames import encode_frame
+from captain.utils.logger import logger
 import threading
-import traceback
+
+"""
+Broadcasts are encoded once and pushed to an outbox per connection, each outbox
+being sent by its own task on the server event loop. `broadcast` never awaits a
+send, so a slow or dead client doesn't stall the workers, and a running node
+update waiting in an outbox is dropped for the next one, queued at the end.
+A client falling behind pauses whoever publishes to it until its outbox drains,
+which bounds the results held for it: `broadcast` awaits the drain in a thread,
+so only the calling task waits and its event loop goes on (the `AsyncRuntime`
+signal sender, whose queue then pauses the dispatchers), `publish` blocks the
+calling thread, unless called from the server loop.
+Connections opened in binary mode receive the node results as binary frames
+(see `binary_frames`), every other message stays JSON text.
+"""
 
 socket_connection_lock = threading.Lock()
 
+# a client that didn't accept a message within this time (s) is disconnected
+SEND_TIMEOUT = 10
+# messages kept for a client that doesn't keep up, the oldest are dropped
+MAX_OUTBOX_MESSAGES = 10_000
+# a publisher waits while a client has this many messages waiting, at most
+# `SEND_TIMEOUT` seconds: a client stuck longer is disconnected anyway
+OUTBOX_HIGH_WATER = 64
+
+Message = Union[dict[str, Any], WorkerJobResponse, TestSequenceMessage]
+
+
+def get_coalesce_key(message: Message) -> str | None:
+    """
+    Key of the messages replaced by the next one with the same key while they
+    wait in an outbox: the running node updates, which only carry a status.
+    """
+    if (
+        isinstance(message, WorkerJobResponse)
+        and message.get("RUNNING_NODE")
+        and not message.get("FAILED_NODES")
+        and "NODE_RESULTS" not in message
+    ):
+        return f"running:{message['jobsetId']}"
+    return None
+
+
+class Outbox:
+    def __init__(
+        self,
+        websocket: WebSocket,
+        loop: asyncio.AbstractEventLoop,
+        binary: bool = False,  # wants the node results as binary frames
+    ):
+        self.websocket = websocket
+        self.loop = loop  # loop of the server, where the websocket lives
+        self.binary = binary
+        self.messages: deque[list[Any]] = deque()  # [coalesce key, text or frame]
+        self.pending: dict[str, list[Any]] = {}  # coalesce key -> waiting message
+        self.lock = threading.Lock()
+        self.drained = threading.Condition(self.lock)
+        self.wakeup = asyncio.Event()
+        self.dropped = 0
+        self.closed = False
+        self.loop_thread = threading.get_ident()  # created on the server loop
+        self.stats = QueueStats()
+
+    def push(self, payload: str | bytes, key: str | None = None) -> bool:
+        """
+        Queues a message, from any thread, never waits. Returns whether
+        `OUTBOX_HIGH_WATER` messages are waiting, see `wait_drained`.
+        """
+        with self.lock:
+            if key is not None and key in self.pending:
+                # the update waiting in the outbox is outdated, the new one goes
+                # after the messages queued meanwhile to keep them in order
+                self.messages.remove(self.pending.pop(key))
+            entry = [key, payload]
+            self.messages.append(entry)
+            self.stats.record_put(len(self.messages))
+            if key is not None:
+                self.pending[key] = entry
+            if len(self.messages) > MAX_OUTBOX_MESSAGES:
+                dropped_key, _ = self.messages.popleft()
+                self.pending.pop(dropped_key, None)
+                self.dropped += 1
+                if self.dropped == 1:
+                    logger.warning("Client doesn't keep up, dropping old messages")
+            full = self.is_full()
+            if len(self.messages) != 1:
+                return full  # the sender is already woken up
+        try:
+            self.loop.call_soon_threadsafe(self.wakeup.set)
+        except RuntimeError:
+            pass  # server loop closed
+        return full
+
+    def is_full(self) -> bool:
+        # called with the lock held
+        return len(self.messages) >= OUTBOX_HIGH_WATER and not self.closed
+
+    def wait_drained(self):
+        """
+        Blocks the calling thread while `OUTBOX_HIGH_WATER` messages are
+        waiting, at most `SEND_TIMEOUT` seconds. Never call it from the server
+        loop, which sends them.
+        """
+        with self.lock:
+            if not self.is_full():
+                return
+            stalled_at = time.perf_counter()
+            deadline = stalled_at + SEND_TIMEOUT
+            while self.is_full():
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self.drained.wait(remaining)
+            self.stats.record_stall(time.perf_counter() - stalled_at)
+
+    def pop(self) -> str | bytes | None:
+        with self.lock:
+            if not self.messages:
+                return None
+            key, payload = self.messages.popleft()
+            if key is not None:
+                del self.pending[key]
+            self.stats.record_depth(len(self.messages))
+            if len(self.messages) < OUTBOX_HIGH_WATER:
+                self.drained.notify_all()
+            return payload
+
+    def close(self):
+        # the publishers waiting for a disconnected client go on
+        with self.lock:
+            self.closed = True
+            self.drained.notify_all()
+
+    async def run(self):
+        """
+        Sends the queued messages until the client is gone (raises) or stuck
+        for `SEND_TIMEOUT` seconds.
+        """
+        while True:
+            await self.wakeup.wait()
+            self.wakeup.clear()
+            while (payload := self.pop()) is not None:
+                send = (
+                    self.websocket.send_bytes(payload)
+                    if isinstance(payload, bytes)
+                    else self.websocket.send_text(payload)
+                )
+                try:
+                    await asyncio.wait_for(send, SEND_TIMEOUT)
+                except asyncio.TimeoutError:
+                    raise
+                except Exception as e:
+                    if self.websocket.client_state == WebSocketState.DISCONNECTED:
+                        raise
+                    logger.error(f"Error in broadcast: {e!r}")
+
 
 class ConnectionManager:
     _instance = None
@@ -24,13 +181,20 @@ class ConnectionManager:
 
     def __init__(self):
         self.active_connections_map: dict[str, WebSocket] = {}
+        self.outboxes: dict[str, Outbox] = {}
+        self.senders: dict[str, asyncio.Task[None]] = {}
         self.log_queue: Queue[WebSocket] = Queue()
 
-    async def connect(self, websocket: WebSocket, socket_id: str):
+    async def connect(self, websocket: WebSocket, socket_id: str, binary: bool = False):
         await websocket.accept()
 
+        outbox = Outbox(websocket, asyncio.get_running_loop(), binary)
         with socket_connection_lock:
             self.active_connections_map[socket_id] = websocket
+            self.outboxes[socket_id] = outbox
+            self.senders[socket_id] = asyncio.create_task(
+                self.send_outbox(socket_id, outbox)
+            )
 
         # logger.debug(
         #     f"Connected! Amt of active connections: {len(self.active_connections_map.keys())}"
@@ -43,34 +207,69 @@ class ConnectionManager:
                 return
 
             del self.active_connections_map[socket_id]
+            outbox = self.outboxes.pop(socket_id)
+            sender = self.senders.pop(socket_id)
+        outbox.close()
+
+        if sender is not asyncio.current_task():
+            outbox.loop.call_soon_threadsafe(sender.cancel)
+
+    async def send_outbox(self, socket_id: str, outbox: Outbox):
+        try:
+            await outbox.run()
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Error in broadcast to {socket_id}, disconnecting: {e!r}")
+            await self.disconnect(socket_id=socket_id)
+
+    def get_outbox_stats(self) -> dict[str, dict[str, Any]]:
+        # depth and stalls of the outbox of every connection
+        with socket_connection_lock:
+            outboxes = dict(self.outboxes)
+        return {
+            socket_id: {**outbox.stats.summary(), "dropped": outbox.dropped}
+            for socket_id, outbox in outboxes.items()
+        }
 
     # this method sends a message to all connected websockets
-    async def broadcast(
-        self, message: Union[dict[str, Any], WorkerJobResponse, TestSequenceMessage]
-    ):
-        dead_connections: set[str] = set()
+    async def broadcast(self, message: Message):
+        """
+        Queues the message for every connected websocket, then waits for the
+        outboxes it filled to drain without blocking the event loop.
+        """
+        for outbox in self.push(message):
+            await asyncio.to_thread(outbox.wait_drained)
 
+    def publish(self, message: Message):
+        """
+        Queues the message for every connected websocket, from any thread, and
+        blocks while the outboxes it filled drain (not on the server loop).
+        """
+        for outbox in self.push(message):
+            if threading.get_ident() != outbox.loop_thread:
+                outbox.wait_drained()
+
+    def push(self, message: Message) -> list[Outbox]:
+        # queues the message in every outbox, returns the full ones
         with socket_connection_lock:
-            for id, connection in self.active_connections_map.items():
-                if id in dead_connections:
-                    continue
+            outboxes = list(self.outboxes.values())
+        if not outboxes:
+            return []
 
-                try:
-                    await connection.send_text(
-                        json.dumps(message, cls=PlotlyJSONEncoder)
-                    )
-                except Exception as e:
-                    print(
-                        f"Error in broadcast to {id}",
-                        e,
-                        traceback.format_exc(),
-                        flush=True,
-                    )
-                    if connection.client_state == WebSocketState.DISCONNECTED:
-                        print(
-                            f"Connection state for {id} is Disconnected, adding to dead_connection..."
-                        )
-                        dead_connections.add(id)
-
-        for connection in dead_connections:
-            await self.disconnect(socket_id=connection)
+        key = get_coalesce_key(message)
+        frame: bytes | None = None
+        text: str | None = None
+        full: list[Outbox] = []
+        for outbox in outboxes:
+            if outbox.binary and "NODE_RESULTS" in message:
+                if frame is None:
+                    frame = encode_frame(message)
+                payload: str | bytes = frame
+            else:
+                if text is None:
+                    text = json.dumps(message, cls=PlotlyJSONEncoder)
+                payload = text
+            if outbox.push(payload, key):
+                full.append(outbox)
+        return full
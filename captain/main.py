@@ -1,6 +1,8 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
+import os
 from captain.routes import (
     blocks,
     devices,
@@ -9,9 +11,11 @@ from captain.routes import (
     test_profile,
     ws,
     log,
+    profiling,
     test_sequence,
 )
-from captain.utils.config import origins
+from captain.utils.config import manager, origins
+from captain.utils.flowchart_utils import prewarm_manager
 from captain.utils.logger import logger
 from captain.internal.manager import WatchManager
 
@@ -21,6 +25,16 @@ async def startup_event(app: FastAPI):
     logger.info("Running startup event")
     watch_manager = WatchManager.get_instance()
     watch_manager.start_thread()
+    # start the worker threads (and block processes if asked) before the first run
+    prewarm_processes = int(os.getenv("ATLASVIBE_PREWARM_PROCESSES", "0"))
+    asyncio.get_running_loop().run_in_executor(
+        None,
+        lambda: prewarm_manager(
+            manager,
+            max_workers=prewarm_processes or 4,
+            worker_backend="process" if prewarm_processes else "thread",
+        ),
+    )
     yield
 
 
@@ -44,3 +58,4 @@ app.include_router(test_profile.router)
 app.include_router(blocks.router)
 app.include_router(devices.router)
 app.include_router(test_sequence.router)
+app.include_router(profiling.router)
@@ -0,0 +1,85 @@
+from typing import Any, Callable
+
+from captain.models.result_cache import FLOW_CONTROL_BLOCKS
+from captain.models.topology import Topology
+from captain.utils.import_blocks import is_stateful_block
+from captain.utils.logger import logger
+
+"""
+Fusion of the linear chains of a flowchart.
+
+A job whose only out edge feeds a job with no other input hands its result
+straight to it: both can run back to back in the same worker, the result going
+from one block to the next without the job store or a round trip through the
+queues. `find_fused_chains` groups such jobs into maximal chains, the first job
+of a chain is queued with the others attached (`JobInfo.chain`) and its
+response completes the whole chain (`JobSuccess.fused`).
+"""
+
+
+def find_fused_chains(
+    topology: Topology,
+    functions: dict[str, Callable[..., Any]],
+    observe_blocks: list[str],
+) -> dict[str, list[str]]:
+    """
+    Maps the first job of every fusable chain to the jobs following it.
+    Observed, stateful, flow control and cached jobs aren't fused, nor are the
+    jobs run by a loop or pinned for it, or blocks that can't receive their
+    inputs directly (see `accepts_inputs`).
+    """
+    plan = topology.plan
+    observed = set(observe_blocks)
+    looped: set[int] = set()
+    for loop, (descendants, _) in topology.restart_regions.items():
+        looped.add(loop)
+        looped.update(plan.index[job_id] for job_id in descendants)
+
+    fusable_funcs: dict[int, bool] = {}  # id of the block function -> fusable
+
+    def is_fusable(node: int) -> bool:
+        job_id = plan.node_ids[node]
+        func = functions.get(job_id)
+        if func is None:
+            return False
+        if id(func) not in fusable_funcs:
+            fusable_funcs[id(func)] = getattr(
+                func, "accepts_inputs", False
+            ) and not is_stateful_block(func)
+        return (
+            fusable_funcs[id(func)]
+            and job_id not in observed
+            and job_id not in topology.cache_keys
+            and topology.get_cmd(job_id, original=True) not in FLOW_CONTROL_BLOCKS
+            and node not in looped
+        )
+
+    next_node: dict[int, int] = {}
+    for node, job_id in enumerate(plan.node_ids):
+        out_edges = plan.out_edge_ids(node)
+        if len(out_edges) != 1 or job_id not in topology.result_consumers:
+            continue  # the result is read by several jobs, or pinned
+        edge = out_edges[0]
+        target = plan.edge_target[edge]
+        if (
+            plan.edge_label[edge] == "default"
+            and plan.in_degree[target] == 1
+            and target != node
+            and is_fusable(node)
+            and is_fusable(target)
+        ):
+            next_node[node] = target
+
+    chains: dict[str, list[str]] = {}
+    for head in next_node.keys() - set(next_node.values()):
+        members: list[str] = []
+        node = head
+        while node in next_node:
+            node = next_node[node]
+            members.append(plan.node_ids[node])
+        chains[plan.node_ids[head]] = members
+
+    logger.debug(
+        f"{len(chains)} fused chains of {sum(map(len, chains.values())) + len(chains)} jobs"
+    )
+    return chains
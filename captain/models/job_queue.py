@@ -0,0 +1,208 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import OrderedDict, deque
+from queue import Full, Queue
+from typing import Any, Callable
+
+from captain.types.worker import PoisonPill
+
+"""
+Task queues handing out the ready jobs with the highest priority first, and
+the bounded queues between the producers and the workers.
+
+A bounded queue holds back the producers while `maxsize` items are waiting,
+so the results and front-end payloads of a fast block or a tight loop don't
+pile up without limit. The time the producers spend held back and the depth
+of the queue are recorded in its `QueueStats`, see `Manager.get_queue_stats`.
+"""
+
+# ready jobs waiting for the worker pool, results waiting for their producer
+TASK_QUEUE_SIZE = 1024
+RESULT_QUEUE_SIZE = 64
+
+# a stalled producer checks `BoundedQueue.overflow` this often (s)
+STALL_POLL_INTERVAL = 0.05
+
+
+class QueueStats:
+    """
+    Depth and stalls of a queue (or of several ones, e.g. the result queues
+    of all the runs). Thread safe.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.puts = 0
+        self.depth = 0  # items waiting after the last put or get
+        self.max_depth = 0
+        self.stalls = 0  # puts that had to wait
+        self.stall_time = 0.0  # total time spent waiting, in seconds
+        self.max_stall_time = 0.0
+
+    def record_put(self, depth: int):
+        with self.lock:
+            self.puts += 1
+            self.depth = depth
+            self.max_depth = max(self.max_depth, depth)
+
+    def record_depth(self, depth: int):
+        self.depth = depth
+
+    def record_stall(self, duration: float):
+        with self.lock:
+            self.stalls += 1
+            self.stall_time += duration
+            self.max_stall_time = max(self.max_stall_time, duration)
+
+    def summary(self) -> dict[str, Any]:
+        with self.lock:
+            return {
+                "puts": self.puts,
+                "depth": self.depth,
+                "max_depth": self.max_depth,
+                "stalls": self.stalls,
+                "stall_time": self.stall_time,
+                "max_stall_time": self.max_stall_time,
+            }
+
+
+class BoundedQueue(Queue[Any]):
+    """
+    Queue whose `put` waits while `maxsize` items are waiting (0: unbounded).
+    Poison pills are never held back, nor is anything once the queue is
+    closed (nobody reads it anymore). `overflow` lets a stalled put through
+    when it returns True: the consumers may be waiting on the producer.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 0,
+        overflow: Callable[[], bool] | None = None,
+        stats: QueueStats | None = None,  # shared by several queues if given
+    ):
+        super().__init__(maxsize)
+        self.overflow = overflow
+        self.stats = stats or QueueStats()
+        self.closed = False
+
+    def put(self, item: Any, block: bool = True, timeout: float | None = None):
+        with self.not_full:
+            if self.is_full() and not isinstance(item, PoisonPill):
+                if not block:
+                    raise Full
+                self.wait_not_full(timeout)
+            self._put(item)
+            self.unfinished_tasks += 1
+            self.stats.record_put(self._qsize())
+            self.not_empty.notify()
+
+    def wait_not_full(self, timeout: float | None):
+        # called with `not_full` held
+        stalled_at = time.perf_counter()
+        deadline = None if timeout is None else stalled_at + timeout
+        try:
+            while self.is_full():
+                if self.overflow is not None and self.overflow():
+                    return
+                wait = STALL_POLL_INTERVAL
+                if deadline is not None:
+                    wait = min(wait, deadline - time.perf_counter())
+                    if wait <= 0:
+                        raise Full
+                self.not_full.wait(wait)
+        finally:
+            self.stats.record_stall(time.perf_counter() - stalled_at)
+
+    def get(self, block: bool = True, timeout: float | None = None) -> Any:
+        item = super().get(block, timeout)
+        self.stats.record_depth(self.qsize())
+        return item
+
+    def is_full(self) -> bool:
+        return 0 < self.maxsize <= self._qsize() and not self.closed
+
+    def close(self):
+        """
+        Lets the waiting and future puts through, for a queue that is no
+        longer read.
+        """
+        with self.not_full:
+            self.closed = True
+            self.not_full.notify_all()
+
+
+def _priority_key(item: Any) -> float:
+    priority = getattr(item, "priority", None)
+    return float("inf") if priority is None else -priority
+
+
+class JobPriorityQueue(BoundedQueue):
+    """
+    Drop-in replacement of the FIFO task queue. Jobs are ordered by their
+    `priority` (highest first) and by insertion order among equal priorities.
+    Items without a priority, like poison pills, go after every job.
+    """
+
+    def _init(self, maxsize: int):
+        self.queue: list[tuple[float, int, Any]] = []
+        self.counter = itertools.count()
+
+    def _qsize(self):
+        return len(self.queue)
+
+    def _put(self, item: Any):
+        heapq.heappush(self.queue, (_priority_key(item), next(self.counter), item))
+
+    def _get(self):
+        return heapq.heappop(self.queue)[2]
+
+
+class FairJobQueue(BoundedQueue):
+    """
+    Task queue shared by the runs of several jobsets. Every jobset has its own
+    priority order (see `JobPriorityQueue`) and `get` serves the jobsets with
+    ready jobs in turn, so a large flowchart doesn't starve the others.
+    Items without a jobset, like poison pills, go after every job.
+    """
+
+    def _init(self, maxsize: int):
+        self.jobsets: OrderedDict[str, list[tuple[float, int, Any]]] = OrderedDict()
+        self.others: deque[Any] = deque()
+        self.size = 0
+        self.counter = itertools.count()
+
+    def _qsize(self):
+        return self.size
+
+    def _put(self, item: Any):
+        jobset_id = getattr(item, "jobset_id", None)
+        if jobset_id is None:
+            self.others.append(item)
+        else:
+            heap = self.jobsets.setdefault(jobset_id, [])
+            heapq.heappush(heap, (_priority_key(item), next(self.counter), item))
+        self.size += 1
+
+    def _get(self):
+        self.size -= 1
+        for jobset_id, heap in self.jobsets.items():
+            item = heapq.heappop(heap)[2]
+            # the jobset waits for the others before being served again
+            if heap:
+                self.jobsets.move_to_end(jobset_id)
+            else:
+                del self.jobsets[jobset_id]
+            return item
+        return self.others.popleft()
+
+    def discard(self, jobset_id: str):
+        """
+        Drops the queued jobs of a jobset that stopped running.
+        """
+        with self.mutex:
+            heap = self.jobsets.pop(jobset_id, None)
+            if heap:
+                self.size -= len(heap)
+                self.not_full.notify_all()
@@ -0,0 +1,207 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable
+
+from pkgs.atlasvibe.atlasvibe.config import AtlasvibeConfig
+from pkgs.atlasvibe.atlasvibe.result_spill import result_size
+
+from captain.models.topology import Topology
+from captain.utils.import_blocks import is_stateful_block
+from captain.utils.logger import logger
+
+"""
+Content addressed cache of block results used by incremental runs.
+
+The key of a node is a hash of its block source, its ctrls and the keys of the
+nodes feeding it, so a node only gets a new key when something it depends on
+changed. Unchanged nodes are served from the cache and only the dirty cone of
+the flowchart runs again. The files named by the ctrls of a node (a READ_CSV
+path) are part of its key through their modification time and size, while
+blocks drawing random numbers and nodes reading URLs are never cached.
+
+The cache is bounded by entries and by bytes, counted like the `ResultSpill` of
+the job store. Results large enough to be spilled by it are not cached, the
+cache would keep them in memory.
+"""
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_BYTES = 512 * 2**20
+
+# blocks driving the flow of the flowchart, they can't be replayed
+FLOW_CONTROL_BLOCKS = {"LOOP", "BREAK"}
+# blocks returning something else on every run
+NONDETERMINISTIC_BLOCKS = {
+    "RAND",
+    "MATRIX",
+    "POPULATE",
+    "SHUFFLE_MATRIX",
+    "SHUFFLE_VECTOR",
+}
+
+
+class CachedResult:
+    def __init__(self, value: Any, frontend_result: Any, observed: bool):
+        self.value = value  # what the block posted to the job store
+        self.frontend_result = frontend_result  # result sent to the front-end
+        self.observed = observed
+        self.size = result_size(value)
+
+
+class ResultCache:
+    """
+    Bounded LRU cache of block results, owned by the `Manager` so it survives
+    between runs.
+    """
+
+    def __init__(
+        self, max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_BYTES
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict[str, CachedResult] = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> CachedResult | None:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, entry: CachedResult):
+        spill_threshold = AtlasvibeConfig.get_instance().result_spill_threshold
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous.size
+            if entry.size > self.max_bytes or (
+                entry.size and entry.size >= spill_threshold
+            ):
+                return
+            self.entries[key] = entry
+            self.size += entry.size
+            while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= evicted.size
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+
+# module file -> (mtime, digest)
+_source_digests: dict[str, tuple[float, str]] = {}
+
+
+def get_block_source_digest(func: Callable[..., Any]) -> str:
+    """
+    Digest of the source file of the module defining the block. Falls back to
+    the qualified name of the function when the source can't be read.
+    """
+    module = sys.modules.get(func.__module__)
+    path = getattr(module, "__file__", None)
+    if path is None:
+        return f"{func.__module__}.{func.__qualname__}"
+    try:
+        mtime = os.path.getmtime(path)
+        cached = _source_digests.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        with open(path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return f"{func.__module__}.{func.__qualname__}"
+    _source_digests[path] = (mtime, digest)
+    return digest
+
+
+def get_ctrl_files(ctrls: dict[str, Any]) -> list[list[Any]] | None:
+    """
+    [path, modification time, size] of the local files named by the ctrls of a
+    node, so an edited file changes its key. None when a ctrl is a URL, whose
+    content can change anytime.
+    """
+    files: list[list[Any]] = []
+    for ctrl in ctrls.values():
+        value = ctrl.get("value") if isinstance(ctrl, dict) else ctrl
+        if not isinstance(value, str) or not value:
+            continue
+        if value.startswith(("http://", "https://", "ftp://")):
+            return None
+        try:
+            stat = os.stat(value)
+        except (OSError, ValueError):
+            continue  # not a path
+        files.append([value, stat.st_mtime_ns, stat.st_size])
+    return files
+
+
+def compute_cache_keys(
+    topology: Topology, functions: dict[str, Callable[..., Any]]
+) -> dict[str, str]:
+    """
+    Computes the cache key of every cacheable node of the topology.
+    Stateful, flow control and nondeterministic blocks, nodes reading URLs,
+    nodes that are part of a cycle (they are left out of the topological order)
+    and everything downstream of them don't get a key.
+    """
+    plan = topology.plan
+    graph = topology.original_graph
+    keys: dict[str, str] = {}
+    uncacheable: set[int] = set()
+
+    for node in plan.topological_order():
+        job_id = plan.node_ids[node]
+        func = functions.get(job_id)
+        predecessors = {plan.edge_source[edge] for edge in plan.in_edge_ids(node)}
+        cmd = topology.get_cmd(job_id, original=True)
+        ctrls = graph.nodes[job_id].get("ctrls", {})
+        files = get_ctrl_files(ctrls)
+        if (
+            func is None
+            or cmd in FLOW_CONTROL_BLOCKS
+            or cmd in NONDETERMINISTIC_BLOCKS
+            or files is None
+            or is_stateful_block(func)
+            or predecessors & uncacheable
+        ):
+            uncacheable.add(node)
+            continue
+
+        inputs = [
+            [dep["input_name"], dep["edge"], dep["multiple"], keys[dep["job_id"]]]
+            for dep in plan.dependencies[node]
+        ]
+        payload = json.dumps(
+            {
+                "source": get_block_source_digest(func),
+                "cmd": cmd,
+                "ctrls": ctrls,
+                "files": files,
+                "inputs": inputs,
+            },
+            sort_keys=True,
+            default=str,
+        )
+        keys[job_id] = hashlib.sha256(payload.encode()).hexdigest()
+
+    logger.debug(
+        f"{len(keys)} cacheable nodes out of {len(plan.node_ids)} in the flowchart"
+    )
+    return keys
@@ -0,0 +1,166 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+"""
+Per node execution profile of the flowchart runs.
+
+Workers record, for every job, the time it waited in the task queue, the time
+spent by the block wrapper in each step (fetching inputs, running the function,
+validating and packaging the result), the copies of its read-only inputs the
+block needed (see `atlasvibe.copy_on_write`) and optionally the peak memory
+allocated by the function. Loop bodies run several times, so each node also
+counts its runs.
+"""
+
+MAX_PROFILED_JOBSETS = 20
+
+# weight of the last run in the average duration of a block
+DURATION_SMOOTHING = 0.3
+
+# steps reported by the block wrapper, see `atlasvibe_node`
+WRAPPER_STEPS = ("fetch_time", "function_time", "validation_time", "packaging_time")
+
+
+class NodeProfile:
+    def __init__(self, node_id: str, cmd: str):
+        self.node_id = node_id
+        self.cmd = cmd
+        self.runs = 0
+        self.cached_runs = 0  # runs served from the result cache
+        self.failed_runs = 0
+        self.queue_wait_time = 0.0
+        self.wall_time = 0.0
+        self.steps = {step: 0.0 for step in WRAPPER_STEPS}
+        self.peak_memory: int | None = None
+        self.copies = 0
+        self.copied_bytes = 0
+
+    def add_run(
+        self,
+        queue_wait_time: float,
+        wall_time: float,
+        profile: dict[str, Any] | None,
+        failed: bool,
+    ):
+        self.runs += 1
+        self.queue_wait_time += queue_wait_time
+        self.wall_time += wall_time
+        if failed:
+            self.failed_runs += 1
+        if profile is None:
+            if not failed:
+                self.cached_runs += 1
+            return
+        for step in WRAPPER_STEPS:
+            self.steps[step] += profile.get(step, 0.0)
+        self.copies += profile.get("copies", 0)
+        self.copied_bytes += profile.get("copied_bytes", 0)
+        peak_memory = profile.get("peak_memory")
+        if peak_memory is not None:
+            self.peak_memory = max(self.peak_memory or 0, peak_memory)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "node_id": self.node_id,
+            "cmd": self.cmd,
+            "runs": self.runs,
+            "cached_runs": self.cached_runs,
+            "failed_runs": self.failed_runs,
+            "queue_wait_time": self.queue_wait_time,
+            "wall_time": self.wall_time,
+            **self.steps,
+            "peak_memory": self.peak_memory,
+            "copies": self.copies,
+            "copied_bytes": self.copied_bytes,
+        }
+
+
+class JobsetProfile:
+    def __init__(self, jobset_id: str):
+        self.jobset_id = jobset_id
+        self.started_at = time.perf_counter()
+        self.finished_at: float | None = None
+        self.nodes: dict[str, NodeProfile] = {}
+
+    def to_dict(self) -> dict[str, Any]:
+        end = self.finished_at or time.perf_counter()
+        nodes = sorted(
+            (node.to_dict() for node in self.nodes.values()),
+            key=lambda node: node["wall_time"],
+            reverse=True,
+        )
+        return {
+            "jobset_id": self.jobset_id,
+            "run_time": end - self.started_at,
+            "finished": self.finished_at is not None,
+            "copies": sum(node["copies"] for node in nodes),
+            "copied_bytes": sum(node["copied_bytes"] for node in nodes),
+            "nodes": nodes,
+        }
+
+
+class RunProfiler:
+    """
+    Keeps the profile of the last `MAX_PROFILED_JOBSETS` runs, owned by the `Manager`.
+    """
+
+    def __init__(self, max_jobsets: int = MAX_PROFILED_JOBSETS):
+        self.max_jobsets = max_jobsets
+        self.jobsets: OrderedDict[str, JobsetProfile] = OrderedDict()
+        self.lock = threading.Lock()
+        # block (cmd) -> smoothed wall time of its runs, kept across runs
+        self.block_durations: dict[str, float] = {}
+
+    def start(self, jobset_id: str):
+        with self.lock:
+            self._add_jobset(jobset_id)
+
+    def _add_jobset(self, jobset_id: str) -> JobsetProfile:
+        jobset = self.jobsets[jobset_id] = JobsetProfile(jobset_id)
+        self.jobsets.move_to_end(jobset_id)
+        while len(self.jobsets) > self.max_jobsets:
+            self.jobsets.popitem(last=False)
+        return jobset
+
+    def finish(self, jobset_id: str):
+        with self.lock:
+            jobset = self.jobsets.get(jobset_id)
+            if jobset is not None and jobset.finished_at is None:
+                jobset.finished_at = time.perf_counter()
+
+    def record(
+        self,
+        jobset_id: str,
+        node_id: str,
+        cmd: str,
+        queue_wait_time: float,
+        wall_time: float,
+        profile: dict[str, Any] | None,
+        failed: bool = False,
+    ):
+        with self.lock:
+            jobset = self.jobsets.get(jobset_id)
+            if jobset is None:
+                jobset = self._add_jobset(jobset_id)
+            node = jobset.nodes.get(node_id)
+            if node is None:
+                node = jobset.nodes[node_id] = NodeProfile(node_id, cmd)
+            node.add_run(queue_wait_time, wall_time, profile, failed)
+            if not failed and profile is not None:
+                previous = self.block_durations.get(cmd)
+                self.block_durations[cmd] = (
+                    wall_time
+                    if previous is None
+                    else previous + DURATION_SMOOTHING * (wall_time - previous)
+                )
+
+    def get_block_durations(self) -> dict[str, float]:
+        with self.lock:
+            return dict(self.block_durations)
+
+    def get_summary(self, jobset_id: str) -> dict[str, Any] | None:
+        with self.lock:
+            jobset = self.jobsets.get(jobset_id)
+            return None if jobset is None else jobset.to_dict()
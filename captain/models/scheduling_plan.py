@@ -0,0 +1,151 @@
+from typing import Any, cast
+
+import networkx as nx
+
+
+class SchedulingPlan:
+    """
+    Read-only, integer indexed form of a flowchart graph.
+
+    The flowchart is compiled once when the topology is created. Nodes are numbered
+    in graph order and edges are stored in CSR form (`out_indptr`/`out_edges` and
+    `in_indptr`/`in_edges` hold edge ids), so the scheduler only has to update
+    counters while the flowchart runs instead of mutating a networkx graph.
+    """
+
+    def __init__(self, graph: nx.MultiDiGraph):
+        self.node_ids: list[str] = list(cast(list[str], graph.nodes))
+        self.index: dict[str, int] = {
+            node_id: i for i, node_id in enumerate(self.node_ids)
+        }
+        node_count = len(self.node_ids)
+
+        # -- edges --
+        self.edge_source: list[int] = []
+        self.edge_target: list[int] = []
+        self.edge_label: list[str] = []
+        self.edge_data: list[dict[str, Any]] = []
+        for source, target, data in graph.edges(data=True):
+            self.edge_source.append(self.index[source])
+            self.edge_target.append(self.index[target])
+            self.edge_label.append(data.get("label", ""))
+            self.edge_data.append(data)
+        edge_count = len(self.edge_source)
+
+        # -- CSR adjacency --
+        self.out_indptr, self.out_edges = self._build_csr(
+            self.edge_source, node_count, edge_count
+        )
+        self.in_indptr, self.in_edges = self._build_csr(
+            self.edge_target, node_count, edge_count
+        )
+        self.in_degree: list[int] = [
+            self.in_indptr[i + 1] - self.in_indptr[i] for i in range(node_count)
+        ]
+
+        # -- per label out edges and parallel edges between two nodes --
+        self.label_edges: list[dict[str, list[int]]] = [{} for _ in range(node_count)]
+        self.pair_edges: dict[tuple[int, int], list[int]] = {}
+        for edge in range(edge_count):
+            source = self.edge_source[edge]
+            self.label_edges[source].setdefault(self.edge_label[edge], []).append(edge)
+            self.pair_edges.setdefault((source, self.edge_target[edge]), []).append(
+                edge
+            )
+
+        # -- inputs of every node, as expected by the workers --
+        self.dependencies: list[list[dict[str, Any]]] = []
+        for node_id in self.node_ids:
+            self.dependencies.append(
+                [
+                    {
+                        "job_id": prev_job_id,
+                        "input_name": data.get("target_label", ""),
+                        "multiple": data.get("multiple", False),
+                        "edge": data.get("label", ""),
+                    }
+                    for prev_job_id, _, data in graph.in_edges(node_id, data=True)
+                ]
+            )
+
+    @staticmethod
+    def _build_csr(
+        owners: list[int], node_count: int, edge_count: int
+    ) -> tuple[list[int], list[int]]:
+        indptr = [0] * (node_count + 1)
+        for owner in owners:
+            indptr[owner + 1] += 1
+        for i in range(node_count):
+            indptr[i + 1] += indptr[i]
+        cursor = indptr[:-1]
+        edges = [0] * edge_count
+        for edge, owner in enumerate(owners):
+            edges[cursor[owner]] = edge
+            cursor[owner] += 1
+        return indptr, edges
+
+    def out_edge_ids(self, node: int) -> list[int]:
+        return self.out_edges[self.out_indptr[node] : self.out_indptr[node + 1]]
+
+    def in_edge_ids(self, node: int) -> list[int]:
+        return self.in_edges[self.in_indptr[node] : self.in_indptr[node + 1]]
+
+    def topological_order(self) -> list[int]:
+        """
+        Nodes in topological order. Nodes that are part of a cycle, or
+        downstream of one, are not included.
+        """
+        in_degree = list(self.in_degree)
+        order = [i for i, degree in enumerate(in_degree) if degree == 0]
+        for node in order:
+            for edge in self.out_edge_ids(node):
+                target = self.edge_target[edge]
+                in_degree[target] -= 1
+                if in_degree[target] == 0:
+                    order.append(target)
+        return order
+
+    def critical_path_lengths(self, weights: list[float]) -> list[float]:
+        """
+        Length of the heaviest path starting at each node (its own weight
+        included), following every edge. Nodes on a cycle only count their
+        own weight.
+        """
+        lengths = list(weights)
+        for node in reversed(self.topological_order()):
+            longest_tail = 0.0
+            for edge in self.out_edge_ids(node):
+                longest_tail = max(longest_tail, lengths[self.edge_target[edge]])
+            lengths[node] = weights[node] + longest_tail
+        return lengths
+
+    def descendants(self, node: int) -> set[int]:
+        """
+        All nodes reachable from `node` following every edge of the flowchart.
+        """
+        seen: set[int] = set()
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            for edge in self.out_edge_ids(current):
+                target = self.edge_target[edge]
+                if target not in seen:
+                    seen.add(target)
+                    stack.append(target)
+        seen.discard(node)
+        return seen
+
+    def restart_region(self, node: int) -> tuple[list[int], list[int]]:
+        """
+        Descendants of `node` and the ids of the edges connecting `node` and its
+        descendants together, i.e. what has to be reset when `node` restarts.
+        """
+        descendants = self.descendants(node)
+        region = descendants | {node}
+        edges = [
+            edge
+            for source in sorted(region)
+            for edge in self.out_edge_ids(source)
+            if self.edge_target[edge] in region
+        ]
+        return sorted(descendants), edges
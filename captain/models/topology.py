@@ -2,14 +2,14 @@ import logging
 import os
 import time
 from collections import deque
-from copy import deepcopy
 from queue import Queue
 from typing import Any, cast
 
 import networkx as nx
 from pkgs.atlasvibe.atlasvibe import JobFailure, JobSuccess, get_next_directions
-from pkgs.atlasvibe.atlasvibe.utils import clear_atlasvibe_memory
+from pkgs.atlasvibe.atlasvibe.utils import clear_jobset_memory
 
+from captain.models.scheduling_plan import SchedulingPlan
 from captain.types.worker import JobInfo
 from captain.utils.logger import logger
 
@@ -20,16 +20,33 @@ class Topology:
     Used for running the flowchart and handles the logic.
     """
 
-    # TODO: Properly type all the variables and maybe get rid of deepcopy?
     # TODO: Remove unnecessary logger.debug statements
     def __init__(
         self,
         graph: nx.MultiDiGraph,
         jobset_id: str,
         node_delay: float = 0,
+        plan: SchedulingPlan | None = None,  # reused when only the ctrls differ
     ):
-        self.working_graph: nx.MultiDiGraph = deepcopy(graph)
-        self.original_graph: nx.MultiDiGraph = deepcopy(graph)
+        # the graph is never modified, the state of the run lives in the counters below
+        self.original_graph: nx.MultiDiGraph = graph
+        self.plan = SchedulingPlan(graph) if plan is None else plan
+        self.edge_alive = bytearray(b"\x01") * len(self.plan.edge_source)
+        self.remaining_in_degree: list[int] = list(self.plan.in_degree)
+        # job id -> result cache key, only filled for incremental runs
+        self.cache_keys: dict[str, str] = {}
+        # first job of a fused chain -> the other jobs of the chain, see `find_fused_chains`
+        self.fused_chains: dict[str, list[str]] = {}
+        # loop node -> (descendant job ids, edge ids) reset on every iteration
+        self.restart_regions: dict[int, tuple[list[str], list[int]]] = {}
+        for i, job_id in enumerate(self.plan.node_ids):
+            if self.is_loop_node(job_id):
+                self.restart_regions[i] = self.get_restart_region(i)
+        # job id -> number of times its result is fetched, pinned jobs are left out
+        self.result_consumers = self.count_result_consumers()
+        # job id -> remaining critical path length, ready jobs with the longest one go first
+        self.priorities: dict[str, float] = {}
+        self.set_block_durations({})
         self.jobset_id = jobset_id
         self.node_delay = node_delay
         self.finished_jobs: set[str] = set()
@@ -76,11 +93,8 @@ class Topology:
 
     def collect_ready_jobs(self):
         next_jobs: list[str] = []
-        for job_id in cast(list[str], self.working_graph.nodes):
-            if (
-                job_id not in self.finished_jobs
-                and self.original_graph.in_degree(job_id) == 0
-            ):
+        for i, job_id in enumerate(self.plan.node_ids):
+            if job_id not in self.finished_jobs and self.plan.in_degree[i] == 0:
                 next_jobs.append(job_id)
         return next_jobs
 
@@ -89,32 +103,38 @@ class Topology:
             self.run_job(job_id, task_queue)
 
     def run_job(self, job_id: str, task_queue: Queue[Any]):
-        node = cast(dict[str, Any], self.working_graph.nodes[job_id])
-
-        previous_jobs = self.get_job_dependencies_with_label(job_id, original=True)
-
-        logger.debug(
-            f" enqueue job: {self.get_label(job_id)}, dependencies: {[self.get_label(dep_id.get('job_id', ''), original=True) for dep_id in previous_jobs]}"
-        )
+        job = self.get_job_info(job_id)
+        job.chain = [
+            self.get_job_info(member) for member in self.fused_chains.get(job_id, [])
+        ]
 
-        logger.debug(f"{job_id} queued at {time.time()}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                f" enqueue job: {self.get_label(job_id)}, dependencies: {[self.get_label(dep_id.get('job_id', ''), original=True) for dep_id in job.previous_jobs]}"
+            )
+            logger.debug(f"{job_id} queued at {time.time()}")
 
         # -- queue the job --
-        task_queue.put(
-            JobInfo(
-                job_id=job_id,
-                jobset_id=self.jobset_id,
-                iteration_id=job_id,
-                ctrls=node["ctrls"],
-                previous_jobs=previous_jobs,
-            )
-        )
+        task_queue.put(job)
         self.queued_jobs.add(job_id)
         # -------------------
 
         if self.is_loop_node(job_id):
             self.loop_nodes.append(job_id)
 
+    def get_job_info(self, job_id: str) -> JobInfo:
+        node = cast(dict[str, Any], self.original_graph.nodes[job_id])
+        return JobInfo(
+            job_id=job_id,
+            jobset_id=self.jobset_id,
+            iteration_id=job_id,
+            ctrls=node["ctrls"],
+            previous_jobs=self.get_job_dependencies_with_label(job_id, original=True),
+            cache_key=self.cache_keys.get(job_id),
+            consumers=self.result_consumers.get(job_id),
+            priority=self.priorities.get(job_id, 0.0),
+        )
+
     # also used for when the topology finishes
     def cancel(self):
         logger.debug("Topology cancelled")
@@ -138,12 +158,16 @@ class Topology:
             logger.debug("Received job, but skipping since topology is cancelled")
             return
 
-        time.sleep(self.node_delay)
+        if self.node_delay:
+            time.sleep(self.node_delay)
 
         job_id: str = job.node_id
         job_result = job.result
 
-        logger.debug(f"job {self.get_label(job_id)} is done and has been received.")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"job {self.get_label(job_id)} is done and has been received.")
+        for fused_job in job.fused:
+            self.finish_fused_job(fused_job.node_id)
         if job_id in self.queued_jobs:
             self.queued_jobs.remove(job_id)
         if job_id in self.finished_jobs:
@@ -161,6 +185,15 @@ class Topology:
         if return_new_jobs:
             return next_jobs
 
+    def finish_fused_job(self, job_id: str):
+        """
+        Marks a job of a fused chain that ran before the last one as done. Its
+        only successor is the next job of the chain, which already ran.
+        """
+        self.queued_jobs.discard(job_id)
+        self.finished_jobs.add(job_id)
+        self.remove_dependencies(job_id, "default")
+
     def process_job_result(
         self, job_id: str, job_result: dict[str, Any] | None, success: bool
     ):
@@ -168,7 +201,8 @@ class Topology:
         process special instructions to scheduler
         """
 
-        logger.debug(f"processing job result for: {self.get_label(job_id)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"processing job result for: {self.get_label(job_id)}")
 
         if not success:
             logger.debug(f"{job_id} job failed")
@@ -229,7 +263,7 @@ class Topology:
 
         for node_id in nodes_to_add:
             if (
-                self.working_graph.in_degree(node_id) == 0
+                self.remaining_in_degree[self.plan.index[node_id]] == 0
             ):  # check if no dependencies left for node
                 next_nodes_from_dependencies.add(node_id)
 
@@ -241,32 +275,102 @@ class Topology:
         for new jobs. A new job is ready when a successor has no dependencies.
         """
         self.finished_jobs.add(job_id)
-        successors: list[str] = list(self.working_graph.successors(job_id))
+        plan = self.plan
+        successors = {
+            plan.edge_target[edge]
+            for edge in plan.out_edge_ids(plan.index[job_id])
+            if self.edge_alive[edge]
+        }
         self.remove_dependencies(job_id, label_direction)
         next_nodes = set()
-        for d_id in successors:
+        for target in successors:
+            d_id = plan.node_ids[target]
             if d_id in self.finished_jobs:
                 continue
-            if self.working_graph.in_degree(d_id) == 0:
+            if self.remaining_in_degree[target] == 0:
                 next_nodes.add(d_id)
         logger.debug("next nodes: " + str(next_nodes))
         return next_nodes
 
     def restart(self, job_id: str):
-        logger.debug(f" *** restarting job: {self.get_label(job_id, original=True)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                f" *** restarting job: {self.get_label(job_id, original=True)}"
+            )
         if self.loop_nodes:
             self.loop_nodes.pop()
-        graph = self.original_graph
-        sub_graph: nx.MultiDiGraph = graph.subgraph(
-            [job_id] + list(nx.descendants(graph, job_id))
-        )
-        original_edges = sub_graph.edges(data=True)
-        self.working_graph.add_edges_from(original_edges)
+        node = self.plan.index[job_id]
+        region = self.restart_regions.get(node)
+        if region is None:
+            region = self.restart_regions[node] = self.get_restart_region(node)
+        descendants, edges = region
+        # bring back every edge between the restarted nodes
+        edge_alive = self.edge_alive
+        remaining_in_degree = self.remaining_in_degree
+        edge_target = self.plan.edge_target
+        for edge in edges:
+            if not edge_alive[edge]:
+                edge_alive[edge] = 1
+                remaining_in_degree[edge_target[edge]] += 1
         self.finished_jobs.remove(job_id)
+        self.finished_jobs.difference_update(descendants)
 
-        for d_id in nx.descendants(self.working_graph, job_id):
-            if d_id in self.finished_jobs:
-                self.finished_jobs.remove(d_id)
+    def get_restart_region(self, node: int) -> tuple[list[str], list[int]]:
+        descendants, edges = self.plan.restart_region(node)
+        return [self.plan.node_ids[d] for d in descendants], edges
+
+    def set_block_durations(self, block_durations: dict[str, float]):
+        """
+        Ranks the jobs by the length of the longest path left after them,
+        weighting each block by its observed duration (in seconds). Blocks
+        that never ran weigh the average observed duration, or 1 when
+        nothing was observed yet.
+        """
+        default = (
+            sum(block_durations.values()) / len(block_durations)
+            if block_durations
+            else 1.0
+        )
+        plan = self.plan
+        weights = [
+            block_durations.get(self.get_cmd(job_id, original=True), default)
+            for job_id in plan.node_ids
+        ]
+        lengths = plan.critical_path_lengths(weights)
+        self.priorities = dict(zip(plan.node_ids, lengths))
+
+    def count_result_consumers(self) -> dict[str, int]:
+        """
+        Number of fetches of the result of each job by the jobs it feeds (one
+        per out edge). Jobs feeding a loop they are not part of are pinned
+        since the loop fetches their result on every iteration, and so are the
+        jobs referenced by a NodeReference ctrl (read without an edge).
+        """
+        plan = self.plan
+        pinned: set[int] = set()
+        for job_id in plan.node_ids:
+            ctrls = cast(dict[str, Any], self.original_graph.nodes[job_id]).get(
+                "ctrls", {}
+            )
+            for ctrl in ctrls.values():
+                if (
+                    ctrl.get("type") == "NodeReference"
+                    and ctrl.get("value") in plan.index
+                ):
+                    pinned.add(plan.index[ctrl["value"]])
+        for loop in self.restart_regions:
+            region = plan.descendants(loop) | {loop}
+            for node in region:
+                for edge in plan.in_edge_ids(node):
+                    if plan.edge_source[edge] not in region:
+                        pinned.add(plan.edge_source[edge])
+
+        consumers: dict[str, int] = {}
+        for node, job_id in enumerate(plan.node_ids):
+            count = plan.out_indptr[node + 1] - plan.out_indptr[node]
+            if count and node not in pinned:
+                consumers[job_id] = count
+        return consumers
 
     def finalizer(self):
         if self.finished:
@@ -277,7 +381,7 @@ class Topology:
         logger.debug(f"job {self.get_label(job_id)} failed")
 
     def get_cmd(self, job_id: str, original: bool = False) -> str:
-        graph = self.get_graph(original)
+        graph = self.original_graph  # node attributes never change during a run
         if graph.has_node(job_id):
             return graph.nodes[job_id].get("cmd", job_id)
         else:
@@ -292,57 +396,63 @@ class Topology:
             self.remove_dependency(edge[0], edge[1])
 
     def get_edges_by_label(self, job_id: str, label: str) -> list[tuple[str, Any, Any]]:
-        edges = self.working_graph.edges(job_id, data=True)
-        edges = [
-            (s, t, data) for (s, t, data) in edges if data.get("label", "") == label
+        plan = self.plan
+        node = plan.index[job_id]
+        return [
+            (job_id, plan.node_ids[plan.edge_target[edge]], plan.edge_data[edge])
+            for edge in plan.label_edges[node].get(label, [])
+            if self.edge_alive[edge]
         ]
-        return edges
 
     def get_job_dependencies_with_label(
         self, job_id: str, original: bool = True
     ) -> list[dict[str, str]]:
-        graph = self.get_graph(original)
-        try:
-            deps = []
-            for prev_job_id, _, data in list(graph.in_edges(job_id, data=True)):
-                input_name = data.get("target_label", "")
-                multiple = data.get("multiple", False)
-                edge_label = data.get("label", "")
-                deps.append(
-                    {
-                        "job_id": prev_job_id,
-                        "input_name": input_name,
-                        "multiple": multiple,
-                        "edge": edge_label,
-                    }
-                )
-            logger.debug(f"deps: {deps}")
-            return deps
-        except Exception:
+        plan = self.plan
+        node = plan.index.get(job_id)
+        if node is None:
             return []
+        if original:
+            return [dict(dep) for dep in plan.dependencies[node]]
+        return [
+            dict(plan.dependencies[node][i])
+            for i, edge in enumerate(plan.in_edge_ids(node))
+            if self.edge_alive[edge]
+        ]
 
     def get_input_info(
         self, source_job_id: str, target_job_id: str, original: bool = False
     ) -> list[tuple[str, bool]]:
-        graph = self.get_graph(original)
-        edge_data = graph.get_edge_data(source_job_id, target_job_id)
-        target_label = ""
-        multiple = False
         dependencies = []
-        if edge_data:
-            for edge in edge_data.values():
-                target_label = edge.get("target_label", "")
-                multiple = edge.get("multiple", False)
-                dependencies.append((target_label, multiple))
+        for edge in self._get_pair_edges(source_job_id, target_job_id, original):
+            data = self.plan.edge_data[edge]
+            dependencies.append(
+                (data.get("target_label", ""), data.get("multiple", False))
+            )
         return dependencies
 
     def remove_dependency(self, job_id: str, succ_id: str):
-        if self.working_graph.has_edge(job_id, succ_id):
-            logger.debug(
-                f"  - remove dependency: {self.get_edge_label_string(job_id, succ_id)}"
-            )
-            while self.working_graph.has_edge(job_id, succ_id):
-                self.working_graph.remove_edge(job_id, succ_id)
+        edges = self._get_pair_edges(job_id, succ_id, original=False)
+        if edges:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    f"  - remove dependency: {self.get_edge_label_string(job_id, succ_id)}"
+                )
+            target = self.plan.index[succ_id]
+            for edge in edges:
+                self.edge_alive[edge] = 0
+                self.remaining_in_degree[target] -= 1
+
+    def _get_pair_edges(
+        self, source_job_id: str, target_job_id: str, original: bool
+    ) -> list[int]:
+        source = self.plan.index.get(source_job_id)
+        target = self.plan.index.get(target_job_id)
+        if source is None or target is None:
+            return []
+        edges = self.plan.pair_edges.get((source, target), [])
+        if original:
+            return edges
+        return [edge for edge in edges if self.edge_alive[edge]]
 
     def get_edge_label_string(
         self,
@@ -351,23 +461,26 @@ class Topology:
         label: str | None = None,
         original: bool = False,
     ):
-        graph = self.get_graph(original)
         if label is None:
-            edge_data = graph.get_edge_data(source_job_id, target_job_id)
-
-            label = "" if edge_data is None else edge_data.get("label", "")
+            edges = self._get_pair_edges(source_job_id, target_job_id, original)
+            label = self.plan.edge_label[edges[0]] if edges else ""
         s = self.get_label(source_job_id, original=original)
         t = self.get_label(target_job_id, original=original)
         return f"{s} -- {label} --> {t}"
 
     def get_job_dependencies(self, job_id: str) -> list[str]:
-        try:
-            return list(self.working_graph.predecessors(job_id))
-        except Exception:
+        plan = self.plan
+        node = plan.index.get(job_id)
+        if node is None:
             return []
+        predecessors: dict[str, None] = {}
+        for edge in plan.in_edge_ids(node):
+            if self.edge_alive[edge]:
+                predecessors[plan.node_ids[plan.edge_source[edge]]] = None
+        return list(predecessors)
 
     def get_label(self, job_id: str, original: bool = False) -> str:
-        graph = self.get_graph(original)
+        graph = self.original_graph  # node attributes never change during a run
         if graph.has_node(job_id):
             return graph.nodes[job_id].get("label", job_id)
         else:
@@ -376,8 +489,9 @@ class Topology:
             )
         return job_id
 
-    def get_graph(self, original: bool):
-        return self.original_graph if original else self.working_graph
+    def get_graph(self, original: bool = True):
+        # the graph is read-only, the working state is kept in the scheduling plan counters
+        return self.original_graph
 
     # this function will get the maximum amount of independent nodes during the topological sort of the graph.
     # Will be used to determine how many workers to spawn
@@ -388,11 +502,12 @@ class Topology:
     # and the LOOP node has 2 successors from "body" (node1, node2) and 1 from "end" (end),
     # we will spawn 3 workers instead of the logical amount which is 2.
     def get_maximum_workers(self, maximum_capacity: int = 1):
+        plan = self.plan
         max_independant = 0
-        temp_graph = deepcopy(self.original_graph)
+        in_degree = list(plan.in_degree)
         queue = deque()
         for job_id in self.collect_ready_jobs():
-            queue.append(job_id)
+            queue.append(plan.index[job_id])
 
         while len(queue) > 0:
             n = len(queue)
@@ -400,30 +515,28 @@ class Topology:
             if max_independant >= maximum_capacity:
                 return maximum_capacity
             for _ in range(n):
-                job_id = queue.popleft()
-                successors = temp_graph.successors(job_id)
-                temp_graph.remove_node(job_id)
-                for neighbour in successors:
-                    if temp_graph.in_degree(neighbour) == 0:
+                node = queue.popleft()
+                for edge in plan.out_edge_ids(node):
+                    neighbour = plan.edge_target[edge]
+                    in_degree[neighbour] -= 1
+                    if in_degree[neighbour] == 0:
                         queue.append(neighbour)
 
         return max_independant
 
     def get_outputs(self, job_id: str):
-        out = self.working_graph.out_edges(job_id)
+        plan = self.plan
         return list(
             set(
-                edge["label"]
-                for (u, v) in out
-                for edge in self.working_graph.get_edge_data(u, v).values()
+                plan.edge_label[edge]
+                for edge in plan.out_edge_ids(plan.index[job_id])
+                if self.edge_alive[edge]
             )
         )
 
     def is_loop_node(self, job_id: str):
-        node = cast(
-            dict[str, Any], self.original_graph.nodes[job_id]
-        )  # working graph is modified after each node run so it's safe to use original graph to retrieve the node
+        node = cast(dict[str, Any], self.original_graph.nodes[job_id])
         return bool(node and node["cmd"] == "LOOP")
 
     def cleanup(self):
-        clear_atlasvibe_memory()
+        clear_jobset_memory(self.jobset_id)
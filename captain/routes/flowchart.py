@@ -16,8 +16,10 @@ router = APIRouter(tags=["flowchart"])
 @router.post("/cancel_fc", summary="cancel flowchart")
 async def cancel_fc(req: PostCancelFC):
     logger.info("Cancelling flowchart...")
-    if manager.running_topology is not None:
-        manager.running_topology.cancel()
+    if req.jobsetId is not None and manager.get_run(req.jobsetId) is not None:
+        manager.end_run(req.jobsetId)
+    else:
+        manager.end_runs()
     if req.jobsetId is None:
         logger.debug("No jobsetId provided, skipping signal_standby")
         return
@@ -0,0 +1,22 @@
+from typing import Any
+
+from fastapi import APIRouter, HTTPException
+
+from captain.utils.config import manager
+
+router = APIRouter(tags=["profiling"])
+
+
+@router.get("/profile/{jobset_id}", summary="get the execution profile of a run")
+async def get_run_profile(jobset_id: str) -> dict[str, Any]:
+    profile = manager.run_profiler.get_summary(jobset_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"No profile for run {jobset_id}")
+    return profile
+
+
+@router.get(
+    "/queue_stats", summary="get the depth and stall time of the scheduling queues"
+)
+async def get_queue_stats() -> dict[str, Any]:
+    return manager.get_queue_stats()
@@ -10,12 +10,15 @@ router = APIRouter(tags=["ws"])
 
 
 @router.websocket("/ws/{socket_id}")
-async def websocket_endpoint(websocket: WebSocket, socket_id: str):
+async def websocket_endpoint(
+    websocket: WebSocket, socket_id: str, binary: bool = False
+):
+    # binary: receive the node results as binary frames, see `binary_frames`
     if socket_id in list(manager.ws.active_connections_map.keys()):
         logger.info("client {socket_id} is already connected!")
         return
 
-    await manager.ws.connect(websocket, socket_id=socket_id)
+    await manager.ws.connect(websocket, socket_id=socket_id, binary=binary)
     try:
         # send "Connection established" message to client
         await websocket.send_text(
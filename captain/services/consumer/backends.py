@@ -0,0 +1,174 @@
+from typing import Any, Callable, Protocol
+
+from pkgs.atlasvibe.atlasvibe import JobFailure, JobSuccess, collect_streams
+
+from captain.services.consumer.block_process_pool import BlockProcessPool
+from captain.services.consumer.fused_chain import get_chain_links, run_chain
+from captain.types.worker import JobInfo, WorkerBackendType
+from captain.utils.import_blocks import get_block_job_service, is_stateful_block
+from captain.utils.logger import logger
+
+"""
+Execution backends used by the `Worker` to run a block function.
+The worker takes care of the queues and of signaling the front-end,
+the backend only decides where the function runs.
+"""
+
+
+class BlockBackend(Protocol):
+    def execute(
+        self, func: Callable[..., Any], job: JobInfo, kwargs: dict[str, Any]
+    ) -> JobSuccess | JobFailure: ...
+
+    def execute_chain(
+        self,
+        funcs: list[Callable[..., Any]],
+        jobs: list[JobInfo],  # the jobs of a fused chain, see `JobInfo.chain`
+        kwargs_list: list[dict[str, Any]],
+    ) -> list[JobSuccess | JobFailure]: ...
+
+
+class InlineBackend:
+    """
+    Runs the block in the worker thread itself.
+    """
+
+    def execute(
+        self, func: Callable[..., Any], job: JobInfo, kwargs: dict[str, Any]
+    ) -> JobSuccess | JobFailure:
+        return func(**kwargs)
+
+    def execute_chain(
+        self,
+        funcs: list[Callable[..., Any]],
+        jobs: list[JobInfo],
+        kwargs_list: list[dict[str, Any]],
+    ) -> list[JobSuccess | JobFailure]:
+        links = get_chain_links([job.previous_jobs for job in jobs[1:]])
+        return run_chain(funcs, kwargs_list, links)
+
+
+class ProcessPoolBackend:
+    """
+    Runs the block in a `BlockProcessPool` so CPU bound blocks don't serialize on the GIL.
+    Stateful blocks (see `is_stateful_block`) still run inline since their state
+    lives in this process, and so do streaming blocks whose lazy streams read
+    their source in this process. With a shared job store (see `dao_server`) the
+    inputs and results stay in the store instead of being sent to the pool.
+    """
+
+    def __init__(
+        self,
+        pool: BlockProcessPool,
+        parent_bound_jobs: set[str],
+        project_path: str | None = None,
+    ):
+        self.pool = pool
+        self.parent_bound_jobs = parent_bound_jobs
+        self.project_path = project_path
+
+    def execute(
+        self, func: Callable[..., Any], job: JobInfo, kwargs: dict[str, Any]
+    ) -> JobSuccess | JobFailure:
+        if job.job_id in self.parent_bound_jobs:
+            return func(**kwargs)
+
+        job_service = get_block_job_service(func)
+        inputs = self.fetch_inputs(job_service, job)
+
+        try:
+            response, result = self.pool.run(
+                func.__name__, self.project_path, kwargs, inputs
+            )
+        except Exception as e:
+            logger.error(f"Block process failed while running {func.__name__}: {e}")
+            return JobFailure(
+                func_name=func.__name__,
+                node_id=job.job_id,
+                error=str(e),
+                jobset_id=job.jobset_id,
+            )
+
+        if isinstance(response, JobSuccess) and not job_service.dao.shared:
+            job_service.post_job_result(job.iteration_id, result)
+        return response
+
+    def execute_chain(
+        self,
+        funcs: list[Callable[..., Any]],
+        jobs: list[JobInfo],
+        kwargs_list: list[dict[str, Any]],
+    ) -> list[JobSuccess | JobFailure]:
+        # fused jobs are never stateful, the whole chain runs in one process
+        job_service = get_block_job_service(funcs[0])
+        inputs = self.fetch_inputs(job_service, jobs[0])
+        links = get_chain_links([job.previous_jobs for job in jobs[1:]])
+        try:
+            responses, result = self.pool.run_chain(
+                [func.__name__ for func in funcs],
+                self.project_path,
+                kwargs_list,
+                links,
+                inputs,
+            )
+        except Exception as e:
+            names = ", ".join(func.__name__ for func in funcs)
+            logger.error(f"Block process failed while running {names}: {e}")
+            return [
+                JobFailure(
+                    func_name=funcs[0].__name__,
+                    node_id=jobs[0].job_id,
+                    error=str(e),
+                    jobset_id=jobs[0].jobset_id,
+                )
+            ]
+
+        if (
+            isinstance(responses[-1], JobSuccess)
+            and len(responses) == len(jobs)
+            and not job_service.dao.shared
+        ):
+            job_service.post_job_result(jobs[-1].iteration_id, result)
+        return responses
+
+    def fetch_inputs(self, job_service: Any, job: JobInfo) -> dict[str, Any]:
+        inputs: dict[str, Any] = {}
+        if job_service.dao.shared:
+            return inputs  # the block fetches (and releases) them itself
+        for prev_job in job.previous_jobs:
+            prev_job_id = prev_job.get("job_id", "")
+            if prev_job_id not in inputs and job_service.job_exists(prev_job_id):
+                try:
+                    # a stream is read where it was made, the pool gets its data
+                    inputs[prev_job_id] = collect_streams(
+                        job_service.get_job_result(prev_job_id)
+                    )
+                except ValueError:
+                    pass  # the block will report the missing input itself
+            if prev_job_id in inputs:
+                # the block reads its inputs from the copies sent to the pool
+                job_service.release_job_result(prev_job_id)
+        return inputs
+
+
+def create_block_backend(
+    imported_functions: dict[str, Any],
+    worker_backend: WorkerBackendType,
+    get_pool: Callable[[], BlockProcessPool],  # only called for the process backend
+    project_path: str | None = None,
+) -> BlockBackend:
+    if worker_backend == "process":
+        parent_bound_jobs = {
+            job_id
+            for job_id, func in imported_functions.items()
+            if is_stateful_block(
+                func, shared_store=get_block_job_service(func).dao.shared
+            )
+            or getattr(func, "streaming", False)
+        }
+        return ProcessPoolBackend(
+            pool=get_pool(),
+            parent_bound_jobs=parent_bound_jobs,
+            project_path=project_path,
+        )
+    return InlineBackend()
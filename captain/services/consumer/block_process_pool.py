@@ -0,0 +1,186 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable
+
+from pkgs.atlasvibe.atlasvibe import JobSuccess
+from pkgs.atlasvibe.atlasvibe.shared_arrays import dumps_shared, loads_shared
+
+from captain.services.consumer.fused_chain import ChainLink, run_chain
+from captain.utils.import_blocks import (
+    get_block_job_service,
+    import_block,
+    use_block_namespace,
+)
+from captain.utils.logger import logger
+
+"""
+Pool of worker processes used by the "process" worker backend.
+
+Every process imports the block functions it is asked to run once and keeps them
+around for the following jobs (and runs), reimporting a block only when its
+source file changes (see `import_block`). Job inputs and results travel through `dumps_shared`, so
+large arrays are handed over through shared memory instead of the pipe. When the
+job store is shared between the processes (see `dao_server`), the blocks read
+and write it directly and only the responses travel back.
+"""
+
+
+def _load_block_function(cmd: str, project_path: str | None) -> Callable[..., Any]:
+    block = import_block(cmd, project_path)
+    if block is None:
+        raise ValueError(f"Failed to load module for block '{cmd}'")
+    return block.func
+
+
+def _run_block(
+    cmd: str, project_path: str | None, kwargs: dict[str, Any], payload: bytes
+) -> bytes:
+    """
+    Entry point executed inside a worker process. Makes the inputs available to
+    the block through the process local job store, runs the block and sends back
+    both the worker response and the raw result.
+    """
+    inputs: dict[str, Any] = loads_shared(payload)
+    func = _load_block_function(cmd, project_path)
+    job_service = get_block_job_service(func)
+    job_id: str = kwargs["job_id"]
+
+    with use_block_namespace(func, kwargs["jobset_id"]):
+        if job_service.dao.shared:
+            # the block reads its inputs from and writes its result to the
+            # job store of the parent, see `dao_server`
+            return dumps_shared((func(**kwargs), None))
+
+        for prev_job_id, prev_result in inputs.items():
+            job_service.post_job_result(prev_job_id, prev_result)
+
+        result = None
+        try:
+            response = func(**kwargs)
+            if isinstance(response, JobSuccess) and job_service.job_exists(job_id):
+                try:
+                    result = job_service.get_job_result(job_id)
+                except ValueError:
+                    result = None  # block returned None
+        finally:
+            for prev_job_id in inputs:
+                job_service.delete_job(prev_job_id)
+            job_service.delete_job(job_id)
+
+    return dumps_shared((response, result))
+
+
+def _run_chain(
+    cmds: list[str],
+    project_path: str | None,
+    kwargs_list: list[dict[str, Any]],
+    links: list[ChainLink],
+    payload: bytes,
+) -> bytes:
+    """
+    Same as `_run_block` for the blocks of a fused chain, run one after the
+    other (see `run_chain`). Sends back the responses of the blocks and the raw
+    result of the last one.
+    """
+    inputs: dict[str, Any] = loads_shared(payload)
+    funcs = [_load_block_function(cmd, project_path) for cmd in cmds]
+    job_service = get_block_job_service(funcs[0])
+    job_id: str = kwargs_list[-1]["job_id"]
+
+    with use_block_namespace(funcs[0], kwargs_list[0]["jobset_id"]):
+        if job_service.dao.shared:
+            return dumps_shared((run_chain(funcs, kwargs_list, links), None))
+
+        for prev_job_id, prev_result in inputs.items():
+            job_service.post_job_result(prev_job_id, prev_result)
+
+        result = None
+        try:
+            responses = run_chain(funcs, kwargs_list, links)
+            last = responses[-1]
+            if isinstance(last, JobSuccess) and job_service.job_exists(job_id):
+                try:
+                    result = job_service.get_job_result(job_id)
+                except ValueError:
+                    result = None  # block returned None
+        finally:
+            for prev_job_id in inputs:
+                job_service.delete_job(prev_job_id)
+            job_service.delete_job(job_id)
+
+    return dumps_shared((responses, result))
+
+
+def _warm_up(cmds: list[str], project_path: str | None):
+    for cmd in cmds:
+        try:
+            _load_block_function(cmd, project_path)
+        except Exception as e:
+            logger.warning(f"Could not preload block '{cmd}': {e}")
+
+
+# ------------------------------------------------
+
+
+class BlockProcessPool:
+    """
+    Long lived pool of processes executing block functions. Owned by the
+    `Manager` so the processes (and the blocks they imported) survive between runs.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        # spawn instead of fork: the server process runs several threads
+        self.executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        logger.info(f"Started block process pool with {max_workers} processes")
+
+    def run(
+        self,
+        cmd: str,
+        project_path: str | None,
+        kwargs: dict[str, Any],
+        inputs: dict[str, Any],
+    ) -> tuple[Any, Any]:
+        """
+        Runs block `cmd` in one of the processes and blocks until it is done.
+        Returns the worker response and the raw result of the block.
+        """
+        future = self.executor.submit(
+            _run_block, cmd, project_path, kwargs, dumps_shared(inputs)
+        )
+        return loads_shared(future.result())
+
+    def run_chain(
+        self,
+        cmds: list[str],
+        project_path: str | None,
+        kwargs_list: list[dict[str, Any]],
+        links: list[ChainLink],
+        inputs: dict[str, Any],
+    ) -> tuple[list[Any], Any]:
+        """
+        Runs the blocks of a fused chain in one of the processes. Returns the
+        responses of the blocks and the raw result of the last one.
+        """
+        future = self.executor.submit(
+            _run_chain, cmds, project_path, kwargs_list, links, dumps_shared(inputs)
+        )
+        return loads_shared(future.result())
+
+    def warm_up(self, cmds: list[str], project_path: str | None = None):
+        """
+        Starts every process and imports the blocks `cmds` in them, so the
+        first run doesn't wait for it. Blocks until the processes are ready.
+        """
+        futures = [
+            self.executor.submit(_warm_up, cmds, project_path)
+            for _ in range(self.max_workers)
+        ]
+        for future in futures:
+            future.result()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
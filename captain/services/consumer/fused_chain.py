@@ -0,0 +1,54 @@
+from typing import Any, Callable
+
+from pkgs.atlasvibe.atlasvibe import JobFailure, JobSuccess
+from pkgs.atlasvibe.atlasvibe.job_result_utils import get_dc_from_result
+
+"""
+Runs the jobs of a fused chain (see `captain.models.fusion`) one after the
+other. Each block gets the output of the previous one as its input, only the
+last block of the chain posts its result to the job store.
+"""
+
+# (input name, multiple) of the input fed by the previous job of the chain
+ChainLink = tuple[str, bool]
+
+
+def get_chain_links(previous_jobs: list[list[dict[str, Any]]]) -> list[ChainLink]:
+    """
+    Links of a chain given the `previous_jobs` of the jobs following the first
+    one, each of them has a single input.
+    """
+    return [
+        (deps[0].get("input_name", ""), deps[0].get("multiple", False))
+        for deps in previous_jobs
+    ]
+
+
+def run_chain(
+    funcs: list[Callable[..., Any]],
+    kwargs_list: list[dict[str, Any]],  # kwargs of each block, see `Worker.execute`
+    links: list[ChainLink],
+) -> list[JobSuccess | JobFailure]:
+    """
+    Returns the response of every block that ran, the chain stops at the first
+    failure.
+    """
+    responses: list[JobSuccess | JobFailure] = []
+    output: Any = None
+    last = len(funcs) - 1
+    for i, (func, kwargs) in enumerate(zip(funcs, kwargs_list)):
+        if i > 0:
+            input_name, multiple = links[i - 1]
+            inputs: dict[str, Any] = {}
+            dc = get_dc_from_result(output)
+            if dc is not None:
+                inputs[input_name] = [dc] if multiple else dc
+            kwargs = {**kwargs, "previous_jobs": [], "inputs": inputs}
+        if i < last:
+            kwargs = {**kwargs, "post_result": False}
+        response = func(**kwargs)
+        responses.append(response)
+        if not isinstance(response, JobSuccess):
+            break
+        output, response.output = response.output, None
+    return responses
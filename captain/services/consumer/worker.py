@@ -1,12 +1,18 @@
+import time
+import traceback
 import uuid
 from queue import Queue
-from typing import Any, cast
+from typing import Any, Callable, cast
 
 from pkgs.atlasvibe.atlasvibe import JobFailure, JobService, JobSuccess
 from pkgs.atlasvibe.atlasvibe.atlasvibe_node_venv import PipInstallThread
 
+from captain.models.result_cache import CachedResult, ResultCache
+from captain.models.run_profile import RunProfiler
+from captain.services.consumer.backends import BlockBackend, InlineBackend
 from captain.types.worker import JobInfo, PoisonPill
 from captain.utils.broadcast import Signaler
+from captain.utils.import_blocks import get_block_job_service, use_block_namespace
 from captain.utils.logger import logger
 
 """
@@ -23,6 +29,12 @@ class Worker:
         observe_blocks: list[str],
         signaler: Signaler | None = None,  # signaler object to signal to the front-end
         node_delay: float = 0,
+        backend: BlockBackend | None = None,  # where the block functions run
+        result_cache: ResultCache | None = None,  # set for incremental runs
+        profiler: RunProfiler | None = None,  # records the timings of every job
+        profile_memory: bool = False,  # measure the peak memory of the blocks
+        plot_limits: dict[str, int] | None = None,  # plot_max_points / plot_max_pixels
+        stream_buffer: int = 0,  # chunks read ahead between streaming blocks
     ):
         self.task_queue = task_queue
         self.finish_queue = finish_queue
@@ -32,6 +44,12 @@ class Worker:
         self.job_service = JobService()
         self.uuid = uuid.uuid4()
         self.node_delay = node_delay
+        self.backend = backend or InlineBackend()
+        self.result_cache = result_cache
+        self.profiler = profiler
+        self.profile_memory = profile_memory
+        self.plot_limits = plot_limits or {}
+        self.stream_buffer = stream_buffer
 
     async def run(self):
         logger.info(f"Worker {self.uuid} has started")
@@ -49,57 +67,284 @@ class Worker:
                 logger.error("Error in job: wrong arguments passed. Ignoring...")
                 continue
 
-            func = self.imported_functions.get(job.job_id, None)
-            if func is None:
-                raise ValueError(
-                    f"Function {job.job_id} not found in imported functions"
-                )
-            if self.signaler:
-                # signal the running node to the front-end:
-                await self.signaler.signal_current_running_node(
-                    job.jobset_id, job.job_id, func.__name__
-                )
+            await self.process_job(job)
+
+        logger.info(f"Worker {self.uuid} has finished")
+
+    async def process_job(self, job: JobInfo):
+        try:
+            response = await self.run_job(job)
+        except Exception as e:
+            # the producer waits for a response of every job it queued
+            logger.error(f"Error in job {job.job_id}: {e} {traceback.format_exc()}")
+            response = job_failure(job, e)
 
-            kwargs: dict[str, Any] = {
-                "ctrls": job.ctrls,
-                "previous_jobs": job.previous_jobs,
-                "observe_blocks": self.observe_blocks,
-                "jobset_id": job.jobset_id,
-                "node_id": job.job_id,
-                "job_id": job.iteration_id,
-            }
-
-            logger.debug("=" * 100)
-            logger.debug(f"Executing job {job.job_id}, kwargs = {kwargs}")
-
-            response = func(**kwargs)
-
-            match response:
-                case JobSuccess():
-                    logger.debug(f"Job finished: {job.job_id}, status: ok")
-                    if self.signaler:
-                        # send results to frontend
+        # put the job result (or failure) in the queue for producer to process
+        self.finish_queue.put(response)
+        self.task_queue.task_done()
+
+    async def run_job(self, job: JobInfo) -> JobSuccess | JobFailure:
+        func = self.get_function(job)
+        if self.signaler:
+            # signal the running node to the front-end:
+            await self.signaler.signal_current_running_node(
+                job.jobset_id, job.job_id, func.__name__
+            )
+
+        response = self.execute(func, job)
+
+        match response:
+            case JobSuccess():
+                logger.debug(f"Job finished: {job.job_id}, status: ok")
+                if self.signaler:
+                    # send results to frontend
+                    for node_id, name, result in get_node_results(func, job, response):
                         await self.signaler.signal_node_results(
-                            job.jobset_id, job.job_id, func.__name__, response.result
+                            job.jobset_id, node_id, name, result
                         )
 
-                case JobFailure():
-                    logger.debug(f"Job finished: {job.job_id}, status: failed")
-                    logger.error(
-                        f"Node {func.__name__} failed! reason: {response.error}"
+            case JobFailure():
+                logger.debug(f"Job finished: {job.job_id}, status: failed")
+                logger.error(f"Node {func.__name__} failed! reason: {response.error}")
+
+                if self.signaler:
+                    # signal to frontend that the node has failed
+                    node_id, name = get_failed_node(func, job, response)
+                    await self.signaler.signal_failed_nodes(
+                        job.jobset_id, node_id, name, response.error
                     )
 
-                    if self.signaler:
-                        # signal to frontend that the node has failed
-                        await self.signaler.signal_failed_nodes(
-                            job.jobset_id, job.job_id, func.__name__, response.error
-                        )
+                PipInstallThread.terminate_all()
 
-                    PipInstallThread.terminate_all()
-                    raise Exception(response.error)
+        return response
 
-            # put the job result in the queue for producer to process
-            self.finish_queue.put(response)
-            self.task_queue.task_done()
+    def get_function(self, job: JobInfo) -> Callable[..., Any]:
+        func = self.imported_functions.get(job.job_id, None)
+        if func is None:
+            raise ValueError(f"Function {job.job_id} not found in imported functions")
+        return func
 
-        logger.info(f"Worker {self.uuid} has finished")
+    def execute(
+        self, func: Callable[..., Any], job: JobInfo
+    ) -> JobSuccess | JobFailure:
+        """
+        Runs the job (or serves it from the result cache) and records its
+        profile. Blocking, the front-end is not signaled.
+        """
+        started_at = time.perf_counter()
+        kwargs: dict[str, Any] = {
+            "ctrls": job.ctrls,
+            "previous_jobs": job.previous_jobs,
+            "observe_blocks": self.observe_blocks,
+            "jobset_id": job.jobset_id,
+            "node_id": job.job_id,
+            "job_id": job.iteration_id,
+        }
+        if self.profile_memory:
+            kwargs["profile_memory"] = True
+        if self.stream_buffer:
+            kwargs["stream_buffer"] = self.stream_buffer
+        kwargs.update(self.plot_limits)
+
+        logger.debug("=" * 100)
+        logger.debug(f"Executing job {job.job_id}, kwargs = {kwargs}")
+
+        if job.chain:
+            return self.execute_chain(func, job, kwargs, started_at)
+
+        with use_block_namespace(func, job.jobset_id):
+            if job.consumers is not None and job.job_id not in self.observe_blocks:
+                get_block_job_service(func).set_job_consumers(
+                    job.iteration_id, job.consumers
+                )
+
+            response = self.get_cached_response(func, job)
+            if response is None:
+                response = self.backend.execute(func, job, kwargs)
+                self.cache_response(func, job, response)
+
+        if self.profiler:
+            self.profiler.record(
+                jobset_id=job.jobset_id,
+                node_id=job.job_id,
+                cmd=func.__name__,
+                queue_wait_time=started_at - job.queued_at,
+                wall_time=time.perf_counter() - started_at,
+                profile=getattr(response, "profile", None),
+                failed=isinstance(response, JobFailure),
+            )
+        return response
+
+    def execute_chain(
+        self,
+        func: Callable[..., Any],
+        job: JobInfo,
+        kwargs: dict[str, Any],
+        started_at: float,
+    ) -> JobSuccess | JobFailure:
+        """
+        Runs a fused chain, the job and the jobs of `job.chain`. Returns the
+        response of the last job that ran, on success carrying the responses of
+        the ones before it (`JobSuccess.fused`).
+        """
+        jobs = [job, *job.chain]
+        funcs = [func, *(self.get_function(member) for member in job.chain)]
+        kwargs_list = [kwargs]
+        for member in job.chain:
+            kwargs_list.append(
+                {
+                    **kwargs,
+                    "ctrls": member.ctrls,
+                    "previous_jobs": member.previous_jobs,
+                    "node_id": member.job_id,
+                    "job_id": member.iteration_id,
+                }
+            )
+
+        tail = jobs[-1]
+        with use_block_namespace(func, job.jobset_id):
+            if tail.consumers is not None:
+                get_block_job_service(func).set_job_consumers(
+                    tail.iteration_id, tail.consumers
+                )
+            responses = self.backend.execute_chain(funcs, jobs, kwargs_list)
+
+        if self.profiler:
+            queue_wait_time = started_at - job.queued_at
+            for member, member_func, response in zip(jobs, funcs, responses):
+                profile = getattr(response, "profile", None)
+                # the blocks of a chain run back to back, each one took its steps
+                wall_time = sum(
+                    value
+                    for key, value in (profile or {}).items()
+                    if key.endswith("_time")
+                )
+                self.profiler.record(
+                    jobset_id=job.jobset_id,
+                    node_id=member.job_id,
+                    cmd=member_func.__name__,
+                    queue_wait_time=queue_wait_time if member is job else 0.0,
+                    wall_time=wall_time,
+                    profile=profile,
+                    failed=isinstance(response, JobFailure),
+                )
+
+        response = responses[-1]
+        if isinstance(response, JobSuccess):
+            response.fused = responses[:-1]
+        return response
+
+    def get_cache_key(self, cache_key: str) -> str:
+        # the plots sent to the front-end depend on the resolution of the run
+        if not self.plot_limits:
+            return cache_key
+        limits = ",".join(f"{k}={v}" for k, v in sorted(self.plot_limits.items()))
+        return f"{cache_key}:{limits}"
+
+    def get_cached_response(
+        self, func: Any, job: JobInfo
+    ) -> JobSuccess | JobFailure | None:
+        if self.result_cache is None or job.cache_key is None:
+            return None
+        entry = self.result_cache.get(self.get_cache_key(job.cache_key))
+        if entry is None or entry.observed != (job.job_id in self.observe_blocks):
+            return None
+        logger.debug(f"Job {job.job_id} served from the result cache")
+        job_service = get_block_job_service(func)
+        job_service.post_job_result(job.iteration_id, entry.value)
+        # the inputs are not fetched, release them as the block would have
+        for prev_job in job.previous_jobs:
+            job_service.release_job_result(prev_job.get("job_id", ""))
+        return JobSuccess(
+            result=entry.frontend_result,
+            fn=func.__name__,
+            node_id=job.job_id,
+            jobset_id=job.jobset_id,
+        )
+
+    def cache_response(self, func: Any, job: JobInfo, response: Any):
+        if (
+            self.result_cache is None
+            or job.cache_key is None
+            or not isinstance(response, JobSuccess)
+        ):
+            return
+        job_service = get_block_job_service(func)
+        value = None
+        if job_service.job_exists(job.iteration_id):
+            try:
+                value = job_service.get_job_result(job.iteration_id)
+            except ValueError:
+                value = None  # block returned None
+        self.result_cache.put(
+            self.get_cache_key(job.cache_key),
+            CachedResult(
+                value=value,
+                frontend_result=response.result,
+                observed=job.job_id in self.observe_blocks,
+            ),
+        )
+
+
+def job_failure(job: JobInfo, error: Exception) -> JobFailure:
+    # failure of a job whose block didn't run, or whose outcome was lost
+    return JobFailure(
+        func_name=job.job_id.split("-")[0],
+        node_id=job.job_id,
+        error=str(error),
+        jobset_id=job.jobset_id,
+    )
+
+
+def get_node_results(
+    func: Callable[..., Any], job: JobInfo, response: JobSuccess
+) -> list[tuple[str, str, Any]]:
+    """
+    (node id, block name, result) of every job completed by the response, the
+    jobs of a fused chain in order.
+    """
+    if not job.chain:
+        return [(job.job_id, func.__name__, response.result)]
+    return [
+        (member.node_id, member.fn, member.result)
+        for member in [*response.fused, response]
+    ]
+
+
+def get_failed_node(
+    func: Callable[..., Any], job: JobInfo, response: JobFailure
+) -> tuple[str, str]:
+    # (node id, block name), any job of a fused chain can fail
+    if not job.chain:
+        return job.job_id, func.__name__
+    return response.node_id, response.func_name
+
+
+async def serve_jobs(
+    task_queue: Queue[Any],
+    get_worker: Callable[[str], Worker | None],
+    get_finish_queue: Callable[[str], Queue[Any] | None],
+):
+    """
+    Loop of the threads of the shared worker pool: each job runs with the
+    `Worker` of its jobset (see `Manager.get_run_worker`), jobs of the jobsets
+    that are no longer running are dropped. A job that can't be handed to its
+    worker fails in the `finish_queue` of its run.
+    """
+    while True:
+        queue_fetch = task_queue.get()
+        if isinstance(queue_fetch, PoisonPill):
+            break
+        job = cast(JobInfo, queue_fetch)
+        try:
+            worker = get_worker(job.jobset_id)
+        except Exception as e:
+            logger.error(f"Error in job {job.job_id}: {e} {traceback.format_exc()}")
+            finish_queue = get_finish_queue(job.jobset_id)
+            if finish_queue is not None:
+                finish_queue.put(job_failure(job, e))
+            continue
+        if worker is None:
+            logger.debug(f"Dropping job {job.job_id}, {job.jobset_id} is not running")
+            continue
+        await worker.process_job(job)
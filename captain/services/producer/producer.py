@@ -1,7 +1,8 @@
 import uuid
 from queue import Queue
-from typing import Any
+from typing import Any, Callable
 
+from captain.models.run_profile import RunProfiler
 from captain.types.worker import (
     InitFuncType,
     PoisonPill,
@@ -21,6 +22,8 @@ class Producer:
         queue_task: QueueTaskType,
         init_func: InitFuncType,
         signaler: Signaler | None = None,
+        run_profiler: RunProfiler | None = None,  # sends the run profile when done
+        on_done: Callable[[str], None] | None = None,  # called with the jobset id
     ) -> None:
         self.task_queue = task_queue
         self.finish_queue = finish_queue
@@ -29,6 +32,9 @@ class Producer:
         self.init_func = init_func  # function to run before starting the producer
         self.uuid = uuid.uuid4()
         self.signaler = signaler
+        self.run_profiler = run_profiler
+        self.on_done = on_done
+        self.profile_sent = False
 
     async def run(self):
         logger.debug(f"Producer {self.uuid} has started")
@@ -51,6 +57,9 @@ class Producer:
                 logger.debug(f"Producer {self.uuid} got no new tasks")
                 if self.signaler:
                     await self.signaler.signal_standby(finished_job_fetch.jobset_id)
+                await self.send_run_profile(finished_job_fetch.jobset_id)
+                if self.on_done:
+                    self.on_done(finished_job_fetch.jobset_id)
                 continue
 
             logger.debug(f"Producer {self.uuid} got new tasks: {new_tasks}")
@@ -63,3 +72,12 @@ class Producer:
             self.finish_queue.task_done()
 
         logger.debug(f"Producer {self.uuid} has finished")
+
+    async def send_run_profile(self, jobset_id: str):
+        if self.run_profiler is None or self.profile_sent:
+            return
+        self.run_profiler.finish(jobset_id)
+        profile = self.run_profiler.get_summary(jobset_id)
+        if self.signaler and profile is not None:
+            await self.signaler.signal_run_profile(jobset_id, profile)
+        self.profile_sent = True
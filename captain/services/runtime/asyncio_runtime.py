@@ -0,0 +1,225 @@
+import asyncio
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Awaitable, Callable, cast
+
+from pkgs.atlasvibe.atlasvibe import JobFailure
+from pkgs.atlasvibe.atlasvibe.atlasvibe_node_venv import PipInstallThread
+
+from captain.models.job_queue import QueueStats
+from captain.models.run_profile import RunProfiler
+from captain.models.topology import Topology
+from captain.services.consumer.worker import Worker, get_failed_node, get_node_results
+from captain.types.worker import JobInfo
+from captain.utils.broadcast import Signaler
+from captain.utils.logger import logger
+
+"""
+Runtime driving a flowchart from a single event loop.
+
+The thread runtime (`Worker` + `Producer` threads) hands jobs and responses over
+blocking queues and awaits every front-end signal before picking the next job.
+Here the dispatchers, the topology and the signals share one event loop: ready
+jobs go through an asyncio priority queue, blocks run in a thread pool and the
+signals are sent by a dedicated task, so dispatching the next job never waits
+on a websocket, unless `SIGNAL_QUEUE_SIZE` signals are already waiting. Blocks
+known to be quicker than the thread pool round trip (`INLINE_MAX_DURATION`)
+run directly on the loop.
+"""
+
+# smoothed duration (s) under which a block runs on the event loop, see `RunProfiler`
+INLINE_MAX_DURATION = 100e-6
+
+# front-end signals waiting to be sent, the dispatchers wait beyond
+SIGNAL_QUEUE_SIZE = 1024
+
+
+class _ReadyJobs:
+    """
+    Lets the `Topology` queue its jobs (it calls `put`) into the runtime.
+    """
+
+    def __init__(self, runtime: "AsyncRuntime"):
+        self.runtime = runtime
+
+    def put(self, job: JobInfo):
+        self.runtime.put_job(job)
+
+
+class AsyncRuntime:
+    def __init__(
+        self,
+        topology: Topology,
+        worker: Worker,  # runs the jobs, see `Worker.execute`
+        concurrency: int,
+        signaler: Signaler | None = None,
+        run_profiler: RunProfiler | None = None,  # sends the run profile when done
+        block_durations: dict[str, float] | None = None,  # block (cmd) -> duration
+        signal_stats: QueueStats | None = None,  # shared with other runtimes if given
+    ):
+        self.topology = topology
+        self.worker = worker
+        self.concurrency = concurrency
+        self.signaler = signaler
+        self.run_profiler = run_profiler
+        durations = block_durations or {}
+        self.inline_jobs = {
+            job_id
+            for job_id, cmd in topology.original_graph.nodes(data="cmd")
+            if durations.get(cmd, INLINE_MAX_DURATION + 1) <= INLINE_MAX_DURATION
+        }
+        self.executor = ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix="atlasvibe-block"
+        )
+        self.counter = itertools.count()
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.ready: asyncio.PriorityQueue[tuple[float, int, JobInfo | None]] | None = (
+            None
+        )
+        self.signals: asyncio.Queue[Callable[[], Awaitable[Any]] | None] | None = None
+        self.signal_stats = signal_stats or QueueStats()
+        self.stopped = False
+
+    async def run(self):
+        self.loop = asyncio.get_running_loop()
+        self.ready = asyncio.PriorityQueue()
+        self.signals = asyncio.Queue(SIGNAL_QUEUE_SIZE)
+        sender = asyncio.create_task(self.send_signals())
+        logger.info(f"Asyncio runtime started with {self.concurrency} dispatchers")
+        try:
+            self.topology.run(cast(Any, _ReadyJobs(self)))
+            await asyncio.gather(*(self.dispatch() for _ in range(self.concurrency)))
+        finally:
+            await self.signals.put(None)
+            await sender
+            self.executor.shutdown(wait=False)
+        logger.info("Asyncio runtime has finished")
+
+    def put_job(self, job: JobInfo):
+        if self.ready is not None:
+            self.ready.put_nowait((-job.priority, next(self.counter), job))
+
+    def stop(self):
+        """
+        Stops the dispatchers once their current job is done. Thread safe.
+        """
+        if self.loop is None or self.loop.is_closed():
+            self.stopped = True
+            return
+        try:
+            self.loop.call_soon_threadsafe(self.stop_dispatchers)
+        except RuntimeError:
+            pass  # loop already closed
+
+    def stop_dispatchers(self):
+        if self.stopped or self.ready is None:
+            return
+        self.stopped = True
+        for _ in range(self.concurrency):
+            self.ready.put_nowait((float("inf"), next(self.counter), None))
+
+    async def signal(self, send: Callable[..., Awaitable[Any]], *args: Any):
+        """
+        Queues a front-end signal, sent in order by `send_signals`. Waits while
+        the queue is full.
+        """
+        if self.signals is None:
+            return
+        item = partial(send, *args)
+        if self.signals.full():
+            stalled_at = time.perf_counter()
+            await self.signals.put(item)
+            self.signal_stats.record_stall(time.perf_counter() - stalled_at)
+        else:
+            self.signals.put_nowait(item)
+        self.signal_stats.record_put(self.signals.qsize())
+
+    async def send_signals(self):
+        # a single sender keeps the signals in order
+        assert self.signals is not None
+        while True:
+            send = await self.signals.get()
+            self.signal_stats.record_depth(self.signals.qsize())
+            if send is None:
+                break
+            try:
+                await send()
+            except Exception as e:
+                logger.error(f"Failed to signal the front-end: {e}")
+
+    async def dispatch(self):
+        assert self.loop is not None and self.ready is not None
+        signaler = self.signaler
+        while True:
+            _, _, job = await self.ready.get()
+            if job is None:
+                break
+
+            func = self.worker.get_function(job)
+            if signaler:
+                await self.signal(
+                    signaler.signal_current_running_node,
+                    job.jobset_id,
+                    job.job_id,
+                    func.__name__,
+                )
+
+            if job.job_id in self.inline_jobs:
+                response = self.worker.execute(func, job)
+            else:
+                response = await self.loop.run_in_executor(
+                    self.executor, self.worker.execute, func, job
+                )
+
+            if isinstance(response, JobFailure):
+                logger.error(f"Node {func.__name__} failed! reason: {response.error}")
+                if signaler:
+                    await self.signal(
+                        signaler.signal_failed_nodes,
+                        job.jobset_id,
+                        *get_failed_node(func, job, response),
+                        response.error,
+                    )
+                await self.loop.run_in_executor(
+                    self.executor, PipInstallThread.terminate_all
+                )
+                self.topology.process_worker_response(response)
+                self.stop_dispatchers()
+                break
+
+            if signaler:
+                for node_id, name, result in get_node_results(func, job, response):
+                    await self.signal(
+                        signaler.signal_node_results,
+                        job.jobset_id,
+                        node_id,
+                        name,
+                        result,
+                    )
+
+            if self.topology.node_delay:
+                # the topology sleeps the node delay, keep it off the loop
+                new_jobs = await self.loop.run_in_executor(
+                    self.executor, self.topology.process_worker_response, response
+                )
+            else:
+                new_jobs = self.topology.process_worker_response(response)
+
+            if new_jobs is None:
+                # the flowchart is done (or was cancelled)
+                if signaler:
+                    await self.signal(signaler.signal_standby, job.jobset_id)
+                if self.run_profiler is not None:
+                    self.run_profiler.finish(job.jobset_id)
+                    profile = self.run_profiler.get_summary(job.jobset_id)
+                    if signaler and profile is not None:
+                        await self.signal(
+                            signaler.signal_run_profile, job.jobset_id, profile
+                        )
+                self.stop_dispatchers()
+                break
+
+            for job_id in new_jobs:
+                self.topology.run_job(job_id, cast(Any, _ReadyJobs(self)))
@@ -0,0 +1,374 @@
+import asyncio
+import json
+import re
+import threading
+import time
+import uuid
+from copy import deepcopy
+from pathlib import Path
+from queue import Queue
+from typing import Any, Literal, cast
+
+import networkx as nx
+import numpy as np
+from pkgs.atlasvibe.atlasvibe.streaming import DEFAULT_STREAM_BUFFER
+from pkgs.atlasvibe.atlasvibe.utils import PlotlyJSONEncoder
+
+from captain.models.fusion import find_fused_chains
+from captain.models.result_cache import ResultCache, compute_cache_keys
+from captain.models.run_profile import RunProfiler
+from captain.models.scheduling_plan import SchedulingPlan
+from captain.models.topology import Topology
+from captain.services.consumer.backends import create_block_backend
+from captain.services.consumer.block_process_pool import BlockProcessPool
+from captain.services.consumer.worker import Worker
+from captain.services.runtime.asyncio_runtime import AsyncRuntime
+from captain.types.worker import WorkerBackendType
+from captain.utils.flowchart_graph import flowchart_to_nx_graph, get_flowchart_elements
+from captain.utils.import_blocks import get_block_daos, pre_import_functions
+from captain.utils.logger import logger
+
+"""
+Runs saved flowcharts without the server, e.g. for batch processing.
+
+The flowchart goes through the same `Topology`, `Worker` and block backends as a
+run started from the front-end, driven by the `AsyncRuntime`. The selected
+nodes (the sinks by default) are observed, a `ResultCollector` stands in for the
+websocket `Signaler` and keeps their results, which are then written to disk.
+A `HeadlessRunner` keeps its process pool, result cache and block profile
+between runs, so many flowcharts can run back to back in one warm process. A
+flowchart can also be prepared once and run many times with different ctrl
+values (see `captain.services.runtime.sweep`).
+"""
+
+OutputFormat = Literal["npz", "json"]
+
+DEFAULT_MAX_RUNTIME = 3000  # seconds, same as `PostWFC.maximumRuntime`
+
+
+class HeadlessRun:
+    def __init__(self, name: str, jobset_id: str):
+        self.name = name
+        self.jobset_id = jobset_id
+        self.errors: list[str] = []  # import errors or the node that failed
+        self.timed_out = False
+        self.outputs: dict[str, Any] = {}  # node id -> result of the selected nodes
+        self.labels: dict[str, str] = {}  # node id -> label of the selected nodes
+        self.files: dict[str, Path] = {}  # node id -> file written by `write_outputs`
+        self.profile: dict[str, Any] | None = None
+        self.run_time = 0.0
+
+    @property
+    def succeeded(self) -> bool:
+        return not self.errors and not self.timed_out
+
+
+class ResultCollector:
+    """
+    Receives the signals of the `AsyncRuntime` in place of the `Signaler`.
+    """
+
+    def __init__(self, run: HeadlessRun):
+        self.run = run
+
+    async def signal_current_running_node(self, *args: Any):
+        pass
+
+    async def signal_node_results(
+        self, jobset_id: str, node_id: str, func_name: str, result: Any
+    ):
+        if node_id not in self.run.labels or result is None:
+            return
+        # observed blocks send their DataContainer, visualizations their figure
+        data = result.get("data") if isinstance(result, dict) else None
+        self.run.outputs[node_id] = result if data is None else data
+
+    async def signal_failed_nodes(
+        self, jobset_id: str, node_id: str, func_name: str, error: str
+    ):
+        self.run.errors.append(f"{func_name} ({node_id}): {error}")
+
+    async def signal_standby(self, jobset_id: str):
+        pass
+
+    async def signal_run_profile(self, jobset_id: str, profile: dict[str, Any]):
+        self.run.profile = profile
+
+
+class PreparedFlowchart:
+    """
+    A flowchart compiled once to run it many times, e.g. with different ctrls:
+    its graph, scheduling plan and imported block functions, the node init
+    functions having been run in the `init_namespace` job store namespace.
+    """
+
+    def __init__(self, name: str, graph: nx.MultiDiGraph, selected: list[str]):
+        self.name = name
+        self.graph = graph
+        self.plan = SchedulingPlan(graph)
+        self.selected = selected  # observed node ids
+        self.labels = {node_id: graph.nodes[node_id]["label"] for node_id in selected}
+        self.init_namespace = str(uuid.uuid4())
+        self.functions: dict[str, Any] = {}
+        self.errors: list[str] = []
+
+
+class HeadlessRunner:
+    def __init__(
+        self,
+        worker_backend: WorkerBackendType = "thread",
+        max_workers: int = 4,
+        project_path: str | None = None,
+        incremental: bool = False,  # reuse the results of unchanged nodes
+        max_runtime: float = DEFAULT_MAX_RUNTIME,
+        fuse_chains: bool = False,  # run the linear chains of blocks as single jobs
+        stream_buffer: int = DEFAULT_STREAM_BUFFER,  # see `atlasvibe.streaming`
+    ):
+        self.worker_backend = worker_backend
+        self.max_workers = max_workers
+        self.project_path = project_path
+        self.incremental = incremental
+        self.max_runtime = max_runtime
+        self.fuse_chains = fuse_chains
+        self.stream_buffer = stream_buffer
+        self.result_cache = ResultCache()
+        self.run_profiler = RunProfiler()
+        self.block_process_pool: BlockProcessPool | None = None
+        self.pool_lock = threading.Lock()
+
+    def get_block_process_pool(self) -> BlockProcessPool:
+        # sized once for the widest run, so flowcharts of different widths
+        # (and runs going on in other threads) share the warm processes
+        with self.pool_lock:
+            if self.block_process_pool is None:
+                self.block_process_pool = BlockProcessPool(self.max_workers)
+            return self.block_process_pool
+
+    def close(self):
+        if self.block_process_pool is not None:
+            self.block_process_pool.shutdown()
+            self.block_process_pool = None
+
+    def prepare(
+        self,
+        flowchart: dict[str, Any],  # {nodes, edges} or a saved project
+        outputs: list[str] | None = None,  # node ids or labels, the sinks if None
+        name: str = "flowchart",
+    ) -> PreparedFlowchart:
+        graph = flowchart_to_nx_graph(get_flowchart_elements(flowchart))
+        prepared = PreparedFlowchart(name, graph, select_nodes(graph, outputs))
+        # the node init functions run in the new `init_namespace`, the job
+        # store of the other runs of the process (and their devices) is kept
+        topology = Topology(graph, prepared.init_namespace, plan=prepared.plan)
+        funcs, errs = pre_import_functions(
+            topology=topology, project_path=self.project_path
+        )
+        if errs:
+            logger.error(f"Preflight check of {name} failed! \n {', '.join(errs)}")
+        prepared.functions, prepared.errors = funcs, errs
+        return prepared
+
+    def release(self, prepared: PreparedFlowchart):
+        """
+        Frees the node init state of a prepared flowchart.
+        """
+        for dao in get_block_daos(prepared.functions):
+            dao.clear_namespace(prepared.init_namespace)
+
+    def run(
+        self,
+        flowchart: dict[str, Any],  # {nodes, edges} or a saved project
+        outputs: list[str] | None = None,  # node ids or labels, the sinks if None
+        name: str = "flowchart",
+    ) -> HeadlessRun:
+        start = time.perf_counter()
+        prepared = self.prepare(flowchart, outputs, name)
+        try:
+            run = self.run_prepared(prepared)
+        finally:
+            self.release(prepared)
+        run.run_time = time.perf_counter() - start
+        return run
+
+    def run_prepared(
+        self,
+        prepared: PreparedFlowchart,
+        ctrls: dict[str, dict[str, Any]] | None = None,  # node id -> ctrl -> value
+        name: str | None = None,
+    ) -> HeadlessRun:
+        """
+        Runs a prepared flowchart, with the values of some of its ctrls
+        replaced. Several prepared runs can go on at the same time in threads.
+        """
+        name = prepared.name if name is None else name
+        run = HeadlessRun(name, str(uuid.uuid4()))
+        run.labels = dict(prepared.labels)
+        if prepared.errors:
+            run.errors = list(prepared.errors)
+            return run
+        start = time.perf_counter()
+
+        graph = with_ctrl_values(prepared.graph, ctrls or {})
+        topology = Topology(graph=graph, jobset_id=run.jobset_id, plan=prepared.plan)
+        block_durations = self.run_profiler.get_block_durations()
+        topology.set_block_durations(block_durations)
+        self.run_profiler.start(run.jobset_id)
+        funcs = prepared.functions
+        daos = get_block_daos(funcs)
+        for dao in daos:
+            dao.share_node_init_containers(prepared.init_namespace, run.jobset_id)
+        if self.incremental:
+            topology.cache_keys = compute_cache_keys(topology, funcs)
+        if self.fuse_chains:
+            topology.fused_chains = find_fused_chains(
+                topology, funcs, prepared.selected
+            )
+
+        worker_number = topology.get_maximum_workers(maximum_capacity=self.max_workers)
+        worker = Worker(
+            task_queue=Queue(),
+            finish_queue=Queue(),
+            imported_functions=funcs,
+            observe_blocks=prepared.selected,
+            backend=create_block_backend(
+                funcs,
+                self.worker_backend,
+                self.get_block_process_pool,
+                self.project_path,
+            ),
+            result_cache=self.result_cache if self.incremental else None,
+            profiler=self.run_profiler,
+            stream_buffer=self.stream_buffer,
+        )
+        runtime = AsyncRuntime(
+            topology=topology,
+            worker=worker,
+            concurrency=worker_number,
+            signaler=cast(Any, ResultCollector(run)),
+            run_profiler=self.run_profiler,
+            block_durations=block_durations,
+        )
+        try:
+            asyncio.run(asyncio.wait_for(runtime.run(), self.max_runtime))
+        except TimeoutError:
+            logger.error(f"Maximum runtime exceeded, cancelling {name}")
+            topology.cancel()
+            run.timed_out = True
+        finally:
+            for dao in daos:
+                dao.clear_namespace(run.jobset_id)
+
+        run.run_time = time.perf_counter() - start
+        return run
+
+    def run_file(
+        self,
+        path: str | Path,
+        outputs: list[str] | None = None,
+        output_dir: str | Path | None = None,
+        output_format: OutputFormat = "npz",
+    ) -> HeadlessRun:
+        path = Path(path)
+        with open(path) as f:
+            flowchart = json.load(f)
+        run = self.run(flowchart, outputs, name=path.stem)
+        if output_dir is not None:
+            write_outputs(run, Path(output_dir) / path.stem, output_format)
+        return run
+
+
+def select_nodes(graph: nx.MultiDiGraph, outputs: list[str] | None) -> list[str]:
+    if outputs is None:
+        return [node_id for node_id in graph.nodes if graph.out_degree(node_id) == 0]
+    selected: list[str] = []
+    for output in outputs:
+        matches = [
+            node_id
+            for node_id, label in graph.nodes(data="label")
+            if output in (node_id, label)
+        ]
+        if not matches:
+            raise ValueError(f"No node with the id or label '{output}'")
+        selected.extend(node_id for node_id in matches if node_id not in selected)
+    return selected
+
+
+def with_ctrl_values(
+    graph: nx.MultiDiGraph, ctrls: dict[str, dict[str, Any]]
+) -> nx.MultiDiGraph:
+    """
+    Copy of the graph with the values of the given ctrls replaced, the
+    attributes of the other nodes are shared with `graph`.
+    """
+    if not ctrls:
+        return graph
+    graph = graph.copy()
+    for node_id, values in ctrls.items():
+        node_ctrls = deepcopy(graph.nodes[node_id].get("ctrls", {}))
+        for ctrl, value in values.items():
+            node_ctrls[ctrl]["value"] = value
+        graph.nodes[node_id]["ctrls"] = node_ctrls
+    return graph
+
+
+def write_outputs(
+    run: HeadlessRun, output_dir: Path, output_format: OutputFormat = "npz"
+) -> dict[str, Path]:
+    """
+    Writes every output of the run to `output_dir`, named after the node label
+    (or the node id when several outputs share it).
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    labels = list(run.labels.values())
+    for node_id, result in run.outputs.items():
+        label = run.labels.get(node_id, "")
+        name = label if label and labels.count(label) == 1 else node_id
+        name = re.sub(r"[^\w.-]", "_", name)
+        path = output_dir / f"{name}.{output_format}"
+        if output_format == "json":
+            with open(path, "w") as f:
+                json.dump(result, f, cls=PlotlyJSONEncoder)
+        else:
+            np.savez(path, **flatten_result(result))
+        run.files[node_id] = path
+    return run.files
+
+
+def flatten_result(result: Any, prefix: str = "") -> dict[str, np.ndarray]:
+    """
+    Arrays of a result keyed by their path (e.g. `x`, `fig.data`), numbers
+    become 0-d arrays and other values are stored as JSON strings.
+    """
+    if isinstance(result, dict):
+        arrays: dict[str, np.ndarray] = {}
+        for key, value in result.items():
+            arrays.update(flatten_result(value, f"{prefix}{key}."))
+        return arrays
+    key = prefix[:-1] or "result"
+    if result is None:
+        return {}
+    if isinstance(result, np.ndarray) and result.dtype.kind != "O":
+        return {key: result}
+    if isinstance(result, (bool, int, float, complex, np.generic)):
+        return {key: np.asarray(result)}
+    return {key: np.asarray(json.dumps(result, cls=PlotlyJSONEncoder))}
+
+
+def run_flowchart_files(
+    paths: list[str],
+    output_dir: str | Path,
+    outputs: list[str] | None = None,
+    output_format: OutputFormat = "npz",
+    **runner_kwargs: Any,  # see `HeadlessRunner`
+) -> list[HeadlessRun]:
+    runner = HeadlessRunner(**runner_kwargs)
+    runs: list[HeadlessRun] = []
+    try:
+        for path in paths:
+            run = runner.run_file(path, outputs, output_dir, output_format)
+            status = "done" if run.succeeded else "failed"
+            logger.info(f"{path}: {status} in {run.run_time:.3f}s")
+            runs.append(run)
+    finally:
+        runner.close()
+    return runs
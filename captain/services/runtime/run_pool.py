@@ -0,0 +1,69 @@
+import asyncio
+import contextvars
+import threading
+import traceback
+from queue import Queue
+from typing import Any, Callable, Coroutine
+
+from captain.types.worker import PoisonPill
+from captain.utils.logger import logger
+
+"""
+Long lived threads driving the runs of the `Manager`.
+
+Each thread keeps one event loop for its whole life and runs the coroutine of
+one run at a time: the `Producer` of a threaded run or the `AsyncRuntime` of an
+asyncio run. Every run starts from an empty `contextvars.Context`, so nothing a
+run sets in its context leaks into the next one. Threads are added when every
+thread is busy, a run never waits for another one to finish.
+"""
+
+RunTask = Callable[[], Coroutine[Any, Any, Any]]
+
+
+class RunPool:
+    def __init__(self):
+        self.tasks: Queue[RunTask | PoisonPill] = Queue()
+        self.threads: list[threading.Thread] = []
+        self.busy = 0  # submitted runs that are not done yet
+        self.lock = threading.Lock()
+
+    def submit(self, task: RunTask):
+        with self.lock:
+            self.busy += 1
+            if self.busy > len(self.threads):
+                self.spawn_thread()
+        self.tasks.put(task)
+
+    def prewarm(self, count: int):
+        """
+        Starts the threads (and their event loops) of `count` concurrent runs.
+        """
+        with self.lock:
+            while len(self.threads) < count:
+                self.spawn_thread()
+
+    def spawn_thread(self):
+        thread = threading.Thread(target=self.serve, daemon=True)
+        thread.start()
+        self.threads.append(thread)
+
+    def serve(self):
+        with asyncio.Runner() as runner:
+            while True:
+                task = self.tasks.get()
+                if isinstance(task, PoisonPill):
+                    break
+                try:
+                    runner.run(task(), context=contextvars.Context())
+                except Exception as e:
+                    logger.error(f"Error in run: {e} {traceback.format_exc()}")
+                finally:
+                    with self.lock:
+                        self.busy -= 1
+
+    def shutdown(self):
+        with self.lock:
+            threads, self.threads = self.threads, []
+        for _ in threads:
+            self.tasks.put(PoisonPill())
@@ -0,0 +1,160 @@
+import itertools
+import json
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+import networkx as nx
+import pandas as pd
+from pkgs.atlasvibe.atlasvibe.utils import PlotlyJSONEncoder
+
+from captain.services.runtime.headless import HeadlessRun, HeadlessRunner
+from captain.utils.logger import logger
+
+"""
+Runs one flowchart over a grid of ctrl values (a parameter sweep).
+
+Parameters are named `<node id or label>.<ctrl>`. The flowchart is prepared
+once (graph, scheduling plan, block imports and node init functions) and every
+variant runs it with its own ctrl values, in its own jobset. Results are cached
+by their inputs and ctrls, so the first variant runs alone to compute the nodes
+that don't depend on any swept parameter and the others, running in parallel,
+reuse them. The selected outputs of every variant are collected in one table.
+"""
+
+SweepGrid = dict[str, list[Any]]  # parameter -> values, swept as a cartesian product
+
+# DataContainer types reduced to their value in the table
+SCALAR_KEYS = {"Scalar": "c", "Boolean": "b", "String": "s"}
+
+
+class SweepResult:
+    def __init__(self, parameters: list[str], variants: list[dict[str, Any]]):
+        self.parameters = parameters
+        self.variants = variants
+        self.runs: list[HeadlessRun] = []
+
+    @property
+    def succeeded(self) -> bool:
+        return all(run.succeeded for run in self.runs)
+
+    def rows(self) -> list[dict[str, Any]]:
+        """
+        One row per variant: its parameter values, whether it succeeded and
+        its outputs, keyed by label (or node id when several share it).
+        """
+        rows: list[dict[str, Any]] = []
+        for values, run in zip(self.variants, self.runs):
+            labels = list(run.labels.values())
+            row = dict(values)
+            row["succeeded"] = run.succeeded
+            row["error"] = "timed out" if run.timed_out else "; ".join(run.errors)
+            for node_id, label in run.labels.items():
+                column = label if labels.count(label) == 1 else node_id
+                row[column] = table_value(run.outputs.get(node_id))
+            rows.append(row)
+        return rows
+
+    def to_dataframe(self) -> pd.DataFrame:
+        return pd.DataFrame(self.rows())
+
+    def write(self, path: str | Path) -> Path:
+        """
+        Writes the table as CSV (arrays are written as text) or JSON.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.suffix == ".csv":
+            self.to_dataframe().to_csv(path, index=False)
+        else:
+            with open(path, "w") as f:
+                json.dump(self.rows(), f, cls=PlotlyJSONEncoder)
+        return path
+
+
+def table_value(output: Any) -> Any:
+    if isinstance(output, dict) and output.get("type") in SCALAR_KEYS:
+        return output.get(SCALAR_KEYS[output["type"]])
+    return output
+
+
+def expand_grid(grid: SweepGrid | list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """
+    The variants of a sweep, a grid is expanded to every combination of its
+    values and a list of variants is used as is.
+    """
+    if isinstance(grid, list):
+        return [dict(variant) for variant in grid]
+    names = list(grid)
+    return [
+        dict(zip(names, values))
+        for values in itertools.product(*(grid[name] for name in names))
+    ]
+
+
+def resolve_parameter(graph: nx.MultiDiGraph, parameter: str) -> list[tuple[str, str]]:
+    """
+    The (node id, ctrl key) pairs set by a parameter, every node with the given
+    label gets the value.
+    """
+    node, _, ctrl = parameter.rpartition(".")
+    targets: list[tuple[str, str]] = []
+    for node_id, data in graph.nodes(data=True):
+        if node not in (node_id, data.get("label")):
+            continue
+        for key, value in data.get("ctrls", {}).items():
+            if ctrl in (key, value.get("param")):
+                targets.append((node_id, key))
+                break
+    if not targets:
+        raise ValueError(f"No node with the id or label '{node}' and a ctrl '{ctrl}'")
+    return targets
+
+
+def run_sweep(
+    flowchart: dict[str, Any],  # {nodes, edges} or a saved project
+    grid: SweepGrid | list[dict[str, Any]],
+    outputs: list[str] | None = None,  # node ids or labels, the sinks if None
+    max_parallel: int = 4,  # variants running at the same time
+    runner: HeadlessRunner | None = None,
+    name: str = "sweep",
+    **runner_kwargs: Any,  # see `HeadlessRunner`, when no runner is given
+) -> SweepResult:
+    variants = expand_grid(grid)
+    result = SweepResult(list(variants[0]) if variants else [], variants)
+    own_runner = runner is None
+    if runner is None:
+        runner = HeadlessRunner(incremental=True, **runner_kwargs)
+    if not runner.incremental:
+        logger.warning("Sweeping without a result cache, every variant runs fully")
+
+    prepared = runner.prepare(flowchart, outputs, name)
+    try:
+        targets = {
+            parameter: resolve_parameter(prepared.graph, parameter)
+            for variant in variants
+            for parameter in variant
+        }
+
+        def run_variant(index: int) -> HeadlessRun:
+            ctrls: dict[str, dict[str, Any]] = {}
+            for parameter, value in variants[index].items():
+                for node_id, ctrl in targets[parameter]:
+                    ctrls.setdefault(node_id, {})[ctrl] = value
+            run = runner.run_prepared(prepared, ctrls, f"{name}[{index}]")
+            logger.info(
+                f"{run.name} {variants[index]}: "
+                f"{'done' if run.succeeded else 'failed'} in {run.run_time:.3f}s"
+            )
+            return run
+
+        if variants:
+            # fills the cache with the results shared by every variant
+            result.runs.append(run_variant(0))
+        with ThreadPoolExecutor(max_workers=max(1, max_parallel)) as executor:
+            result.runs.extend(executor.map(run_variant, range(1, len(variants))))
+    finally:
+        runner.release(prepared)
+        if own_runner:
+            runner.close()
+    return result
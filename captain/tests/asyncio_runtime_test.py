@@ -0,0 +1,83 @@
+import asyncio
+import unittest
+from copy import deepcopy
+from queue import Queue
+from typing import Any, cast
+
+from pkgs.atlasvibe.atlasvibe import JobFailure, JobService, JobSuccess  # noqa: F401
+
+from captain.models.topology import Topology
+from captain.services.consumer.worker import Worker
+from captain.services.runtime.asyncio_runtime import AsyncRuntime
+
+from .test_apps.sample_app import graph as sample_app_graph
+
+SINE = "SINE-db665d87-c2af-4acd-916b-b97a815e69a7"
+CONSTANT = "CONSTANT-a357c1d7-0a1e-459b-bc03-faa48026e0e3"
+ADD = "ADD-b4cb003b-f34d-419e-bc95-452ab539c1ec"
+SCATTER = "SCATTER-8ac7a273-ef5f-4780-bc57-6c62c5ce507a"
+
+
+class RecordingSignaler:
+    def __init__(self):
+        self.signals: list[tuple[str, str]] = []
+
+    async def signal_current_running_node(self, jobset_id: str, node_id: str, *_):
+        self.signals.append(("running", node_id))
+
+    async def signal_node_results(self, jobset_id: str, node_id: str, *_):
+        self.signals.append(("results", node_id))
+
+    async def signal_failed_nodes(self, jobset_id: str, node_id: str, *_):
+        self.signals.append(("failed", node_id))
+
+    async def signal_standby(self, jobset_id: str):
+        self.signals.append(("standby", jobset_id))
+
+
+def run_sample_app(failing_node: str | None = None):
+    executed: list[str] = []
+
+    def block(node_id: str, jobset_id: str, **kwargs: Any):
+        executed.append(node_id)
+        if node_id == failing_node:
+            return JobFailure(
+                func_name=node_id, node_id=node_id, error="boom", jobset_id=jobset_id
+            )
+        return JobSuccess(result=None, fn=node_id, node_id=node_id, jobset_id=jobset_id)
+
+    graph = deepcopy(sample_app_graph)
+    topology = Topology(graph, "test_123")
+    signaler = RecordingSignaler()
+    worker = Worker(
+        task_queue=Queue(),
+        finish_queue=Queue(),
+        imported_functions={job_id: block for job_id in graph.nodes},
+        observe_blocks=[],
+    )
+    runtime = AsyncRuntime(topology, worker, 2, cast(Any, signaler))
+    asyncio.run(asyncio.wait_for(runtime.run(), timeout=10))
+    return executed, signaler.signals, topology
+
+
+class AsyncRuntimeTest(unittest.TestCase):
+    # test that every node runs after its dependencies and standby is signaled last
+    def test_runs_flowchart(self):
+        executed, signals, topology = run_sample_app()
+        assert sorted(executed) == sorted(sample_app_graph.nodes)
+        assert executed.index(ADD) > executed.index(CONSTANT)
+        assert executed.index(ADD) > executed.index(SINE)
+        assert executed.index(SCATTER) > executed.index(ADD)
+        assert topology.is_finished()
+        assert signals[-1] == ("standby", "test_123")
+        for node_id in executed:
+            assert signals.index(("running", node_id)) < signals.index(
+                ("results", node_id)
+            )
+
+    # test that a failed node stops the run without scheduling its successors
+    def test_failure_stops_run(self):
+        executed, signals, _ = run_sample_app(failing_node=ADD)
+        assert SCATTER not in executed
+        assert ("failed", ADD) in signals
+        assert ("standby", "test_123") not in signals
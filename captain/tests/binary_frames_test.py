@@ -0,0 +1,59 @@
+import json
+import unittest
+
+import numpy as np
+import plotly.graph_objects as go
+
+from captain.types.worker import WorkerJobResponse
+from captain.utils.binary_frames import decode_frame, encode_frame
+
+
+def node_results(result: dict):
+    return WorkerJobResponse(
+        jobset_id="test_123", result=result, cmd="SINE", node_id="A"
+    )
+
+
+class BinaryFramesTest(unittest.TestCase):
+    # test that arrays survive a round trip with their dtype, shape and NaN
+    def test_round_trip(self):
+        x = np.linspace(0, 1, 1001)
+        y = np.sin(x)
+        y[3] = np.nan
+        matrix = np.arange(12, dtype=np.int32).reshape(3, 4)
+        flags = np.array([True, False, True])
+        message = node_results(
+            {"data": {"type": "OrderedPair", "x": x, "y": y, "m": matrix}, "f": flags}
+        )
+        decoded = decode_frame(encode_frame(message))
+        data = decoded["NODE_RESULTS"]["result"]["data"]
+        assert data["type"] == "OrderedPair"
+        np.testing.assert_array_equal(data["x"], x)
+        np.testing.assert_array_equal(data["y"], y)
+        np.testing.assert_array_equal(data["m"], matrix)
+        assert data["m"].dtype == np.int32
+        np.testing.assert_array_equal(decoded["NODE_RESULTS"]["result"]["f"], flags)
+        assert decoded["jobsetId"] == "test_123"
+
+    # test that the buffers are aligned and the header only holds references
+    def test_layout(self):
+        y = np.arange(1_000_000, dtype=np.float64)
+        frame = encode_frame(node_results({"y": y[::2], "z": y.astype(">f4")}))
+        header_size = int.from_bytes(frame[4:8], "little")
+        header = json.loads(frame[8 : 8 + header_size])
+        assert header_size < 1000
+        start = 8 + header_size + (-(8 + header_size) % 8)
+        for spec in header["buffers"]:
+            assert (start + spec["offset"]) % 8 == 0
+        assert [spec["dtype"] for spec in header["buffers"]] == ["<f8", "<f4"]
+        decoded = decode_frame(frame)["NODE_RESULTS"]["result"]
+        np.testing.assert_array_equal(decoded["y"], y[::2])
+        np.testing.assert_array_equal(decoded["z"], y.astype(np.float32))
+
+    # test that the arrays of plotly figures are sent as buffers
+    def test_plotly_figure(self):
+        x = np.arange(100, dtype=np.float64)
+        fig = go.Figure(data=[go.Scatter(x=x, y=x * 2)])
+        decoded = decode_frame(encode_frame(node_results({"plotly_fig": fig})))
+        trace = decoded["NODE_RESULTS"]["result"]["plotly_fig"]["data"][0]
+        np.testing.assert_array_equal(trace["y"], x * 2)
@@ -0,0 +1,249 @@
+import asyncio
+import threading
+import time
+import unittest
+from contextvars import ContextVar
+from copy import deepcopy
+from queue import Full, Queue
+from typing import Any
+from unittest.mock import patch
+
+from pkgs.atlasvibe.atlasvibe import JobFailure, JobService, JobSuccess
+
+from captain.internal.manager import Manager
+from captain.models.job_queue import BoundedQueue, FairJobQueue
+from captain.models.topology import Topology
+from captain.services.consumer.worker import Worker, serve_jobs
+from captain.services.runtime.run_pool import RunPool
+from captain.types.worker import JobInfo, PoisonPill
+from captain.utils.flowchart_utils import (
+    cancel_when_max_time,
+    spawn_producer,
+    spawn_workers,
+)
+
+from .test_apps.sample_app import graph as sample_app_graph
+
+
+def job(jobset_id: str, job_id: str, priority: float = 0):
+    return JobInfo(
+        job_id=job_id,
+        jobset_id=jobset_id,
+        iteration_id=job_id,
+        ctrls={},
+        previous_jobs=[],
+        priority=priority,
+    )
+
+
+class FairJobQueueTest(unittest.TestCase):
+    # test that the jobsets are served in turn, each one by priority
+    def test_round_robin(self):
+        queue = FairJobQueue()
+        for job_id, priority in [("a1", 1), ("a2", 3), ("a3", 2)]:
+            queue.put(job("A", job_id, priority))
+        queue.put(job("B", "b1"))
+        queue.put(PoisonPill())
+        queue.put(job("B", "b2"))
+        served = [queue.get() for _ in range(6)]
+        assert [getattr(item, "job_id", None) for item in served] == [
+            "a2",
+            "b1",
+            "a3",
+            "b2",
+            "a1",
+            None,
+        ]
+
+    # test that the jobs of a stopped jobset are dropped
+    def test_discard(self):
+        queue = FairJobQueue()
+        queue.put(job("A", "a1"))
+        queue.put(job("B", "b1"))
+        queue.discard("A")
+        assert queue.qsize() == 1
+        assert queue.get().job_id == "b1"
+
+
+class BoundedQueueTest(unittest.TestCase):
+    # test that a put waits for a get when the queue is full, and is recorded
+    def test_put_waits_when_full(self):
+        queue = BoundedQueue(2)
+        queue.put(1)
+        queue.put(2)
+        with self.assertRaises(Full):
+            queue.put(3, timeout=0.01)
+
+        putter = threading.Thread(target=queue.put, args=(3,), daemon=True)
+        putter.start()
+        putter.join(0.1)
+        assert putter.is_alive()
+        assert queue.get() == 1
+        putter.join(1)
+        assert not putter.is_alive()
+        queue.put(PoisonPill())  # never held back
+        stats = queue.stats.summary()
+        assert stats["stalls"] == 2 and stats["stall_time"] >= 0.1
+        assert stats["max_depth"] == 3
+
+    # test that the overflow condition and closing the queue let a put through
+    def test_overflow_and_close(self):
+        backlogged = threading.Event()
+        queue = BoundedQueue(1, overflow=backlogged.is_set)
+        queue.put(1)
+        putter = threading.Thread(target=queue.put, args=(2,), daemon=True)
+        putter.start()
+        putter.join(0.1)
+        assert putter.is_alive()
+        backlogged.set()
+        putter.join(1)
+        assert queue.qsize() == 2
+
+        queue = BoundedQueue(1)
+        queue.put(1)
+        putter = threading.Thread(target=queue.put, args=(2,), daemon=True)
+        putter.start()
+        queue.close()
+        putter.join(1)
+        assert not putter.is_alive()
+
+
+class ConcurrentRunsTest(unittest.TestCase):
+    # test that two jobsets run side by side, each one seeing only its own results
+    def test_runs_are_isolated(self):
+        self.run_jobsets()
+
+    # test that the runs don't deadlock when the producers and workers hold each other back
+    def test_runs_with_small_queues(self):
+        with (
+            patch("captain.internal.manager.TASK_QUEUE_SIZE", 1),
+            patch("captain.internal.manager.RESULT_QUEUE_SIZE", 1),
+        ):
+            manager = self.run_jobsets()
+        stats = manager.get_queue_stats()
+        assert stats["tasks"]["puts"] > 0 and stats["results"]["puts"] > 0
+        assert stats["results"]["max_depth"] <= 2  # the poison pill goes on top
+
+    def run_jobsets(self) -> Manager:
+        seen: list[tuple[str, str, Any]] = []
+        lock = threading.Lock()
+
+        def block(
+            node_id: str, jobset_id: str, previous_jobs: list[dict[str, str]], **_: Any
+        ):
+            job_service = JobService()
+            with lock:
+                for prev_job in previous_jobs:
+                    seen.append(
+                        (
+                            jobset_id,
+                            node_id,
+                            job_service.get_job_result(prev_job["job_id"]),
+                        )
+                    )
+            time.sleep(0.01)
+            job_service.post_job_result(node_id, jobset_id)
+            return JobSuccess(
+                result=None, fn="block", node_id=node_id, jobset_id=jobset_id
+            )
+
+        manager = Manager()
+        funcs = {node_id: block for node_id in sample_app_graph.nodes}
+        for jobset_id in ["bench_1", "bench_2"]:
+            graph = deepcopy(sample_app_graph)
+            run = manager.start_run(jobset_id, Topology(graph, jobset_id))
+            spawn_workers(manager, run, funcs, [], 0, 2)
+            spawn_producer(manager, run)
+
+        deadline = time.time() + 10
+        while manager.runs and time.time() < deadline:
+            time.sleep(0.01)
+        for _ in manager.pool_threads:
+            manager.task_queue.put(PoisonPill())
+
+        assert manager.runs == {}
+        assert len(manager.pool_threads) == 2
+        assert {jobset_id for jobset_id, _, _ in seen} == {"bench_1", "bench_2"}
+        for jobset_id, node_id, result in seen:
+            assert result == jobset_id, f"{node_id} of {jobset_id} read {result}"
+        # the results of both jobsets were freed when they finished
+        assert set(JobService().dao.namespaces) == {None}
+        return manager
+
+    # test that the timer of a replaced run doesn't cancel the run posted after it
+    def test_max_runtime_of_replaced_run(self):
+        manager = Manager()
+        graph = deepcopy(sample_app_graph)
+        first = manager.start_run("test_123", Topology(graph, "test_123"))
+        second = manager.start_run("test_123", Topology(graph, "test_123"))
+        with patch("captain.utils.flowchart_utils.Signaler") as signaler:
+            asyncio.run(cancel_when_max_time(manager, first, 0))
+        assert manager.get_run("test_123") is second
+        assert not second.topology.is_cancelled()
+        signaler.assert_not_called()
+        manager.end_run("test_123")
+
+
+class ServeJobsTest(unittest.TestCase):
+    # test that a job failing before its block runs still answers the producer
+    def test_errors_before_the_block_fail_the_job(self):
+        tasks = FairJobQueue()
+        finish_queue: Queue[Any] = Queue()
+        worker = Worker(
+            task_queue=tasks,
+            finish_queue=finish_queue,
+            imported_functions={},  # unknown block
+            observe_blocks=[],
+        )
+
+        def get_worker(jobset_id: str):
+            if jobset_id == "B":
+                raise RuntimeError("no worker for B")
+            return worker
+
+        tasks.put(job("A", "ADD-1"))
+        tasks.put(job("B", "ADD-2"))
+        tasks.put(PoisonPill())
+        asyncio.run(serve_jobs(tasks, get_worker, lambda _: finish_queue))
+
+        failures = [finish_queue.get_nowait() for _ in range(2)]
+        assert all(isinstance(failure, JobFailure) for failure in failures)
+        assert [failure.node_id for failure in failures] == ["ADD-1", "ADD-2"]
+        assert "not found" in failures[0].error
+        assert failures[1].error == "no worker for B"
+        assert failures[1].jobset_id == "B"
+
+
+class RunPoolTest(unittest.TestCase):
+    # test that successive runs reuse one thread and start from a clean context
+    def test_runs_reuse_threads(self):
+        pool = RunPool()
+        run_var: ContextVar[str | None] = ContextVar("run_var", default=None)
+        done: Queue[tuple[threading.Thread, str | None]] = Queue()
+
+        async def run():
+            done.put((threading.current_thread(), run_var.get()))
+            run_var.set("previous run")
+
+        pool.prewarm(1)
+        seen = []
+        for _ in range(3):
+            pool.submit(run)
+            seen.append(done.get(timeout=5))
+            while pool.busy:  # the run is done once its coroutine returned
+                time.sleep(0.001)
+        assert len({thread for thread, _ in seen}) == 1
+        assert [value for _, value in seen] == [None, None, None]
+
+        # a run waiting on another one gets its own thread
+        release = threading.Event()
+
+        async def blocking_run():
+            release.wait(5)
+
+        pool.submit(blocking_run)
+        pool.submit(run)
+        done.get(timeout=1)  # while the first one is still running
+        release.set()
+        assert len(pool.threads) == 2
+        pool.shutdown()
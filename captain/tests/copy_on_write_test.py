@@ -0,0 +1,96 @@
+import unittest
+
+import networkx as nx
+import numpy as np
+from pkgs.atlasvibe.atlasvibe import OrderedPair, Scalar, atlasvibe, writable
+
+from captain.services.runtime.headless import HeadlessRunner, PreparedFlowchart
+
+SIZE = 100_000
+
+
+@atlasvibe
+def SOURCE() -> OrderedPair:
+    x = np.arange(SIZE, dtype=float)
+    return OrderedPair(x=x, y=x)
+
+
+@atlasvibe
+def TOTAL(default: OrderedPair) -> Scalar:
+    return Scalar(c=float(np.sum(default.y)))
+
+
+@atlasvibe
+def SHIFT(default: OrderedPair) -> OrderedPair:
+    y = writable(default.y)
+    y += 1
+    return OrderedPair(x=default.x, y=y)
+
+
+@atlasvibe(copy_inputs=True)
+def NEGATE(default: OrderedPair) -> OrderedPair:
+    default.y *= -1  # in place, on a private copy
+    return OrderedPair(x=default.x, y=default.y)
+
+
+@atlasvibe
+def SQUARE(default: OrderedPair) -> OrderedPair:
+    default.y **= 2  # in place, on the shared input
+    return OrderedPair(x=default.x, y=default.y)
+
+
+# SOURCE -> TOTAL, SHIFT, NEGATE
+def prepare_fan_out(writer=NEGATE) -> PreparedFlowchart:
+    functions = {"SOURCE": SOURCE, "TOTAL": TOTAL, "SHIFT": SHIFT, "NEGATE": writer}
+    graph = nx.MultiDiGraph()
+    for node_id in functions:
+        graph.add_node(node_id, cmd=node_id, label=node_id, ctrls={})
+    for target in ["TOTAL", "SHIFT", "NEGATE"]:
+        graph.add_edge(
+            "SOURCE", target, label="default", target_label="default", multiple=False
+        )
+    prepared = PreparedFlowchart("fan_out", graph, list(functions))
+    prepared.functions = functions
+    return prepared
+
+
+class CopyOnWriteTest(unittest.TestCase):
+    # test that the consumers share the source arrays and only the writers copy them
+    def test_fan_out_copies_only_for_writers(self):
+        runner = HeadlessRunner()
+        prepared = prepare_fan_out()
+        try:
+            run = runner.run_prepared(prepared)
+        finally:
+            runner.release(prepared)
+            runner.close()
+        assert run.succeeded, run.errors
+
+        source = np.arange(SIZE, dtype=float)
+        assert run.outputs["TOTAL"]["c"] == source.sum()
+        np.testing.assert_array_equal(run.outputs["SHIFT"]["y"], source + 1)
+        np.testing.assert_array_equal(run.outputs["NEGATE"]["y"], -source)
+        np.testing.assert_array_equal(run.outputs["SOURCE"]["y"], source)
+
+        assert run.profile is not None
+        nodes = {node["node_id"]: node for node in run.profile["nodes"]}
+        assert nodes["TOTAL"]["copies"] == 0
+        assert nodes["SHIFT"]["copies"] == 1
+        # both arrays of the input were copied for the block
+        assert nodes["NEGATE"]["copies"] == 2
+        assert run.profile["copied_bytes"] == 3 * source.nbytes
+
+    # test that a block writing to a shared input fails instead of running twice
+    def test_write_to_shared_input_fails(self):
+        runner = HeadlessRunner()
+        prepared = prepare_fan_out(writer=SQUARE)
+        try:
+            run = runner.run_prepared(prepared)
+        finally:
+            runner.release(prepared)
+            runner.close()
+        assert not run.succeeded
+        assert any("writable(array)" in error for error in run.errors), run.errors
+        np.testing.assert_array_equal(
+            run.outputs["SOURCE"]["y"], np.arange(SIZE, dtype=float)
+        )
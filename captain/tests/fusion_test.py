@@ -0,0 +1,137 @@
+import unittest
+from collections import Counter
+from typing import Any
+from unittest.mock import patch
+
+import numpy as np
+from pkgs.atlasvibe.atlasvibe import JobService, Vector, atlasvibe
+
+from captain.models.fusion import find_fused_chains
+from captain.models.topology import Topology
+from captain.services.runtime.headless import HeadlessRunner
+from captain.utils.flowchart_graph import flowchart_to_nx_graph
+
+
+@atlasvibe
+def SOURCE() -> Vector:
+    return Vector(v=np.arange(4.0))
+
+
+@atlasvibe
+def SCALE(default: Vector, factor: float = 1.0) -> Vector:
+    if factor == 0:
+        raise ValueError("factor can't be 0")
+    return Vector(v=default.v * factor)
+
+
+@atlasvibe
+def ADD(a: Vector, b: Vector) -> Vector:
+    return Vector(v=a.v + b.v)
+
+
+def make_node(node_id: str, func: str, inputs: list[str], factor: float = 1.0):
+    ctrls = {}
+    if func == "SCALE":
+        ctrls["factor"] = {"param": "factor", "value": factor, "type": "float"}
+    return {
+        "id": node_id,
+        "position": {"x": 0, "y": 0},
+        "data": {
+            "func": func,
+            "label": node_id,
+            "ctrls": ctrls,
+            "inputs": [
+                {"id": name, "name": name, "multiple": False} for name in inputs
+            ],
+        },
+    }
+
+
+def make_edge(source: str, target: str, input_name: str = "default"):
+    return {
+        "id": f"{source}->{target}",
+        "source": source,
+        "target": target,
+        "sourceHandle": "default",
+        "targetHandle": input_name,
+    }
+
+
+# SOURCE -> X2 -> X3 -> X5 -> ADD.a, OTHER -> ADD.b, ADD -> SINK
+def make_flowchart(failing: str = "") -> dict[str, Any]:
+    factors = {"X2": 2.0, "X3": 3.0, "X5": 5.0, "SINK": 1.0}
+    nodes = [make_node("SOURCE", "SOURCE", []), make_node("OTHER", "SOURCE", [])]
+    for node_id, factor in factors.items():
+        nodes.append(
+            make_node(
+                node_id, "SCALE", ["default"], 0 if node_id == failing else factor
+            )
+        )
+    nodes.append(make_node("ADD", "ADD", ["a", "b"]))
+    edges = [
+        make_edge("SOURCE", "X2"),
+        make_edge("X2", "X3"),
+        make_edge("X3", "X5"),
+        make_edge("X5", "ADD", "a"),
+        make_edge("OTHER", "ADD", "b"),
+        make_edge("ADD", "SINK"),
+    ]
+    return {"nodes": nodes, "edges": edges}
+
+
+def run_flowchart(flowchart: dict[str, Any], fuse_chains: bool):
+    blocks = {"SOURCE": SOURCE, "SCALE": SCALE, "ADD": ADD}
+    funcs = {node["id"]: blocks[node["data"]["func"]] for node in flowchart["nodes"]}
+    posted: Counter[str] = Counter()
+    post_job_result = JobService.post_job_result
+
+    def record_post(self: JobService, job_id: str, result: Any):
+        posted[job_id] += 1
+        return post_job_result(self, job_id, result)
+
+    with (
+        patch(
+            "captain.services.runtime.headless.pre_import_functions",
+            return_value=(funcs, []),
+        ),
+        patch.object(JobService, "post_job_result", record_post),
+    ):
+        runner = HeadlessRunner(max_workers=2, fuse_chains=fuse_chains)
+        return runner.run(flowchart, ["SINK"]), posted
+
+
+class FusionTest(unittest.TestCase):
+    # test that the linear chain is found, the join and the observed sink are left out
+    def test_find_fused_chains(self):
+        flowchart = make_flowchart()
+        topology = Topology(flowchart_to_nx_graph(flowchart), "fusion_test")
+        funcs = {node["id"]: SCALE for node in flowchart["nodes"]}
+        assert find_fused_chains(topology, funcs, ["SINK"]) == {
+            "SOURCE": ["X2", "X3", "X5"]
+        }
+        assert find_fused_chains(topology, funcs, ["X3"]) == {
+            "SOURCE": ["X2"],
+            "ADD": ["SINK"],
+        }
+        # plain functions can't receive their inputs directly
+        assert find_fused_chains(topology, {"SOURCE": lambda: None}, []) == {}
+
+    # test that a fused run gives the same result without posting the intermediates
+    def test_fused_run(self):
+        run, posted = run_flowchart(make_flowchart(), fuse_chains=False)
+        assert run.succeeded
+        np.testing.assert_array_equal(run.outputs["SINK"]["v"], np.arange(4.0) * 31)
+        assert set(posted) == {"SOURCE", "X2", "X3", "X5", "OTHER", "ADD", "SINK"}
+
+        run, posted = run_flowchart(make_flowchart(), fuse_chains=True)
+        assert run.succeeded
+        np.testing.assert_array_equal(run.outputs["SINK"]["v"], np.arange(4.0) * 31)
+        assert set(posted) == {"X5", "OTHER", "ADD", "SINK"}
+        profiled = {node["node_id"] for node in run.profile["nodes"]}
+        assert profiled >= {"SOURCE", "X2", "X3", "X5"}
+
+    # test that the job failing inside a chain is the one reported
+    def test_failure_inside_chain(self):
+        run, _ = run_flowchart(make_flowchart(failing="X3"), fuse_chains=True)
+        assert not run.succeeded
+        assert run.errors == ["SCALE (X3): factor can't be 0"]
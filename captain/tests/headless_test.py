@@ -0,0 +1,69 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+import numpy as np
+from pkgs.atlasvibe.atlasvibe import JobFailure, JobService, JobSuccess  # noqa: F401
+
+from captain.services.runtime.headless import HeadlessRunner, write_outputs
+
+from .test_apps.sample_app import sample_app
+
+ADD = "ADD-b4cb003b-f34d-419e-bc95-452ab539c1ec"
+SCATTER = "SCATTER-8ac7a273-ef5f-4780-bc57-6c62c5ce507a"
+HISTOGRAM = "HISTOGRAM-d53932d3-1dce-4320-a135-906b046cbe82"
+
+
+def run_sample_app(outputs: list[str] | None = None, failing_node: str = ""):
+    def block(node_id: str, jobset_id: str, observe_blocks: list[str], **kwargs: Any):
+        if node_id == failing_node:
+            return JobFailure(
+                func_name="BLOCK", node_id=node_id, error="boom", jobset_id=jobset_id
+            )
+        result = None
+        if node_id in observe_blocks:
+            result = {"data": {"x": np.arange(3.0), "label": node_id.split("-")[0]}}
+        return JobSuccess(
+            result=result, fn="BLOCK", node_id=node_id, jobset_id=jobset_id
+        )
+
+    flowchart = json.loads(sample_app)
+    funcs = {node["id"]: block for node in flowchart["nodes"]}
+    with patch(
+        "captain.services.runtime.headless.pre_import_functions",
+        return_value=(funcs, []),
+    ):
+        runner = HeadlessRunner(max_workers=2)
+        # saved projects keep the flowchart under rfInstance
+        return runner.run({"rfInstance": flowchart}, outputs)
+
+
+class HeadlessRunnerTest(unittest.TestCase):
+    # test that the sinks are the default outputs and are written to disk
+    def test_writes_sink_outputs(self):
+        run = run_sample_app()
+        assert run.succeeded
+        assert sorted(run.outputs) == sorted([SCATTER, HISTOGRAM])
+        assert run.profile is not None
+        with tempfile.TemporaryDirectory() as output_dir:
+            files = write_outputs(run, Path(output_dir))
+            assert files[SCATTER].name == "SCATTER.npz"
+            with np.load(files[SCATTER]) as saved:
+                np.testing.assert_array_equal(saved["x"], np.arange(3.0))
+                assert saved["label"] == '"SCATTER"'
+
+    # test that outputs are selected by label and a failure is reported
+    def test_selected_outputs_and_failure(self):
+        run = run_sample_app(outputs=["ADD"])
+        assert list(run.outputs) == [ADD]
+
+        run = run_sample_app(outputs=["ADD"], failing_node=ADD)
+        assert not run.succeeded
+        assert run.outputs == {}
+        assert run.errors == [f"block ({ADD}): boom"]
+
+        with self.assertRaises(ValueError):
+            run_sample_app(outputs=["MISSING"])
@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+from types import ModuleType
+from typing import Any
+from unittest.mock import patch
+
+import networkx as nx
+
+from captain.models.topology import Topology
+from captain.utils import import_blocks
+from captain.utils.import_blocks import pre_import_functions
+
+
+def make_module(cmd: str, path: str, calls: dict[str, int], preflight_error: str):
+    module = ModuleType(cmd)
+    module.__file__ = path
+
+    def preflight():
+        calls["preflight"] += 1
+        if preflight_error:
+            raise RuntimeError(preflight_error)
+
+    setattr(preflight, "is_atlasvibe_preflight", True)
+    setattr(module, cmd, lambda **kwargs: None)
+    setattr(module, "preflight", preflight)
+    return module
+
+
+class ImportBlocksTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.calls = {"import": 0, "preflight": 0}
+        self.preflight_error = ""
+        patcher = patch.dict(import_blocks._imported_blocks, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.dir.cleanup)
+
+    def get_module(self, cmd: str, project_path: Any = None):
+        self.calls["import"] += 1
+        path = os.path.join(self.dir.name, f"{cmd}.py")
+        if not os.path.exists(path):
+            open(path, "w").close()
+        return make_module(cmd, path, self.calls, self.preflight_error)
+
+    def pre_import(self):
+        graph = nx.MultiDiGraph()
+        for i in range(5):
+            graph.add_node(f"BLOCK-{i}", cmd="BLOCK", init_ctrls={})
+        graph.add_node("OTHER-0", cmd="OTHER", init_ctrls={})
+        with patch.object(import_blocks, "get_module_func", self.get_module):
+            return pre_import_functions(Topology(graph, "import_test"))
+
+    # test that a block type is imported and checked once, across runs
+    def test_blocks_are_cached(self):
+        for _ in range(3):
+            functions, errors = self.pre_import()
+            assert errors == {}
+            assert len(functions) == 6
+        assert self.calls == {"import": 2, "preflight": 2}
+
+        # a block whose file changed is imported and checked again
+        path = os.path.join(self.dir.name, "BLOCK.py")
+        os.utime(path, (0, os.path.getmtime(path) + 10))
+        self.pre_import()
+        assert self.calls == {"import": 3, "preflight": 3}
+
+    # test that a failing preflight fails every node and runs again next time
+    def test_failed_preflight(self):
+        self.preflight_error = "device not found"
+        _, errors = self.pre_import()
+        assert errors == {
+            **{f"BLOCK-{i}": "device not found" for i in range(5)},
+            "OTHER-0": "device not found",
+        }
+        assert self.calls["preflight"] == 2
+        self.pre_import()
+        assert self.calls == {"import": 2, "preflight": 4}
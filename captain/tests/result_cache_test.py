@@ -0,0 +1,136 @@
+import os
+import tempfile
+import unittest
+from copy import deepcopy
+from queue import Queue
+
+import networkx as nx
+import numpy as np
+
+from captain.models.result_cache import CachedResult, ResultCache, compute_cache_keys
+from captain.models.topology import Topology
+from captain.services.consumer.worker import Worker
+from captain.types.worker import JobInfo, JobSuccess
+
+from .test_apps.sample_app import graph as sample_app_graph
+
+SINE = "SINE-db665d87-c2af-4acd-916b-b97a815e69a7"
+CONSTANT = "CONSTANT-a357c1d7-0a1e-459b-bc03-faa48026e0e3"
+ADD = "ADD-b4cb003b-f34d-419e-bc95-452ab539c1ec"
+SCATTER = "SCATTER-8ac7a273-ef5f-4780-bc57-6c62c5ce507a"
+
+
+def block(**kwargs):
+    return None
+
+
+def get_functions(graph: nx.MultiDiGraph):
+    return {job_id: block for job_id in graph.nodes}
+
+
+class ResultCacheTest(unittest.TestCase):
+    # test that the least recently used entries are evicted first
+    def test_lru_eviction(self):
+        cache = ResultCache(max_entries=2)
+        cache.put("a", CachedResult(1, None, False))
+        cache.put("b", CachedResult(2, None, False))
+        assert cache.get("a") is not None
+        cache.put("c", CachedResult(3, None, False))
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.get("c") is not None
+        assert len(cache) == 2
+
+    # test that the cache is bounded by the bytes of its arrays
+    def test_byte_bound(self):
+        cache = ResultCache(max_bytes=3 * 8000)
+        for key in "abc":
+            cache.put(key, CachedResult({"y": np.zeros(1000)}, None, False))
+        assert len(cache) == 3 and cache.size == 3 * 8000
+        cache.put("d", CachedResult({"y": np.zeros(1000)}, None, False))
+        assert cache.get("a") is None and len(cache) == 3
+        # a result that doesn't fit at all isn't cached nor evicts anything
+        cache.put("e", CachedResult({"y": np.zeros(4000)}, None, False))
+        assert cache.get("e") is None and len(cache) == 3
+
+    # test that changing a ctrl only changes the keys of the dirty cone
+    def test_keys_only_change_downstream(self):
+        graph = deepcopy(sample_app_graph)
+        before = compute_cache_keys(Topology(graph, "test_123"), get_functions(graph))
+        assert len(before) == graph.number_of_nodes()
+
+        graph.nodes[CONSTANT]["ctrls"] = {"constant": {"value": 42}}
+        after = compute_cache_keys(Topology(graph, "test_123"), get_functions(graph))
+        changed = {job_id for job_id in before if before[job_id] != after[job_id]}
+        assert CONSTANT in changed
+        assert ADD in changed
+        assert SCATTER in changed
+        assert SINE not in changed
+
+    # test that loop nodes and everything downstream of them are never cached
+    def test_flow_control_is_not_cached(self):
+        graph = nx.MultiDiGraph()
+        for node_id in ["SOURCE", "LOOP", "BODY"]:
+            graph.add_node(node_id, cmd=node_id, label=node_id, ctrls={})
+        graph.add_edge("SOURCE", "LOOP", label="default", target_label="default")
+        graph.add_edge("LOOP", "BODY", label="body", target_label="default")
+        keys = compute_cache_keys(Topology(graph, "test_123"), get_functions(graph))
+        assert list(keys) == ["SOURCE"]
+
+    # test that blocks drawing random numbers are never cached
+    def test_random_blocks_are_not_cached(self):
+        graph = nx.MultiDiGraph()
+        for node_id in ["RAND", "ADD"]:
+            graph.add_node(node_id, cmd=node_id, label=node_id, ctrls={})
+        graph.add_edge("RAND", "ADD", label="default", target_label="a")
+        keys = compute_cache_keys(Topology(graph, "test_123"), get_functions(graph))
+        assert keys == {}
+
+    # test that editing the file read by a node changes its key
+    def test_file_change_changes_key(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "data.csv")
+            with open(path, "w") as f:
+                f.write("a,b\n1,2\n")
+            graph = nx.MultiDiGraph()
+            graph.add_node(
+                "READ_CSV",
+                cmd="READ_CSV",
+                label="READ_CSV",
+                ctrls={"file_path": {"value": path}},
+            )
+            functions = get_functions(graph)
+            before = compute_cache_keys(Topology(graph, "test_123"), functions)
+            with open(path, "w") as f:
+                f.write("a,b\n3,4\n")
+            os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10**9))
+            after = compute_cache_keys(Topology(graph, "test_123"), functions)
+        assert before["READ_CSV"] != after["READ_CSV"]
+
+        graph.nodes["READ_CSV"]["ctrls"] = {
+            "file_path": {"value": "https://example.com/data.csv"}
+        }
+        assert compute_cache_keys(Topology(graph, "test_123"), functions) == {}
+
+    # test that a worker serves a cached job without running the block
+    def test_worker_uses_cached_result(self):
+        cache = ResultCache()
+        cache.put("key", CachedResult({"y": 1}, {"text_blob": "cached"}, False))
+        worker = Worker(
+            task_queue=Queue(),
+            finish_queue=Queue(),
+            imported_functions={},
+            observe_blocks=[],
+            result_cache=cache,
+        )
+        job = JobInfo(job_id=SINE, jobset_id="test_123", iteration_id=SINE)
+        job.cache_key = "key"
+        response = worker.get_cached_response(block, job)
+        assert isinstance(response, JobSuccess)
+        assert response.result == {"text_blob": "cached"}
+        assert worker.job_service.get_job_result(SINE) == {"y": 1}
+        worker.job_service.delete_job(SINE)
+
+        # the front-end result of an unobserved block can't be reused once observed
+        worker.observe_blocks = [SINE]
+        assert worker.get_cached_response(block, job) is None
@@ -0,0 +1,79 @@
+import asyncio
+import unittest
+from queue import Queue
+
+from captain.models.run_profile import RunProfiler
+from captain.services.consumer.worker import Worker
+from captain.types.worker import JobInfo, JobSuccess, PoisonPill
+
+
+def SLOW_BLOCK(**kwargs):
+    return JobSuccess(
+        result=None,
+        fn="SLOW_BLOCK",
+        node_id=kwargs["node_id"],
+        jobset_id=kwargs["jobset_id"],
+        profile={"fetch_time": 0.5, "function_time": 2.0, "peak_memory": 1024},
+    )
+
+
+class RunProfileTest(unittest.TestCase):
+    # test that runs of the same node (loop iterations) are aggregated
+    def test_runs_are_aggregated_per_node(self):
+        profiler = RunProfiler()
+        profiler.start("test_123")
+        for peak_memory in [10, 30, 20]:
+            profiler.record(
+                "test_123",
+                "A",
+                "ADD",
+                queue_wait_time=0.1,
+                wall_time=1.0,
+                profile={"function_time": 0.5, "peak_memory": peak_memory},
+            )
+        profiler.record("test_123", "B", "SINE", 0.0, 5.0, None)
+        profiler.finish("test_123")
+
+        summary = profiler.get_summary("test_123")
+        assert summary is not None and summary["finished"]
+        slowest, node = summary["nodes"]
+        assert slowest["node_id"] == "B" and slowest["cached_runs"] == 1
+        assert node["runs"] == 3
+        assert node["function_time"] == 1.5
+        assert node["peak_memory"] == 30
+        assert profiler.get_summary("unknown") is None
+
+    # test that only the most recent runs are kept
+    def test_old_runs_are_dropped(self):
+        profiler = RunProfiler(max_jobsets=2)
+        for jobset_id in ["a", "b", "c"]:
+            profiler.start(jobset_id)
+        assert profiler.get_summary("a") is None
+        assert profiler.get_summary("c") is not None
+
+    # test that the worker records the timings reported by the block wrapper
+    def test_worker_records_jobs(self):
+        task_queue, finish_queue = Queue(), Queue()
+        profiler = RunProfiler()
+        worker = Worker(
+            task_queue=task_queue,
+            finish_queue=finish_queue,
+            imported_functions={"SLOW_BLOCK": SLOW_BLOCK},
+            observe_blocks=[],
+            profiler=profiler,
+        )
+        task_queue.put(
+            JobInfo(
+                job_id="SLOW_BLOCK", jobset_id="test_123", iteration_id="SLOW_BLOCK"
+            )
+        )
+        task_queue.put(PoisonPill())
+        asyncio.run(worker.run())
+
+        summary = profiler.get_summary("test_123")
+        assert summary is not None
+        (node,) = summary["nodes"]
+        assert node["cmd"] == "SLOW_BLOCK"
+        assert node["function_time"] == 2.0
+        assert node["queue_wait_time"] >= 0
+        assert isinstance(finish_queue.get(), JobSuccess)
@@ -0,0 +1,62 @@
+import unittest
+
+import networkx as nx
+import numpy as np
+from pkgs.atlasvibe.atlasvibe import DataStream, OrderedPair, Scalar, atlasvibe
+
+from captain.services.runtime.headless import HeadlessRunner, PreparedFlowchart
+
+
+def pair_chunks(count: int):
+    for i in range(count):
+        x = np.arange(i * 4, (i + 1) * 4, dtype=float)
+        yield OrderedPair(x=x, y=x)
+
+
+@atlasvibe(streaming=True)
+def SOURCE(chunks: int = 5) -> OrderedPair:
+    return DataStream(pair_chunks, chunks)
+
+
+@atlasvibe(streaming=True)
+def DOUBLE(default: OrderedPair) -> OrderedPair:
+    if isinstance(default, DataStream):
+        return default.map(lambda chunk: OrderedPair(x=chunk.x, y=chunk.y * 2))
+    return OrderedPair(x=default.x, y=default.y * 2)
+
+
+@atlasvibe
+def TOTAL(default: OrderedPair) -> Scalar:
+    return Scalar(c=float(np.sum(default.y)))
+
+
+# SOURCE -> DOUBLE -> TOTAL
+def prepare_pipeline() -> PreparedFlowchart:
+    graph = nx.MultiDiGraph()
+    for node_id in ["SOURCE", "DOUBLE", "TOTAL"]:
+        graph.add_node(node_id, cmd=node_id, label=node_id, ctrls={})
+    for source, target in [("SOURCE", "DOUBLE"), ("DOUBLE", "TOTAL")]:
+        graph.add_edge(
+            source, target, label="default", target_label="default", multiple=False
+        )
+    prepared = PreparedFlowchart("streaming", graph, ["DOUBLE", "TOTAL"])
+    prepared.functions = {"SOURCE": SOURCE, "DOUBLE": DOUBLE, "TOTAL": TOTAL}
+    return prepared
+
+
+class StreamingTest(unittest.TestCase):
+    # test that the chunks flow through the streaming blocks and are collected for the others
+    def test_streaming_pipeline(self):
+        for stream_buffer in [0, 2]:
+            runner = HeadlessRunner(stream_buffer=stream_buffer)
+            prepared = prepare_pipeline()
+            try:
+                run = runner.run_prepared(prepared)
+            finally:
+                runner.release(prepared)
+            assert run.succeeded, run.errors
+            assert run.outputs["TOTAL"]["c"] == np.arange(20.0).sum() * 2
+            # an observed stream shows its first chunk
+            np.testing.assert_array_equal(
+                run.outputs["DOUBLE"]["y"], np.arange(4.0) * 2
+            )
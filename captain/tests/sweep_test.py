@@ -0,0 +1,105 @@
+import json
+import tempfile
+import threading
+import unittest
+from collections import Counter
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+from pkgs.atlasvibe.atlasvibe import JobService, JobSuccess
+
+from captain.services.runtime.headless import HeadlessRunner, PreparedFlowchart
+from captain.services.runtime.sweep import expand_grid, run_sweep
+
+from .test_apps.sample_app import sample_app
+
+CONSTANT = "CONSTANT-a357c1d7-0a1e-459b-bc03-faa48026e0e3"
+
+
+def record_prepared(prepared: list[PreparedFlowchart]):
+    prepare = HeadlessRunner.prepare
+
+    def recording_prepare(self: HeadlessRunner, *args: Any, **kwargs: Any):
+        prepared.append(prepare(self, *args, **kwargs))
+        return prepared[-1]
+
+    return patch.object(HeadlessRunner, "prepare", recording_prepare)
+
+
+def run_sample_sweep(grid: Any, calls: Counter[str]):
+    lock = threading.Lock()
+
+    def block(
+        node_id: str,
+        jobset_id: str,
+        job_id: str,
+        ctrls: dict[str, Any],
+        previous_jobs: list[dict[str, str]],
+        observe_blocks: list[str],
+        **_: Any,
+    ):
+        with lock:
+            calls[node_id.split("-")[0]] += 1
+        job_service = JobService()
+        value = sum(
+            ctrl["value"]
+            for ctrl in ctrls.values()
+            if isinstance(ctrl["value"], (int, float))
+        )
+        value += sum(job_service.get_job_result(job["job_id"]) for job in previous_jobs)
+        job_service.post_job_result(job_id, value)
+        result = None
+        if node_id in observe_blocks:
+            result = {"data": {"type": "Scalar", "c": value}}
+        return JobSuccess(
+            result=result, fn="block", node_id=node_id, jobset_id=jobset_id
+        )
+
+    flowchart = json.loads(sample_app)
+    funcs = {node["id"]: block for node in flowchart["nodes"]}
+    with patch(
+        "captain.services.runtime.headless.pre_import_functions",
+        return_value=(funcs, []),
+    ):
+        return run_sweep(flowchart, grid, outputs=["ADD"], max_parallel=3)
+
+
+class SweepTest(unittest.TestCase):
+    def test_expand_grid(self):
+        variants = expand_grid({"A.x": [1, 2], "B.y": ["a", "b"]})
+        assert variants == [
+            {"A.x": 1, "B.y": "a"},
+            {"A.x": 1, "B.y": "b"},
+            {"A.x": 2, "B.y": "a"},
+            {"A.x": 2, "B.y": "b"},
+        ]
+        assert expand_grid([{"A.x": 1}]) == [{"A.x": 1}]
+
+    # test that every variant gets its value and the upstream nodes run once
+    def test_sweep_shares_upstream(self):
+        calls: Counter[str] = Counter()
+        prepared: list[PreparedFlowchart] = []
+        with record_prepared(prepared):
+            result = run_sample_sweep({f"{CONSTANT}.constant": [1, 2, 3, 4]}, calls)
+        assert result.succeeded
+        rows = result.rows()
+        # LINSPACE: 10 + 0 + 1000, SINE: amplitude 1 + frequency 1 + LINSPACE
+        assert [row["ADD"] for row in rows] == [2023, 2024, 2025, 2026]
+        assert [row[f"{CONSTANT}.constant"] for row in rows] == [1, 2, 3, 4]
+        assert calls["LINSPACE"] == 1 and calls["SINE"] == 1
+        assert calls["CONSTANT"] == 4 and calls["ADD"] == 4
+        # the namespaces of the variants and of the node init state were freed
+        namespaces = {run.jobset_id for run in result.runs}
+        namespaces |= {flowchart.init_namespace for flowchart in prepared}
+        assert len(namespaces) == 5
+        assert not namespaces & set(JobService().dao.namespaces)
+
+        with tempfile.TemporaryDirectory() as output_dir:
+            path = result.write(Path(output_dir) / "sweep.csv")
+            assert path.read_text().splitlines()[0] == (
+                f"{CONSTANT}.constant,succeeded,error,ADD"
+            )
+
+        with self.assertRaises(ValueError):
+            run_sample_sweep({f"{CONSTANT}.missing": [1]}, Counter())
@@ -2,10 +2,13 @@ import asyncio
 import unittest
 from queue import Queue
 
+import networkx as nx
+
+from captain.models.job_queue import JobPriorityQueue
 from captain.models.topology import Topology
 from captain.services.consumer.worker import Worker
 from captain.services.producer.producer import Producer
-from captain.types.worker import JobInfo, JobSuccess
+from captain.types.worker import JobInfo, JobSuccess, PoisonPill
 
 from .test_apps.sample_app import graph as sample_app_graph
 
@@ -48,6 +51,104 @@ class TopologyTest(unittest.TestCase):
         assert new_jobs is not None
         assert len(new_jobs) != 0
 
+    # test that a loop body is scheduled again until the loop takes its end edge
+    def test_loop_restarts_body(self):
+        graph = nx.MultiDiGraph()
+        for node_id in ["LOOP", "BODY", "END"]:
+            graph.add_node(node_id, cmd=node_id, label=node_id, ctrls={})
+        graph.add_edge("LOOP", "BODY", label="body", target_label="default")
+        graph.add_edge("LOOP", "END", label="end", target_label="default")
+        topology = Topology(graph=graph, jobset_id="test_123")
+        task_queue = Queue()
+        topology.run(task_queue)
+        assert task_queue.get().job_id == "LOOP"
+
+        def finish(node_id: str, result=None):
+            return topology.handle_finished_job(
+                JobSuccess(
+                    result=result,
+                    fn=lambda: None,
+                    node_id=node_id,
+                    jobset_id="test_123",
+                ),
+                return_new_jobs=True,
+            )
+
+        for _ in range(2):
+            assert finish("LOOP", {"__flow_to_directions__": ["body"]}) == ["BODY"]
+            assert finish("BODY") == ["LOOP"]
+            topology.run_job("LOOP", task_queue)
+        assert finish("LOOP", {"__flow_to_directions__": ["end"]}) == ["END"]
+        assert finish("END") is None
+        assert topology.is_finished()
+        # the graph given to the topology is left untouched
+        assert graph.number_of_edges() == 2
+
+    # test that loop bodies are indexed when the topology is built
+    def test_loop_restart_region_is_precomputed(self):
+        graph = nx.MultiDiGraph()
+        for node_id in ["START", "LOOP", "A", "B", "END"]:
+            graph.add_node(node_id, cmd=node_id, label=node_id, ctrls={})
+        graph.add_edge("START", "LOOP", label="default", target_label="default")
+        graph.add_edge("LOOP", "A", label="body", target_label="default")
+        graph.add_edge("A", "B", label="default", target_label="default")
+        graph.add_edge("LOOP", "END", label="end", target_label="default")
+        topology = Topology(graph=graph, jobset_id="test_123")
+        loop = topology.plan.index["LOOP"]
+        descendants, edges = topology.restart_regions[loop]
+        assert sorted(descendants) == ["A", "B", "END"]
+        assert len(edges) == 3  # the edge coming from START is left alone
+
+    # test that results are refcounted by their out edges and loop inputs are pinned
+    def test_result_consumers(self):
+        topology = Topology(graph=sample_app_graph, jobset_id="test_123")
+        assert (
+            topology.result_consumers["LINSPACE-fb6e23f4-080c-4d26-9070-45f3081ee5f3"]
+            == 2
+        )
+        assert (
+            "SCATTER-8ac7a273-ef5f-4780-bc57-6c62c5ce507a"
+            not in topology.result_consumers
+        )
+
+        graph = nx.MultiDiGraph()
+        for node_id in ["START", "LOOP", "A", "B"]:
+            graph.add_node(node_id, cmd=node_id, label=node_id, ctrls={})
+        graph.add_edge("START", "LOOP", label="default", target_label="default")
+        graph.add_edge("START", "A", label="default", target_label="x")
+        graph.add_edge("LOOP", "A", label="body", target_label="default")
+        graph.add_edge("A", "B", label="default", target_label="default")
+        topology = Topology(graph=graph, jobset_id="test_123")
+        assert topology.result_consumers == {"LOOP": 1, "A": 1}
+
+    # test that ready jobs are ranked by the critical path left after them
+    def test_priorities_follow_critical_path(self):
+        graph = nx.MultiDiGraph()
+        for node_id, cmd in [
+            ("START", "CONSTANT"),
+            ("CHEAP", "ADD"),
+            ("SLOW", "FFT"),
+            ("END", "ADD"),
+        ]:
+            graph.add_node(node_id, cmd=cmd, label=node_id, ctrls={})
+        for source, target in [("START", "CHEAP"), ("START", "SLOW"), ("SLOW", "END")]:
+            graph.add_edge(source, target, label="default", target_label="default")
+        topology = Topology(graph=graph, jobset_id="test_123")
+        topology.set_block_durations({"FFT": 10.0, "ADD": 1.0, "CONSTANT": 1.0})
+        assert topology.priorities == {
+            "START": 12.0,
+            "CHEAP": 1.0,
+            "SLOW": 11.0,
+            "END": 1.0,
+        }
+
+        task_queue = JobPriorityQueue()
+        topology.run_jobs(["CHEAP", "SLOW"], task_queue)
+        task_queue.put(PoisonPill())
+        assert task_queue.get().job_id == "SLOW"
+        assert task_queue.get().job_id == "CHEAP"
+        assert isinstance(task_queue.get(), PoisonPill)
+
     MAX_TIMEOUT = 3
 
     # test that flowchart ran successfully
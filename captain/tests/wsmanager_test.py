@@ -0,0 +1,207 @@
+import asyncio
+import json
+import threading
+import unittest
+from typing import Any, cast
+from unittest.mock import patch
+
+import numpy as np
+from fastapi.websockets import WebSocketState
+
+from captain.internal.wsmanager import ConnectionManager
+from captain.types.worker import WorkerJobResponse
+from captain.utils.binary_frames import decode_frame
+
+
+class FakeWebSocket:
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.sent: list[dict[str, Any]] = []
+        self.released = asyncio.Event()
+        self.released.set()
+        self.client_state = WebSocketState.CONNECTED
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        if self.fail:
+            self.client_state = WebSocketState.DISCONNECTED
+            raise RuntimeError("connection closed")
+        await self.released.wait()
+        self.sent.append(json.loads(text))
+
+    async def send_bytes(self, frame: bytes):
+        await self.released.wait()
+        self.sent.append(decode_frame(frame))
+
+
+def running(node_id: str):
+    return WorkerJobResponse(jobset_id="test_123", running_node=node_id)
+
+
+def results(node_id: str):
+    return WorkerJobResponse(
+        jobset_id="test_123", result={}, cmd="ADD", node_id=node_id
+    )
+
+
+async def settle():
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+class ConnectionManagerTest(unittest.TestCase):
+    # test that running node updates queued behind a slow send are merged
+    def test_coalesces_running_nodes(self):
+        async def run():
+            ws = ConnectionManager()
+            client = FakeWebSocket()
+            await ws.connect(cast(Any, client), "client")
+            client.released.clear()
+            await ws.broadcast(results("A"))
+            await settle()  # the sender is now stuck sending A
+            for node_id in ["B", "C", "D"]:
+                await ws.broadcast(running(node_id))
+            await ws.broadcast(results("B"))
+            client.released.set()
+            await settle()
+            await ws.disconnect("client")
+            return client.sent
+
+        sent = asyncio.run(run())
+        assert [msg["NODE_RESULTS"]["id"] for msg in sent if "NODE_RESULTS" in msg] == [
+            "A",
+            "B",
+        ]
+        assert [msg["RUNNING_NODE"] for msg in sent if msg["RUNNING_NODE"]] == ["D"]
+
+    # test that a merged running node update doesn't overtake the results queued before it
+    def test_coalesced_update_keeps_its_place(self):
+        async def run():
+            ws = ConnectionManager()
+            client = FakeWebSocket()
+            await ws.connect(cast(Any, client), "client")
+            client.released.clear()
+            await ws.broadcast(results("A"))
+            await settle()  # the sender is now stuck sending A
+            await ws.broadcast(running("B"))
+            await ws.broadcast(results("B"))
+            await ws.broadcast(running("C"))
+            client.released.set()
+            await settle()
+            await ws.disconnect("client")
+            return client.sent
+
+        sent = asyncio.run(run())
+        assert [
+            msg["NODE_RESULTS"]["id"] if "NODE_RESULTS" in msg else msg["RUNNING_NODE"]
+            for msg in sent
+        ] == ["A", "B", "C"]
+        assert "NODE_RESULTS" in sent[1] and not sent[2].get("NODE_RESULTS")
+
+    # test that a dead client is dropped without affecting the others
+    def test_dead_client_is_disconnected(self):
+        async def run():
+            ws = ConnectionManager()
+            dead, alive = FakeWebSocket(fail=True), FakeWebSocket()
+            await ws.connect(cast(Any, dead), "dead")
+            await ws.connect(cast(Any, alive), "alive")
+            await ws.broadcast(results("A"))
+            await settle()
+            await ws.broadcast(results("B"))
+            await settle()
+            connected = list(ws.active_connections_map)
+            await ws.disconnect("alive")
+            return connected, alive.sent
+
+        connected, sent = asyncio.run(run())
+        assert connected == ["alive"]
+        assert len(sent) == 2
+
+    # test that binary clients get the node results as frames, others as JSON
+    def test_binary_clients(self):
+        async def run():
+            ws = ConnectionManager()
+            text_client, binary_client = FakeWebSocket(), FakeWebSocket()
+            await ws.connect(cast(Any, text_client), "text")
+            await ws.connect(cast(Any, binary_client), "binary", binary=True)
+            await ws.broadcast(
+                WorkerJobResponse(
+                    jobset_id="test_123",
+                    result={"y": np.arange(4.0)},
+                    cmd="ADD",
+                    node_id="A",
+                )
+            )
+            await ws.broadcast(running("B"))
+            await settle()
+            await ws.disconnect("text")
+            await ws.disconnect("binary")
+            return text_client.sent, binary_client.sent
+
+        text_sent, binary_sent = asyncio.run(run())
+        assert text_sent[0]["NODE_RESULTS"]["result"]["y"] == [0.0, 1.0, 2.0, 3.0]
+        y = binary_sent[0]["NODE_RESULTS"]["result"]["y"]
+        assert isinstance(y, np.ndarray)
+        np.testing.assert_array_equal(y, np.arange(4.0))
+        assert text_sent[1] == binary_sent[1]
+
+    # test that a publishing thread waits while a slow client has too many messages
+    def test_slow_client_holds_back_publishers(self):
+        async def run():
+            ws = ConnectionManager()
+            client = FakeWebSocket()
+            await ws.connect(cast(Any, client), "client")
+            client.released.clear()
+
+            def publish():
+                for node_id in "ABCDE":
+                    ws.publish(results(node_id))
+
+            publisher = threading.Thread(target=publish, daemon=True)
+            publisher.start()
+            await asyncio.sleep(0.1)
+            waiting = publisher.is_alive()
+            client.released.set()
+            while publisher.is_alive():
+                await asyncio.sleep(0.01)
+            await settle()
+            stats = ws.get_outbox_stats()["client"]
+            await ws.disconnect("client")
+            return waiting, client.sent, stats
+
+        with patch("captain.internal.wsmanager.OUTBOX_HIGH_WATER", 2):
+            waiting, sent, stats = asyncio.run(run())
+        assert waiting
+        assert [msg["NODE_RESULTS"]["id"] for msg in sent] == list("ABCDE")
+        assert stats["stalls"] >= 1 and stats["dropped"] == 0
+
+    # test that a broadcast waiting for a slow client doesn't block its event loop
+    def test_slow_client_holds_back_broadcast_not_loop(self):
+        async def run():
+            ws = ConnectionManager()
+            client = FakeWebSocket()
+            await ws.connect(cast(Any, client), "client")
+            client.released.clear()
+
+            async def publish():
+                for node_id in "ABCDE":
+                    await ws.broadcast(results(node_id))
+
+            publisher = asyncio.create_task(publish())
+            ticks = 0
+            for _ in range(10):
+                await asyncio.sleep(0.01)
+                ticks += 1
+            waiting = not publisher.done()
+            client.released.set()
+            await publisher
+            await settle()
+            await ws.disconnect("client")
+            return waiting, ticks, client.sent
+
+        with patch("captain.internal.wsmanager.OUTBOX_HIGH_WATER", 2):
+            waiting, ticks, sent = asyncio.run(run())
+        assert waiting and ticks == 10
+        assert [msg["NODE_RESULTS"]["id"] for msg in sent] == list("ABCDE")
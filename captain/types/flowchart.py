@@ -1,5 +1,7 @@
 from pydantic import BaseModel
 
+from captain.types.worker import RuntimeType, WorkerBackendType
+
 
 class PostCancelFC(BaseModel):
     jobsetId: str | None = None
@@ -14,6 +16,18 @@ class PostWFC(BaseModel):
     maximumRuntime: float
     maximumConcurrentWorkers: int
     projectPath: str | None = None
+    workerBackend: WorkerBackendType = "thread"
+    runtime: RuntimeType = "threads"
+    incremental: bool = False  # reuse cached results of the nodes that didn't change
+    # run the linear chains of blocks as single jobs, see `find_fused_chains`
+    fuseChains: bool = False
+    # measure the peak memory of every block and send the run profile when done
+    profiling: bool = False
+    # resolution of the plots sent back, see `data_container_to_plotly` (0: full)
+    plotMaxPoints: int | None = None
+    plotMaxPixels: int | None = None
+    # chunks read ahead between streaming blocks, see `atlasvibe.streaming` (0: none)
+    streamBuffer: int = 4
 
 
 class WorkerSuccessResponse(BaseModel):
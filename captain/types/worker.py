@@ -1,5 +1,6 @@
+import time
 from queue import Queue
-from typing import Any, Callable, Union, Optional, TypedDict
+from typing import Any, Callable, Literal, Union, Optional, TypedDict
 
 from pkgs.atlasvibe.atlasvibe import JobFailure, JobSuccess
 
@@ -17,12 +18,23 @@ class JobInfo:
         iteration_id: str = "",
         ctrls: dict[str, Any] | None = None,
         previous_jobs: list[dict[str, str]] | None = None,
+        cache_key: str | None = None,
+        consumers: int | None = None,
+        priority: float = 0.0,
+        chain: "list[JobInfo] | None" = None,
     ):
         self.job_id = job_id
         self.jobset_id = jobset_id
         self.iteration_id = iteration_id
         self.ctrls = ctrls or {}
         self.previous_jobs = previous_jobs or []
+        self.cache_key = cache_key  # set when the result of the job can be cached
+        # fetches of the result left before it's freed, None keeps it for the whole run
+        self.consumers = consumers
+        self.queued_at = time.perf_counter()
+        self.priority = priority  # jobs with a higher priority are run first
+        # jobs fused with this one, run right after it in the same worker
+        self.chain = chain or []
 
 
 class NodeResults(dict):
@@ -83,6 +95,12 @@ ProcessTaskType = Callable[[Union[JobSuccess, JobFailure]], list[str] | None]
 QueueTaskType = Callable[[str, Queue], None]
 InitFuncType = Callable[[Queue], None]
 
+# "thread": blocks run in the worker threads, "process": blocks run in a process pool
+WorkerBackendType = Literal["thread", "process"]
+
+# "threads": worker and producer threads, "asyncio": one event loop (`AsyncRuntime`)
+RuntimeType = Literal["threads", "asyncio"]
+
 
 class RegenerationMessage(TypedDict):
     """Message for block regeneration state updates."""
@@ -0,0 +1,117 @@
+import json
+import struct
+from typing import Any
+
+import numpy as np
+from pkgs.atlasvibe.atlasvibe.utils import PlotlyJSONEncoder
+
+"""
+Binary frames carrying node results to the front-end.
+
+JSON turns every ndarray into a list of Python numbers before encoding it, a
+frame instead keeps the arrays as raw little-endian buffers:
+
+    magic (4 bytes) | header length (uint32 LE) | header (JSON) | buffers
+
+Each array of the message is replaced in the header by `{"__ndarray__": i}`,
+`header["buffers"][i]` giving its `dtype` (numpy string, e.g. "<f8"), `shape`,
+`offset` and `length` in bytes. The buffers start after the header, padded to
+8 bytes, offsets are relative to that start and every buffer is aligned on
+8 bytes so it can be viewed as a typed array without a copy. Non-finite values
+stay as IEEE floats in the buffers.
+"""
+
+FRAME_MAGIC = b"AVB1"
+ARRAY_KEY = "__ndarray__"
+ALIGNMENT = 8
+
+# dtype kinds sent as buffers: bool, signed and unsigned integers, floats
+BINARY_KINDS = "biuf"
+
+_PREFIX = struct.Struct("<4sI")
+
+
+def _padding(size: int) -> int:
+    return -size % ALIGNMENT
+
+
+class _ArrayExtractor:
+    def __init__(self):
+        self.arrays: list[np.ndarray] = []
+
+    def extract(self, obj: Any) -> Any:
+        if isinstance(obj, np.ndarray):
+            if obj.dtype.kind not in BINARY_KINDS or obj.ndim == 0:
+                return obj
+            self.arrays.append(obj)
+            return {ARRAY_KEY: len(self.arrays) - 1}
+        if isinstance(obj, dict):
+            return {key: self.extract(value) for key, value in obj.items()}
+        if isinstance(obj, (list, tuple)):
+            return [self.extract(value) for value in obj]
+        if hasattr(obj, "to_plotly_json"):
+            return self.extract(obj.to_plotly_json())
+        return obj
+
+
+def encode_frame(message: dict[str, Any]) -> bytes:
+    extractor = _ArrayExtractor()
+    header = extractor.extract(message)
+
+    parts: list[bytes | memoryview] = []
+    specs: list[dict[str, Any]] = []
+    offset = 0
+    for array in extractor.arrays:
+        # only copies the arrays that are big endian or not contiguous
+        array = np.ascontiguousarray(array, dtype=array.dtype.newbyteorder("<"))
+        buffer = memoryview(array).cast("B")
+        specs.append(
+            {
+                "dtype": array.dtype.str,
+                "shape": list(array.shape),
+                "offset": offset,
+                "length": len(buffer),
+            }
+        )
+        parts.append(buffer)
+        parts.append(b"\0" * _padding(len(buffer)))
+        offset += len(buffer) + _padding(len(buffer))
+    header["buffers"] = specs
+
+    header_bytes = json.dumps(header, cls=PlotlyJSONEncoder).encode()
+    size = _PREFIX.size + len(header_bytes)
+    head = [_PREFIX.pack(FRAME_MAGIC, len(header_bytes)), header_bytes]
+    return b"".join(head + [b"\0" * _padding(size)] + parts)
+
+
+def decode_frame(frame: bytes) -> dict[str, Any]:
+    """
+    Inverse of `encode_frame`, the arrays are read only views of the frame.
+    """
+    magic, header_size = _PREFIX.unpack_from(frame)
+    if magic != FRAME_MAGIC:
+        raise ValueError("Not a binary node results frame")
+    start = _PREFIX.size + header_size
+    header = json.loads(frame[_PREFIX.size : start])
+    start += _padding(start)
+    arrays: list[np.ndarray] = []
+    for spec in header.pop("buffers"):
+        dtype = np.dtype(spec["dtype"])
+        array = np.frombuffer(
+            frame,
+            dtype=dtype,
+            count=spec["length"] // dtype.itemsize,
+            offset=start + spec["offset"],
+        )
+        arrays.append(array.reshape(spec["shape"]))
+
+    def restore(obj: Any) -> Any:
+        if isinstance(obj, dict):
+            if len(obj) == 1 and ARRAY_KEY in obj:
+                return arrays[obj[ARRAY_KEY]]
+            return {key: restore(value) for key, value in obj.items()}
+        if isinstance(obj, list):
+            return [restore(value) for value in obj]
+        return obj
+
+    return restore(header)
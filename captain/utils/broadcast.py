@@ -1,6 +1,6 @@
 from typing import Any
 
-from captain.internal.manager import ConnectionManager
+from captain.internal.wsmanager import ConnectionManager
 from captain.types.worker import WorkerJobResponse
 from captain.utils.status_codes import STATUS_CODES
 
@@ -64,6 +64,10 @@ class Signaler:
         )
         await self.ws.broadcast(msg)
 
+    async def signal_run_profile(self, jobset_id: str, profile: dict[str, Any]):
+        msg = WorkerJobResponse(jobset_id=jobset_id, dict_item={"RUN_PROFILE": profile})
+        await self.ws.broadcast(msg)
+
     async def signal_max_runtime_exceeded(self, jobset_id: str):
         msg = WorkerJobResponse(
             jobset_id=jobset_id,
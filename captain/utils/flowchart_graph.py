@@ -0,0 +1,90 @@
+from typing import Any, cast
+
+import networkx as nx
+
+from captain.utils.logger import logger
+
+"""
+Conversion of the flowcharts sent by the front-end (or saved in a project file)
+to the networkx graph the `Topology` runs.
+"""
+
+
+def get_flowchart_elements(flowchart: dict[str, Any]) -> dict[str, Any]:
+    """
+    Returns the `nodes` and `edges` of a flowchart, which can also be a saved
+    project (the elements are then under `rfInstance`).
+    """
+    if "rfInstance" in flowchart:
+        flowchart = flowchart["rfInstance"]
+    if "nodes" not in flowchart or "edges" not in flowchart:
+        raise ValueError("The flowchart has no nodes or edges")
+    return flowchart
+
+
+# converts the dict to a networkx graph
+def flowchart_to_nx_graph(flowchart: dict[str, Any]):
+    elems = flowchart["nodes"]
+    edges = flowchart["edges"]
+    nx_graph: nx.MultiDiGraph = nx.MultiDiGraph()
+    dict_node_inputs: dict[str, list[Any]] = dict()
+
+    for i in range(len(elems)):
+        el = elems[i]
+        node_id = el["id"]
+        data = el["data"]
+        cmd = el["data"]["func"]
+        ctrls = data.get("ctrls", {})
+        init_ctrls = data.get("initCtrls", {})
+        inputs = data.get("inputs", {})
+        label = data.get("label", "")
+        dict_node_inputs[node_id] = inputs
+        node_path = data.get("path", "")
+        nx_graph.add_node(
+            node_id,
+            pos=(el["position"]["x"], el["position"]["y"]),
+            id=el["id"],
+            ctrls=ctrls,
+            init_ctrls=init_ctrls,
+            inputs=inputs,
+            label=label,
+            cmd=cmd,
+            node_path=node_path,
+        )
+
+    for i in range(len(edges)):
+        e = edges[i]
+        _id = e["id"]
+        u = e["source"]
+        v = e["target"]
+        label = e["sourceHandle"]
+        target_label_id = e["targetHandle"]
+        v_inputs = dict_node_inputs[v]
+        target_input = cast(
+            dict[str, str],
+            next(
+                filter(
+                    lambda input, target_label_id=target_label_id: input.get("id", "")
+                    == target_label_id,
+                    v_inputs,
+                ),
+                None,
+            ),
+        )
+        logger.debug(f"----target_input----\n{target_input}")
+        target_label = "default"
+        multiple = False
+        if target_input:
+            target_label = target_input.get("name", "default")
+            multiple = target_input.get("multiple", False)
+
+        logger.debug(
+            f"Adding edge from {u} to {v}\n,"
+            f"inputs: {v_inputs}, chosen label: {target_label},\n"
+            f"target_label_id: {target_label_id}"
+        )
+        nx_graph.add_edge(
+            u, v, label=label, target_label=target_label, id=_id, multiple=multiple
+        )
+
+    return nx_graph
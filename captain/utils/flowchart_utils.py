@@ -1,84 +1,47 @@
 import asyncio
-import importlib.metadata
 import json
 import os
 import time
 import traceback
-from queue import Queue
 from subprocess import PIPE, Popen
 from threading import Thread
-from typing import Any, cast
+from typing import Any
 
-import networkx as nx
+from pkgs.atlasvibe.atlasvibe.package_index import PackageIndex
 from pkgs.atlasvibe.atlasvibe.utils import clear_atlasvibe_memory
 
-from captain.internal.manager import Manager
+from captain.internal.manager import JobsetRun, Manager
+from captain.models.fusion import find_fused_chains
+from captain.models.result_cache import ResultCache, compute_cache_keys
 from captain.models.topology import Topology
-from captain.services.consumer.worker import Worker
+from captain.services.consumer.backends import BlockBackend, create_block_backend
+from captain.services.consumer.worker import Worker, serve_jobs
 from captain.services.producer.producer import Producer
+from captain.services.runtime.asyncio_runtime import AsyncRuntime
 from captain.types.flowchart import PostWFC
-from captain.types.worker import (
-    InitFuncType,
-    ProcessTaskType,
-    QueueTaskType,
-    WorkerJobResponse,
-)
+from captain.types.worker import WorkerBackendType, WorkerJobResponse
 from captain.utils.broadcast import Signaler
+from captain.utils.flowchart_graph import flowchart_to_nx_graph
 from captain.utils.import_blocks import pre_import_functions
 from captain.utils.logger import logger
 
 from .status_codes import STATUS_CODES
 
 
-def run_worker(
-    task_queue: Queue[Any],
-    finish_queue: Queue[Any],
-    imported_functions: dict[str, Any],
-    observe_blocks: list[str],
-    node_delay: float,
-    signaler: Signaler,
-):
-    try:
-        # TODO: Figure out a way to make this work with python threads (previously this was a Python Process)
-        # if (
-        #     os.environ.get("DEBUG", None) is None
-        #     or os.environ.get("DEBUG", None) == "False"
-        # ):
-        #     text_trap = io.StringIO()
-        #     sys.stdout = text_trap
-        worker = Worker(
-            task_queue=task_queue,
-            finish_queue=finish_queue,
-            imported_functions=imported_functions,
-            observe_blocks=observe_blocks,
-            node_delay=node_delay,
-            signaler=signaler,
-        )
-        asyncio.run(worker.run())
-    except Exception as e:
-        logger.error(f"Error in worker: {e} {traceback.format_exc()}")
-
-
-def run_producer(
-    task_queue: Queue[Any],
-    finish_queue: Queue[Any],
-    process_task: ProcessTaskType,
-    queue_task: QueueTaskType,
-    init_func: InitFuncType,
-    signaler: Signaler,
-):
-    try:
-        producer = Producer(
-            task_queue=task_queue,
-            finish_queue=finish_queue,
-            process_task=process_task,
-            queue_task=queue_task,
-            init_func=init_func,
-            signaler=signaler,
-        )
-        asyncio.run(producer.run())
-    except Exception as e:
-        logger.error(f"Error in producer: {e} {traceback.format_exc()}")
+def run_pool_worker(manager: Manager):
+    while True:
+        try:
+            asyncio.run(
+                serve_jobs(
+                    manager.task_queue,
+                    manager.get_run_worker,
+                    manager.get_run_finish_queue,
+                )
+            )
+            break  # poison pill
+        except Exception as e:
+            # keep the thread in the pool, the failing run is stuck but not the others
+            logger.error(f"Error in worker: {e} {traceback.format_exc()}")
 
 
 def create_topology(
@@ -92,128 +55,156 @@ def create_topology(
     )
 
 
-def spawn_producer(manager: Manager):
-    if manager.running_topology is None:
-        logger.error("Could not spawn producer, no topology detected")
-        return
-    producer = Thread(
-        target=run_producer,
-        args=(
-            manager.task_queue,
-            manager.finish_queue,
-            manager.running_topology.process_worker_response,
-            manager.running_topology.run_job,
-            manager.running_topology.run,
-            Signaler(manager.ws),
-        ),
+def spawn_producer(manager: Manager, run: JobsetRun, send_run_profile: bool = False):
+    producer = Producer(
+        task_queue=manager.task_queue,
+        finish_queue=run.finish_queue,
+        process_task=run.topology.process_worker_response,
+        queue_task=run.topology.run_job,
+        init_func=run.topology.run,
+        signaler=Signaler(manager.ws),
+        run_profiler=manager.run_profiler if send_run_profile else None,
+        on_done=lambda jobset_id: manager.end_run(jobset_id, run),
     )
-    producer.daemon = True
     logger.debug("Starting producer")
-    producer.start()
+    manager.run_pool.submit(producer.run)
+
+
+def prewarm_manager(
+    manager: Manager,
+    max_workers: int = 4,
+    worker_backend: WorkerBackendType = "thread",
+    preload_blocks: list[str] | None = None,  # block cmds imported by the processes
+    project_path: str | None = None,
+):
+    """
+    Starts the worker pool, a thread of the run pool and (for the process
+    backend) the block processes ahead of the first run.
+    """
+    spawn_pool_workers(manager, max_workers)
+    manager.run_pool.prewarm(1)
+    if worker_backend == "process":
+        pool = manager.get_block_process_pool(max_workers)
+        pool.warm_up(preload_blocks or [], project_path)
+
 
+def spawn_pool_workers(manager: Manager, count: int):
+    """
+    Grows the worker pool shared by the runs to `count` threads.
+    """
+    while len(manager.pool_threads) < count:
+        thread = Thread(target=run_pool_worker, args=(manager,))
+        thread.daemon = True
+        thread.start()
+        manager.pool_threads.append(thread)
 
-# spawns a set amount of workers to execute jobs (node functions)
+
+# sets up the worker running the jobs of the run in the shared worker pool
 def spawn_workers(
     manager: Manager,
+    run: JobsetRun,
     imported_functions: dict[str, Any],
     observe_blocks: list[str],
     node_delay: float,
     max_workers: int,
+    worker_backend: WorkerBackendType = "thread",
+    project_path: str | None = None,
+    result_cache: ResultCache | None = None,
+    profile_memory: bool = False,
+    plot_limits: dict[str, int] | None = None,
+    stream_buffer: int = 0,
 ):
-    if manager.running_topology is None:
-        logger.error("Could not spawn workers, no topology detected")
-        return
-    worker_number = manager.running_topology.get_maximum_workers(
-        maximum_capacity=max_workers
-    )
+    worker_number = run.topology.get_maximum_workers(maximum_capacity=max_workers)
     logger.debug(f"NEED {worker_number} WORKERS")
-    logger.info(f"Spawning {worker_number} workers")
-    manager.thread_count = worker_number
+    logger.info(f"Running with {worker_number} workers ({worker_backend} backend)")
+
+    run.worker = Worker(
+        task_queue=manager.task_queue,
+        finish_queue=run.finish_queue,
+        imported_functions=imported_functions,
+        observe_blocks=observe_blocks,
+        node_delay=node_delay,
+        signaler=Signaler(manager.ws),
+        backend=create_backend(
+            manager, imported_functions, worker_number, worker_backend, project_path
+        ),
+        result_cache=result_cache,
+        profiler=manager.run_profiler,
+        profile_memory=profile_memory,
+        plot_limits=plot_limits,
+        stream_buffer=stream_buffer,
+    )
+    spawn_pool_workers(manager, worker_number)
+
+
+def spawn_async_runtime(
+    manager: Manager,
+    run: JobsetRun,
+    imported_functions: dict[str, Any],
+    observe_blocks: list[str],
+    node_delay: float,
+    max_workers: int,
+    worker_backend: WorkerBackendType = "thread",
+    project_path: str | None = None,
+    result_cache: ResultCache | None = None,
+    profile_memory: bool = False,
+    send_run_profile: bool = False,
+    plot_limits: dict[str, int] | None = None,
+    stream_buffer: int = 0,
+):
+    worker_number = run.topology.get_maximum_workers(maximum_capacity=max_workers)
+    logger.info(f"Spawning asyncio runtime ({worker_backend} backend)")
 
     signaler = Signaler(manager.ws)
-    logger.debug("Starting worker")
-    for _ in range(worker_number):
-        worker_process = Thread(
-            target=run_worker,
-            args=(
-                manager.task_queue,
-                manager.finish_queue,
-                imported_functions,
-                observe_blocks,
-                node_delay,
-                signaler,
-            ),
-        )
-        worker_process.daemon = True
-        worker_process.start()
-
-
-# converts the dict to a networkx graph
-def flowchart_to_nx_graph(flowchart: dict[str, Any]):
-    elems = flowchart["nodes"]
-    edges = flowchart["edges"]
-    nx_graph: nx.MultiDiGraph = nx.MultiDiGraph()
-    dict_node_inputs: dict[str, list[Any]] = dict()
-
-    for i in range(len(elems)):
-        el = elems[i]
-        node_id = el["id"]
-        data = el["data"]
-        cmd = el["data"]["func"]
-        ctrls = data.get("ctrls", {})
-        init_ctrls = data.get("initCtrls", {})
-        inputs = data.get("inputs", {})
-        label = data.get("label", "")
-        dict_node_inputs[node_id] = inputs
-        node_path = data.get("path", "")
-        nx_graph.add_node(
-            node_id,
-            pos=(el["position"]["x"], el["position"]["y"]),
-            id=el["id"],
-            ctrls=ctrls,
-            init_ctrls=init_ctrls,
-            inputs=inputs,
-            label=label,
-            cmd=cmd,
-            node_path=node_path,
-        )
+    worker = Worker(
+        task_queue=manager.task_queue,
+        finish_queue=run.finish_queue,
+        imported_functions=imported_functions,
+        observe_blocks=observe_blocks,
+        node_delay=node_delay,
+        signaler=signaler,
+        backend=create_backend(
+            manager, imported_functions, worker_number, worker_backend, project_path
+        ),
+        result_cache=result_cache,
+        profiler=manager.run_profiler,
+        profile_memory=profile_memory,
+        plot_limits=plot_limits,
+        stream_buffer=stream_buffer,
+    )
+    runtime = AsyncRuntime(
+        topology=run.topology,
+        worker=worker,
+        concurrency=worker_number,
+        signaler=signaler,
+        run_profiler=manager.run_profiler if send_run_profile else None,
+        block_durations=manager.run_profiler.get_block_durations(),
+        signal_stats=manager.signal_stats,
+    )
+    run.async_runtime = runtime
 
-    for i in range(len(edges)):
-        e = edges[i]
-        _id = e["id"]
-        u = e["source"]
-        v = e["target"]
-        label = e["sourceHandle"]
-        target_label_id = e["targetHandle"]
-        v_inputs = dict_node_inputs[v]
-        target_input = cast(
-            dict[str, str],
-            next(
-                filter(
-                    lambda input, target_label_id=target_label_id: input.get("id", "")
-                    == target_label_id,
-                    v_inputs,
-                ),
-                None,
-            ),
-        )
-        logger.debug(f"----target_input----\n{target_input}")
-        target_label = "default"
-        multiple = False
-        if target_input:
-            target_label = target_input.get("name", "default")
-            multiple = target_input.get("multiple", False)
-
-        logger.debug(
-            f"Adding edge from {u} to {v}\n,"
-            f"inputs: {v_inputs}, chosen label: {target_label},\n"
-            f"target_label_id: {target_label_id}"
-        )
-        nx_graph.add_edge(
-            u, v, label=label, target_label=target_label, id=_id, multiple=multiple
-        )
+    async def run_runtime():
+        try:
+            await runtime.run()
+        finally:
+            manager.end_run(run.jobset_id, run)
+
+    manager.run_pool.submit(run_runtime)
 
-    return nx_graph
+
+def create_backend(
+    manager: Manager,
+    imported_functions: dict[str, Any],
+    worker_number: int,
+    worker_backend: WorkerBackendType,
+    project_path: str | None,
+) -> BlockBackend:
+    return create_block_backend(
+        imported_functions,
+        worker_backend,
+        lambda: manager.get_block_process_pool(worker_number),
+        project_path,
+    )
 
 
 # clears memory used by some worker nodes and job results
@@ -228,11 +219,12 @@ async def prepare_jobs_and_run_fc(request: PostWFC, manager: Manager):
     fc = json.loads(request.fc)
 
     def clean_up_function():
-        manager.end_worker_threads()
+        manager.end_runs()
         clear_memory()
 
-    # clean up before next run
-    clean_up_function()
+    if request.cancelExistingJobs:
+        # clean up before next run
+        clean_up_function()
 
     await manager.ws.broadcast(
         WorkerJobResponse(
@@ -240,14 +232,10 @@ async def prepare_jobs_and_run_fc(request: PostWFC, manager: Manager):
         )
     )
 
-    # Create new task queue and finish queue
-    manager.task_queue = Queue()
-    manager.finish_queue = Queue()
-
-    # Create the topology
-    manager.running_topology = create_topology(
-        request,
-    )  # pass clean up func for when topology ends
+    # Create the topology, the run gets its own scheduling state
+    run = manager.start_run(request.jobsetId, create_topology(request))
+    run.topology.set_block_durations(manager.run_profiler.get_block_durations())
+    manager.run_profiler.start(request.jobsetId)
 
     """
     ____________________________________________________________________________
@@ -260,9 +248,7 @@ async def prepare_jobs_and_run_fc(request: PostWFC, manager: Manager):
     await asyncio.create_task(Signaler(manager.ws).signal_prejob_op(request.jobsetId))
 
     nodes = fc["nodes"]
-    packages_dict = {
-        package.name: package.version for package in importlib.metadata.distributions()
-    }
+    package_index = PackageIndex.get_instance()
     missing_packages: list[str] = []
 
     socket_msg["SYSTEM_STATUS"] = STATUS_CODES["COLLECTING_PIP_DEPENDENCIES"]
@@ -272,14 +258,13 @@ async def prepare_jobs_and_run_fc(request: PostWFC, manager: Manager):
         if "pip_dependencies" not in node["data"]:
             continue
         for package in node["data"]["pip_dependencies"]:
-            pckg = packages_dict.get(package["name"])
-            if not pckg:
-                pckg_str = (
-                    f"{package['name']}=={package['v']}"
-                    if "v" in package
-                    else f"{package['name']}"
-                )
-                logger.debug(f"Package: {package['name']} is missing!")
+            if not package_index.satisfies(package["name"], package.get("v")):
+                version = package.get("v") or ""
+                # a bare version is pinned, a specifier (">=1.2") is kept as is
+                if version[:1].isalnum():
+                    version = f"=={version}"
+                pckg_str = f"{package['name']}{version}"
+                logger.debug(f"Package: {pckg_str} is missing!")
                 missing_packages.append(pckg_str)
             else:
                 logger.debug(f"Package: {package['name']} is already installed!")
@@ -298,6 +283,7 @@ async def prepare_jobs_and_run_fc(request: PostWFC, manager: Manager):
             logger.error("Pre job operation failed! Look at the errors printed above!")
             socket_msg["SYSTEM_STATUS"] = STATUS_CODES["PRE_JOB_OP_FAILED"]
             await manager.ws.broadcast(socket_msg)
+            manager.end_run(request.jobsetId, run)
             return
         logger.info("Pre job operation successful!")
 
@@ -306,7 +292,7 @@ async def prepare_jobs_and_run_fc(request: PostWFC, manager: Manager):
 
     # get the amount of workers needed
     funcs, errs = pre_import_functions(
-        topology=manager.running_topology,
+        topology=run.topology,
         project_path=request.projectPath
     )
 
@@ -315,8 +301,16 @@ async def prepare_jobs_and_run_fc(request: PostWFC, manager: Manager):
         logger.error(f"Preflight check failed! \n {', '.join(errs)}")
         socket_msg.FAILED_NODES = errs
         await manager.ws.broadcast(socket_msg)
+        manager.end_run(request.jobsetId, run)
         return
 
+    if request.incremental:
+        run.topology.cache_keys = compute_cache_keys(run.topology, funcs)
+    if request.fuseChains:
+        run.topology.fused_chains = find_fused_chains(
+            run.topology, funcs, request.observeBlocks
+        )
+
     logger.debug(
         f"PRE JOB OPERATION TOOK {time.time() - pre_job_op_start} SECONDS TO COMPLETE"
     )
@@ -328,26 +322,65 @@ async def prepare_jobs_and_run_fc(request: PostWFC, manager: Manager):
     socket_msg["SYSTEM_STATUS"] = STATUS_CODES["RUN_IN_PROCESS"]
     await manager.ws.broadcast(socket_msg)
 
+    plot_limits = {
+        kwarg: limit
+        for kwarg, limit in [
+            ("plot_max_points", request.plotMaxPoints),
+            ("plot_max_pixels", request.plotMaxPixels),
+        ]
+        if limit is not None
+    }
+
     # spawn threads
     os.environ["OBJC_DISABLE_INITIALIZE_FORK_SAFETY"] = "YES"
+    if request.runtime == "asyncio":
+        spawn_async_runtime(
+            manager,
+            run,
+            funcs,
+            request.observeBlocks,
+            request.nodeDelay,
+            request.maximumConcurrentWorkers,
+            request.workerBackend,
+            request.projectPath,
+            manager.result_cache if request.incremental else None,
+            request.profiling,
+            send_run_profile=request.profiling,
+            plot_limits=plot_limits,
+            stream_buffer=request.streamBuffer,
+        )
+        asyncio.create_task(cancel_when_max_time(manager, run, request.maximumRuntime))
+        return
+
     spawn_workers(
         manager,
+        run,
         funcs,
         request.observeBlocks,
         request.nodeDelay,
         request.maximumConcurrentWorkers,
+        request.workerBackend,
+        request.projectPath,
+        manager.result_cache if request.incremental else None,
+        request.profiling,
+        plot_limits,
+        request.streamBuffer,
     )
-    spawn_producer(manager)
+    spawn_producer(manager, run, send_run_profile=request.profiling)
 
-    asyncio.create_task(cancel_when_max_time(manager, request))
+    asyncio.create_task(cancel_when_max_time(manager, run, request.maximumRuntime))
 
 
-async def cancel_when_max_time(manager: Manager, request: PostWFC):
-    await asyncio.sleep(request.maximumRuntime)
-    if manager.running_topology and not manager.running_topology.is_cancelled():
-        logger.debug("Maximum runtime exceeded, cancelling topology")
-        manager.running_topology.cancel()
-        await Signaler(manager.ws).signal_max_runtime_exceeded(request.jobsetId)
+async def cancel_when_max_time(
+    manager: Manager, run: JobsetRun, maximum_runtime: float
+):
+    await asyncio.sleep(maximum_runtime)
+    # the jobset may have been posted again meanwhile, its new run has its own timer
+    if manager.get_run(run.jobset_id) is not run or run.topology.is_cancelled():
+        return
+    logger.debug("Maximum runtime exceeded, cancelling topology")
+    manager.end_run(run.jobset_id, run)
+    await Signaler(manager.ws).signal_max_runtime_exceeded(run.jobset_id)
 
 
 def stream_response(proc: Popen[bytes]):
@@ -378,3 +411,5 @@ async def install_packages(missing_packages: list[str]):
     except Exception as e:
         logger.error(f"{e}{traceback.format_exc()}")
         return False
+    finally:
+        PackageIndex.get_instance().invalidate()
@@ -1,25 +1,36 @@
-from typing import Any, cast
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import ModuleType
+from typing import Any, Callable, cast
 
-from pkgs.atlasvibe.atlasvibe import NoInitFunctionError, get_node_init_function
+from pkgs.atlasvibe.atlasvibe import (
+    JobService,
+    NoInitFunctionError,
+    get_node_init_function,
+)
 
 from captain.models.topology import Topology
 from captain.utils.project_blocks_loader import get_module_for_block, get_project_loader
 
 
-def pre_import_functions(topology: Topology, project_path: str | None = None):
-    functions: dict[str, str] = {}
-    errors: dict[str, str] = {}
-    for block_id in cast(list[str], topology.original_graph.nodes):
-        # get the block function
-        block = cast(dict[str, Any], topology.original_graph.nodes[block_id])
-        cmd: str = block["cmd"]
-        module = get_module_func(cmd, project_path)
-        if module is None:
-            errors[block_id] = f"Failed to load module for block '{cmd}'"
-            continue
-        func = getattr(module, cmd)
+# imports of distinct block modules running at the same time
+IMPORT_THREADS = 8
+
 
-        preflight = next(
+class ImportedBlock:
+    """
+    A block function with the preflight function of its module, valid as long
+    as the module file keeps its modification time.
+    """
+
+    def __init__(self, cmd: str, module: ModuleType, project_path: str | None):
+        self.func: Callable[..., Any] = getattr(module, cmd)
+        self.module_file: str | None = getattr(module, "__file__", None)
+        self.mtime = get_mtime(self.module_file)
+        self.project_path = project_path
+        self.preflight: Callable[[], Any] | None = next(
             (
                 f
                 for f in module.__dict__.values()
@@ -27,19 +38,117 @@ def pre_import_functions(topology: Topology, project_path: str | None = None):
             ),
             None,
         )
+        self.preflight_passed = False
+        self.lock = threading.Lock()
 
-        if preflight is not None:
+    def is_current(self, project_path: str | None) -> bool:
+        return self.project_path == project_path and (
+            get_mtime(self.module_file) == self.mtime
+        )
+
+    def run_preflight(self) -> str | None:
+        """
+        Runs the preflight function until it passes once, returns its error.
+        """
+        with self.lock:
+            if self.preflight is None or self.preflight_passed:
+                return None
             try:
-                preflight()
+                self.preflight()
             except Exception as e:
-                errors[block_id] = str(e)
+                return str(e)
+            self.preflight_passed = True
+            return None
+
+
+# cmd -> last import of the block
+_imported_blocks: dict[str, ImportedBlock] = {}
+
+
+def get_mtime(path: str | None) -> float:
+    if path is None:
+        return 0.0
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
+
+
+def import_block(cmd: str, project_path: str | None = None) -> ImportedBlock | None:
+    """
+    Imports block `cmd`, or returns its previous import when its module file
+    didn't change since.
+    """
+    cached = _imported_blocks.get(cmd)
+    if cached is not None and cached.is_current(project_path):
+        return cached
+    module = get_module_func(cmd, project_path)
+    if module is None or not callable(getattr(module, cmd, None)):
+        return None
+    block = ImportedBlock(cmd, module, project_path)
+    _imported_blocks[cmd] = block
+    return block
+
+
+def import_blocks(
+    cmds: list[str], project_path: str | None = None
+) -> dict[str, ImportedBlock | None]:
+    """
+    Imports every distinct block of `cmds`, the modules that need to be
+    (re)imported are loaded in parallel.
+    """
+    get_project_loader(project_path).initialize()
+    cmds = list(dict.fromkeys(cmds))
+    stale = [
+        cmd
+        for cmd in cmds
+        if cmd not in _imported_blocks
+        or not _imported_blocks[cmd].is_current(project_path)
+    ]
+    if len(stale) > 1:
+        with ThreadPoolExecutor(min(IMPORT_THREADS, len(stale))) as executor:
+            imported = dict(
+                zip(stale, executor.map(lambda c: import_block(c, project_path), stale))
+            )
+    else:
+        imported = {cmd: import_block(cmd, project_path) for cmd in stale}
+    blocks = {cmd: _imported_blocks.get(cmd) for cmd in cmds}
+    blocks.update(imported)
+    return blocks
+
+
+def pre_import_functions(topology: Topology, project_path: str | None = None):
+    functions: dict[str, Callable[..., Any]] = {}
+    errors: dict[str, str] = {}
+    graph = topology.original_graph
+    blocks = import_blocks(
+        [graph.nodes[block_id]["cmd"] for block_id in graph.nodes], project_path
+    )
+    # the preflight of a block runs once, whatever the number of its nodes
+    preflight_errors: dict[str, str | None] = {}
+    for block_id in cast(list[str], graph.nodes):
+        # get the block function
+        block = cast(dict[str, Any], graph.nodes[block_id])
+        cmd: str = block["cmd"]
+        imported = blocks[cmd]
+        if imported is None:
+            errors[block_id] = f"Failed to load module for block '{cmd}'"
+            continue
+        func = imported.func
+
+        if cmd not in preflight_errors:
+            preflight_errors[cmd] = imported.run_preflight()
+        preflight_error = preflight_errors[cmd]
+        if preflight_error is not None:
+            errors[block_id] = preflight_error
 
         # check if the func has an init function, and initialize it if it does to the specified node id
         try:
             init_func = get_node_init_function(func)
-            init_func.run(
-                block_id, block["init_ctrls"]
-            )  # node id is used to specify storage: each node of the same type will have its own storage
+            with use_block_namespace(func, topology.jobset_id):
+                init_func.run(
+                    block_id, block["init_ctrls"]
+                )  # node id is used to specify storage: each node of the same type will have its own storage
         except NoInitFunctionError:
             pass
         except Exception as e:
@@ -49,6 +158,54 @@ def pre_import_functions(topology: Topology, project_path: str | None = None):
     return functions, errors
 
 
+def is_stateful_block(func: Callable[..., Any], shared_store: bool = False) -> bool:
+    """
+    Whether a block keeps state outside of its inputs and outputs (SmallMemory,
+    a node init container or a device connection). Such blocks must run in the
+    process that owns that state. With a `shared_store` (see `dao_server`),
+    SmallMemory is reachable from every process.
+    """
+    module = sys.modules.get(func.__module__)
+    if not shared_store and module is not None and "SmallMemory" in vars(module):
+        return True
+    if getattr(func, "inject_connection", False):
+        return True
+    try:
+        get_node_init_function(func)
+        return True
+    except NoInitFunctionError:
+        return False
+
+
+def get_block_job_service(func: Callable[..., Any]) -> JobService:
+    """
+    Returns a JobService bound to the job store the block writes its results to.
+    Blocks import the top-level `atlasvibe` package, which is not necessarily the
+    same module object as `pkgs.atlasvibe.atlasvibe`.
+    """
+    job_service_cls = getattr(func, "__globals__", {}).get("JobService", JobService)
+    return job_service_cls()
+
+
+def use_block_namespace(func: Callable[..., Any], jobset_id: str):
+    """
+    Context manager making the block (and the job store calls made around it)
+    read and write the data of `jobset_id`, see `Dao.use_namespace`.
+    """
+    return get_block_job_service(func).dao.use_namespace(jobset_id)
+
+
+def get_block_daos(functions: dict[str, Callable[..., Any]]) -> list[Any]:
+    """
+    The distinct job stores the blocks write to (see `get_block_job_service`).
+    """
+    daos = {}
+    for func in functions.values():
+        dao = get_block_job_service(func).dao
+        daos[id(dao)] = dao
+    return list(daos.values())
+
+
 mapping: dict[str, str] = {}
 
 
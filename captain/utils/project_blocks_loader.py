@@ -146,10 +146,10 @@ class ProjectBlocksLoader:
             return None
             
         try:
-            # Import and reload to get latest changes
-            module = importlib.import_module(module_path)
-            module = importlib.reload(module)
-            return module
+            # Import, or reload a module imported before to get latest changes
+            if module_path not in sys.modules:
+                return importlib.import_module(module_path)
+            return importlib.reload(sys.modules[module_path])
         except Exception as e:
             logger.error(f"Failed to import module '{module_path}': {e}")
             return None
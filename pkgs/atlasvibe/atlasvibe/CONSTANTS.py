@@ -11,3 +11,6 @@ else:
     ATLASVIBE_CACHE_DIR = os.path.realpath(os.path.join(os.environ["HOME"], ATLASVIBE_DIR))
 
 KEYRING_KEY = "ATLASVIBE_KEYRING_KEY"
+
+# path of the Unix socket of a shared `DaoServer`, the job store is in-process when unset
+DAO_SOCKET_ENV = "ATLASVIBE_DAO_SOCKET"
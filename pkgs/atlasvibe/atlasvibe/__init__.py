@@ -18,3 +18,6 @@ from .instruments import *  # noqa: F403
 from .models import *  # noqa: F403
 from .connection_manager import *  # noqa: F403
 from .env_var import *  # noqa: F403
+from .package_index import *  # noqa: F403
+from .streaming import *  # noqa: F403
+from .copy_on_write import *  # noqa: F403
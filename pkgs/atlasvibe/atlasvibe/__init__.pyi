@@ -16,6 +16,9 @@ from .node_preflight import *  # noqa: F403
 from .config import *  # noqa: F403
 from .atlasvibe_cloud import *  # noqa: F403
 from .models import *  # noqa: F403
+from .package_index import *  # noqa: F403
+from .streaming import *  # noqa: F403
+from .copy_on_write import *  # noqa: F403
 
 def atlasvibe(
     original_function: Callable[..., DataContainer | dict[str, Any] | TypedDict | None]  # noqa: F405
@@ -25,4 +28,6 @@ def atlasvibe(
     deps: Optional[list[str]] = None,
     inject_node_metadata: bool = False,
     inject_connection: bool = False,
+    streaming: bool = False,
+    copy_inputs: bool = False,
 ) -> Callable[..., DataContainer | dict[str, Any] | None]: ...  # noqa: F405
@@ -21,7 +21,6 @@ def TORCH_NODE(default: Matrix) -> Matrix:
 """
 
 import hashlib
-import importlib.metadata
 import inspect
 import logging
 import multiprocessing
@@ -44,6 +43,7 @@ import portalocker
 
 from ._logging import LogPipe, LogPipeMode, StreamEnum
 from .CONSTANTS import ATLASVIBE_CACHE_DIR
+from .package_index import PackageIndex
 
 __all__ = ["run_in_venv"]
 
@@ -223,7 +223,7 @@ class PipInstallThread(threading.Thread):
     @staticmethod
     def terminate_all():
         PipInstallThread._cancel_all_threads.set()
-        while all([thread.is_alive() for thread in PipInstallThread._threads.values()]):
+        while any(thread.is_alive() for thread in PipInstallThread._threads.values()):
             sleep(0.1)
 
 
@@ -306,14 +306,11 @@ def run_in_venv(pip_dependencies: list[str], verbose: bool = True):
             return func
 
         # Pre-pend atlasvibe and cloudpickle as mandatory pip dependencies
-        packages_dict = {
-            package.name: package.version
-            for package in importlib.metadata.distributions()
-        }
+        cloudpickle_version = PackageIndex.get_instance().get_version("cloudpickle")
         pip_dependencies = sorted(
             [
                 "atlasvibe",
-                f"cloudpickle=={packages_dict['cloudpickle']}",
+                f"cloudpickle=={cloudpickle_version}",
             ]
             + pip_dependencies
         )
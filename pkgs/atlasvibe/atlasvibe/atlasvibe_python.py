@@ -5,7 +5,9 @@
 # Refer to the LICENSE file for more details.
 
 import inspect
+import logging
 import os
+import time
 import traceback
 from contextlib import ContextDecorator
 from functools import wraps
@@ -14,13 +16,21 @@ from typing import Any, Callable, Optional
 
 from .config import logger
 from .connection_manager import DeviceConnectionManager
+from .copy_on_write import (
+    count_copies,
+    read_only_error_hint,
+    read_only_inputs,
+    writable_inputs,
+)
 from .data_container import DataContainer, Stateful
 from .job_result_utils import get_dc_from_result, get_frontend_res_obj_from_result
 from .job_service import JobService
+from .memory_profiling import start_memory_tracing, stop_memory_tracing
 from .models.JobResults.JobFailure import JobFailure
 from .models.JobResults.JobSuccess import JobSuccess
 from .node_init import NodeInitService
 from .parameter_types import format_param_value
+from .streaming import DataStream, buffer_streams, collect_streams
 from .utils import get_hf_hub_cache_path
 
 __all__ = ["atlasvibe_node", "atlasvibe", "DefaultParams", "display"]
@@ -42,18 +52,18 @@ def fetch_inputs(previous_jobs: list[dict[str, str]]):
     """
     dict_inputs: dict[str, DataContainer | list[DataContainer]] = dict()
 
-    try:
-        for prev_job in previous_jobs:
-            prev_job_id = prev_job.get("job_id")
-            input_name = prev_job.get("input_name", "")
-            multiple = prev_job.get("multiple", False)
-            edge = prev_job.get("edge", "")
+    for prev_job in previous_jobs:
+        prev_job_id = prev_job.get("job_id")
+        input_name = prev_job.get("input_name", "")
+        multiple = prev_job.get("multiple", False)
+        edge = prev_job.get("edge", "")
 
-            logger.debug(
-                f"fetching input from prev job id: {prev_job_id}"
-                + f"for input: {input_name} edge: {edge}"
-            )
+        logger.debug(
+            f"fetching input from prev job id: {prev_job_id}"
+            + f"for input: {input_name} edge: {edge}"
+        )
 
+        try:
             job_result = JobService().get_job_result(prev_job_id)
             if not job_result:
                 raise ValueError(
@@ -65,18 +75,23 @@ def fetch_inputs(previous_jobs: list[dict[str, str]]):
                 if edge != "default"
                 else get_dc_from_result(job_result)
             )
-            if result is not None:
-                logger.debug(f"got job result from {prev_job_id}")
-                if multiple:
-                    if input_name not in dict_inputs:
-                        dict_inputs[input_name] = [result]
-                    else:
-                        dict_inputs[input_name].append(result)
+        except Exception as e:
+            # not produced in this run (a branch not taken), the block reports
+            # the inputs it needs; the consumer count is left to the others
+            logger.debug(f"{e} {traceback.format_exc()}")
+            continue
+
+        # the scheduler frees the result once its last consumer got it
+        JobService().release_job_result(prev_job_id)
+        if result is not None:
+            logger.debug(f"got job result from {prev_job_id}")
+            if multiple:
+                if input_name not in dict_inputs:
+                    dict_inputs[input_name] = [result]
                 else:
-                    dict_inputs[input_name] = result
-
-    except Exception as e:
-        logger.debug(f"{e} {traceback.format_exc()}")
+                    dict_inputs[input_name].append(result)
+            else:
+                dict_inputs[input_name] = result
 
     return dict_inputs
 
@@ -121,6 +136,8 @@ def atlasvibe_node(
     deps: Optional[list[str]] = None,
     inject_node_metadata: bool = False,
     inject_connection: bool = False,
+    streaming: bool = False,
+    copy_inputs: bool = False,
 ):
     """
     Decorator to turn Python functions with numerical return
@@ -136,6 +153,10 @@ def atlasvibe_node(
     Parameters
     ----------
     `func`: Python function that returns DataContainer object
+    `streaming`: the function handles `DataStream` inputs (see `atlasvibe.streaming`),
+    the streams given to the other functions are collected into one container
+    `copy_inputs`: the function modifies its inputs in place and gets private
+    copies of them, the others get read-only views (see `atlasvibe.copy_on_write`)
 
     Returns
     -------
@@ -177,7 +198,19 @@ def atlasvibe_node(
             observe_blocks: list[str],
             previous_jobs: list[dict[str, str]] = [],
             ctrls: dict[str, Any] | None = None,
+            profile_memory: bool = False,
+            plot_max_points: int | None = None,
+            plot_max_pixels: int | None = None,
+            # inputs handed over by the caller instead of fetched from the job
+            # store (fused chains), keyed by input name
+            inputs: dict[str, Any] | None = None,
+            # when False the result is returned in `JobSuccess.output` instead
+            post_result: bool = True,
+            # chunks read ahead for each input stream of a streaming block, 0: none
+            stream_buffer: int = 0,
         ):
+            # time spent in each step of the job, in seconds
+            profile: dict[str, Any] = {}
             try:
                 logger.debug(f"previous jobs: {previous_jobs}")
                 # Get command parameters set by the user through the control panel
@@ -192,7 +225,25 @@ def atlasvibe_node(
                 logger.debug(
                     f"executing node_id: {node_id} previous_jobs: {previous_jobs}"
                 )
-                dict_inputs = fetch_inputs(previous_jobs)
+                step_start = time.perf_counter()
+                dict_inputs = (
+                    fetch_inputs(previous_jobs) if inputs is None else dict(inputs)
+                )
+                if not streaming:
+                    dict_inputs = {
+                        name: collect_streams(value)
+                        for name, value in dict_inputs.items()
+                    }
+                elif stream_buffer:
+                    dict_inputs = {
+                        name: buffer_streams(value, stream_buffer)
+                        for name, value in dict_inputs.items()
+                    }
+                # the arrays are shared with the other consumers of the results
+                dict_inputs = {
+                    name: read_only_inputs(value) for name, value in dict_inputs.items()
+                }
+                profile["fetch_time"] = time.perf_counter() - step_start
 
                 # constructing the inputs
                 logger.debug(f"constructing inputs for {func.__name__}")
@@ -213,7 +264,9 @@ def atlasvibe_node(
                         node_type="default",
                     )
 
-                logger.debug(f"{node_id} params: {args}")
+                if logger.isEnabledFor(logging.DEBUG):
+                    # formatting the inputs prints their arrays
+                    logger.debug(f"{node_id} params: {args}")
 
                 # check if node has an init container and if so, inject it
                 if NodeInitService().has_init_store(node_id):
@@ -242,14 +295,36 @@ def atlasvibe_node(
                 ##########################
                 # calling the node function
                 ##########################
-                dc_obj = func(**args)  # DataContainer object from node
+                if profile_memory:
+                    start_memory_tracing()
+                step_start = time.perf_counter()
+                try:
+                    with count_copies() as copies:
+                        if copy_inputs:
+                            for name in dict_inputs:
+                                args[name] = writable_inputs(args[name])
+                        try:
+                            dc_obj = func(**args)  # DataContainer object from node
+                        except ValueError as e:
+                            hint = read_only_error_hint(e)
+                            if hint is None:
+                                raise
+                            raise ValueError(hint) from e
+                finally:
+                    profile["function_time"] = time.perf_counter() - step_start
+                    profile["copies"] = copies.copies
+                    profile["copied_bytes"] = copies.copied_bytes
+                    if profile_memory:
+                        profile["peak_memory"] = stop_memory_tracing()
                 ##########################
                 # end calling the node function
                 ##########################
 
+                step_start = time.perf_counter()
+
                 # some special nodes like LOOP return dict instead of `DataContainer`
                 if isinstance(dc_obj, DataContainer) and not isinstance(
-                    dc_obj, Stateful
+                    dc_obj, (Stateful, DataStream)
                 ):
                     dc_obj.validate()  # Validate returned DataContainer object
                 elif dc_obj is not None:
@@ -257,19 +332,26 @@ def atlasvibe_node(
                         if isinstance(value, DataContainer):
                             value.validate()
 
+                profile["validation_time"] = time.perf_counter() - step_start
+
+                step_start = time.perf_counter()
                 # post result to the job service so we can get it later if needed
-                JobService().post_job_result(job_id, dc_obj)
+                if post_result:
+                    JobService().post_job_result(job_id, dc_obj)
 
                 # Package the result and return it
                 FN = func.__name__
                 result = get_frontend_res_obj_from_result(
-                    node_id, observe_blocks, dc_obj
+                    node_id, observe_blocks, dc_obj, plot_max_points, plot_max_pixels
                 )
+                profile["packaging_time"] = time.perf_counter() - step_start
                 return JobSuccess(
                     result=result,
                     fn=FN,
                     node_id=node_id,
                     jobset_id=jobset_id,
+                    profile=profile,
+                    output=None if post_result else dc_obj,
                 )
 
             except Exception as e:
@@ -281,8 +363,15 @@ def atlasvibe_node(
                     node_id=node_id,
                     error=str(e),
                     jobset_id=jobset_id,
+                    profile=profile,
                 )
 
+        # lets the scheduler know this block depends on a device handle living in this process
+        wrapper.inject_connection = inject_connection  # type: ignore
+        # the scheduler can hand the inputs over directly, see `inputs`
+        wrapper.accepts_inputs = True  # type: ignore
+        # its results can be lazy streams, bound to this process
+        wrapper.streaming = streaming  # type: ignore
         return wrapper
 
     if original_function:
@@ -20,6 +20,14 @@ class AtlasvibeConfig:
 
     def __init__(self):
         self.is_offline = False
+        # resolution of the plots sent to the front-end, 0 sends them as is
+        self.plot_max_points = 5000  # points per line
+        self.plot_max_pixels = 512 * 512  # pixels per image, cells per surface
+        # job results of this size or more (in bytes) can be spilled to disk,
+        # once they take more memory than the budget, see `result_spill`
+        self.result_spill_threshold = 16 * 2**20
+        self.result_memory_budget = 2 * 2**30
+        self.result_spill_dir: str | None = None  # the cache directory by default
 
 
 logger = logging.getLogger(LOGGER_NAME)
@@ -0,0 +1,161 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator
+
+import numpy as np
+from pandas import DataFrame as PandasDataFrame
+
+from .data_container import DataContainer, Stateful
+
+__all__ = ["writable"]
+
+"""
+Read-only inputs with copy-on-write.
+
+A job result is stored once and every block consuming it gets the same arrays:
+the block wrapper hands them over as read-only views (`read_only_inputs`), so
+fanning a large array out to many blocks doesn't duplicate it and no block can
+change the arrays another one sees. A block that needs to write to an input asks
+for a private buffer:
+
+    y = writable(default.y)  # the array itself if it's writable, else a copy
+    y += 1
+
+A block writing to a read-only array anyway fails, with a hint pointing to
+`writable` (see `read_only_error_hint`). Blocks written to modify their inputs
+in place opt in with `@atlasvibe(copy_inputs=True)` and get private copies of
+all of them (`writable_inputs`). The copies are counted per job (see
+`count_copies`) and reported in its profile.
+
+DataFrames are handed over as shallow copies: adding or dropping columns
+doesn't affect the other consumers and no data is copied, but the values are
+shared. A block editing them in place (`df.iloc[0] = ...`) must work on
+`df.copy()`, or opt in to `copy_inputs`, which copies the frames too.
+"""
+
+
+class CopyCount:
+    def __init__(self):
+        self.copies = 0
+        self.copied_bytes = 0
+
+    def add(self, nbytes: int):
+        self.copies += 1
+        self.copied_bytes += nbytes
+
+
+_copy_count: ContextVar[CopyCount | None] = ContextVar("copy_count", default=None)
+
+
+@contextmanager
+def count_copies() -> Iterator[CopyCount]:
+    """
+    Counts the copies made by `writable` in this thread (or task) meanwhile.
+    """
+    count = CopyCount()
+    token = _copy_count.set(count)
+    try:
+        yield count
+    finally:
+        _copy_count.reset(token)
+
+
+def writable(array: np.ndarray) -> np.ndarray:
+    """
+    `array` itself when it can be written to, a copy of it otherwise.
+    """
+    if array.flags.writeable:
+        return array
+    copy = array.copy()
+    count = _copy_count.get()
+    if count is not None:
+        count.add(copy.nbytes)
+    return copy
+
+
+def _copy_frame(frame: PandasDataFrame) -> PandasDataFrame:
+    copy = frame.copy(deep=True)
+    count = _copy_count.get()
+    if count is not None:
+        count.add(int(copy.memory_usage(index=True).sum()))
+    return copy
+
+
+def _shallow_frame(frame: PandasDataFrame) -> PandasDataFrame:
+    return frame.copy(deep=False)
+
+
+def _read_only_array(array: np.ndarray) -> np.ndarray:
+    view = array.view()
+    view.flags.writeable = False
+    return view
+
+
+def _convert_container(
+    dc: DataContainer, convert_array: Any, convert_frame: Any
+) -> DataContainer:
+    # a container of the same class sharing the (converted) values of `dc`
+    values: dict[str, Any] = {}
+    for key, value in dc.items():
+        if key == "type":
+            continue
+        if isinstance(value, np.ndarray):
+            value = convert_array(value)
+        elif isinstance(value, PandasDataFrame):
+            value = convert_frame(value)
+        elif isinstance(value, dict) and key != "extra":
+            value = {
+                k: convert_array(v) if isinstance(v, np.ndarray) else v
+                for k, v in value.items()
+            }
+        values[key] = value
+    converted = type(dc).__new__(type(dc))
+    DataContainer.__init__(converted, type=dc.type, **values)
+    return converted
+
+
+def _convert_inputs(value: Any, convert_array: Any, convert_frame: Any) -> Any:
+    if isinstance(value, DataContainer) and not isinstance(value, Stateful):
+        if value.type == "DataStream":
+            return value  # chunks are made on demand, they are never shared
+        return _convert_container(value, convert_array, convert_frame)
+    if isinstance(value, list):
+        return [_convert_inputs(item, convert_array, convert_frame) for item in value]
+    return value
+
+
+def read_only_inputs(value: Any) -> Any:
+    """
+    The input of a block (a container or a list of them) with its arrays
+    replaced by read-only views, nothing is copied.
+    """
+    return _convert_inputs(value, _read_only_array, _shallow_frame)
+
+
+def writable_inputs(value: Any) -> Any:
+    """
+    The input of a block with writable copies of its read-only arrays and of
+    its DataFrames, for the blocks modifying their inputs in place.
+    """
+    return _convert_inputs(value, writable, _copy_frame)
+
+
+# numpy's errors when writing to a read-only array
+_READ_ONLY_ERRORS = (
+    "assignment destination is read-only",
+    "output array is read-only",
+)
+
+
+def read_only_error_hint(error: BaseException) -> str | None:
+    """
+    The message to report for `error` if it was raised by numpy writing to a
+    read-only (shared) input array, None for the other errors.
+    """
+    if not isinstance(error, ValueError) or str(error) not in _READ_ONLY_ERRORS:
+        return None
+    return (
+        f"{error}: the input arrays are shared with the other blocks and can't be "
+        "written to, use `writable(array)` to get a private copy or decorate the "
+        "block with `@atlasvibe(copy_inputs=True)`"
+    )
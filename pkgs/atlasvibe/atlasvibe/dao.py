@@ -1,17 +1,49 @@
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
 from numpy import ndarray
 from pandas import DataFrame as PandasDataFrame
-from typing import Any, Callable
+from typing import Any, Callable, ContextManager, Hashable, Iterator, Protocol
 from threading import Lock
+from .CONSTANTS import DAO_SOCKET_ENV
 from .data_container import DCNpArrayType
+from .result_spill import ResultSpill
 
 MAX_LIST_SIZE = 1000
+JOB_LOCK_SHARDS = 64
 
-_dict_sm_lock = Lock()  # dict small memory lock
-_dict_job_lock = Lock()  # dict job lock
-_dict_node_init_container_lock = Lock()
-_dict_node_init_func_lock = Lock()
+
+class ShardedLock:
+    """
+    A set of locks picked by key hash, so threads updating different keys
+    don't wait on each other.
+    """
+
+    def __init__(self, shards: int = JOB_LOCK_SHARDS):
+        self.locks = [Lock() for _ in range(shards)]
+
+    def for_key(self, key: Hashable) -> Lock:
+        return self.locks[hash(key) % len(self.locks)]
+
+    @contextmanager
+    def all(self) -> Iterator[None]:
+        for lock in self.locks:  # always in the same order
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(self.locks):
+                lock.release()
+
+
+_job_locks = ShardedLock()  # job results and consumer counts, by job id
 _init_lock = Lock()
 
+# namespace (the jobset id) of the data read and written in the current context
+_current_namespace: ContextVar[str | None] = ContextVar(
+    "atlasvibe_dao_namespace", default=None
+)
+
 """
 Used by clients to create a new instance of the datastorage
 """
@@ -21,143 +53,356 @@ def create_storage():
     return Dao.get_instance()
 
 
+class DaoBackend(Protocol):
+    """
+    The job store used by the blocks and the runtime: the in-process `Dao`, or
+    a `RemoteDao` client of a `DaoServer` shared by several processes.
+    """
+
+    shared: bool  # whether other processes see the same data
+
+    def use_namespace(self, name: str | None) -> ContextManager[None]: ...
+
+    def clear_namespace(self, name: str | None): ...
+
+    def clear_namespaces(self): ...
+
+    def share_node_init_containers(self, source: str | None, target: str | None): ...
+
+    def get_job_result(self, job_id: str) -> Any | None: ...
+
+    def post_job_result(self, job_id: str, result: Any): ...
+
+    def clear_job_results(self): ...
+
+    def job_exists(self, job_id: str) -> bool: ...
+
+    def delete_job(self, job_id: str): ...
+
+    def set_job_consumers(self, job_id: str, count: int): ...
+
+    def release_job_result(self, job_id: str): ...
+
+    def clear_small_memory(self): ...
+
+    def write_memory(self, memory_key: str, meta_data: dict[str, Any], value: Any): ...
+
+    def read_memory(self, memory_key: str) -> tuple[dict[str, Any], Any] | None: ...
+
+    def delete_memory(self, memory_key: str): ...
+
+    def clear_node_init_containers(self): ...
+
+    def set_init_container(self, node_id: str, value: Any): ...
+
+    def get_init_container(self, node_id: str) -> Any: ...
+
+    def has_init_container(self, node_id: str) -> bool: ...
+
+    def set_init_function(self, node_func: Callable, node_init_func: Any): ...
+
+    def get_init_function(self, node_func: Callable) -> Any: ...
+
+    def has_init_function(self, node_func: Callable) -> bool: ...
+
+
+def _create_backend() -> DaoBackend:
+    # the server is picked up from the environment, so processes spawned by
+    # one using it (the block process pool) use it too
+    path = os.environ.get(DAO_SOCKET_ENV)
+    if not path:
+        return Dao()
+    from .dao_server import RemoteDao  # avoid circular import
+
+    return RemoteDao(path)
+
+
 """
 This class is a Singleton that acts as a in-memory datastorage
 
-IMPORTANT: The commented code should not be removed, as it acts as a reference for the future
-in case we need to implement a Redis based datastorage
+It is the default `DaoBackend`. When `ATLASVIBE_DAO_SOCKET` is set, the
+singleton is a `RemoteDao` talking to a `DaoServer` (see `dao_server`), which
+keeps one of these for every process connected to it.
+
+Job results, small memory and node init containers live in namespaces, one per
+jobset, so flowcharts running side by side don't see each other's data. The
+namespace is picked from the context (see `use_namespace`), code running outside
+of a jobset uses the default (`None`) namespace. A namespace is created by the
+first write to it: reads and releases find nothing in a namespace that doesn't
+exist, so a worker finishing after its run was cleared doesn't bring it back.
+
+Reads and writes touching a single key are single dict operations, atomic in
+CPython, and take no lock: each node only writes its own keys. Only the updates
+spanning several operations (consumer counts, the replacement of spilled
+results, clearing the job results) lock, on the shard of the job id.
 """
 
 
+class DaoNamespace:
+    def __init__(self):
+        self.storage = {}  # small memory
+        self.memory = {}  # `SmallMemory`: memory key -> (metadata, value)
+        self.job_results = {}
+        self.job_consumers = {}  # job id -> fetches left before the result is freed
+        self.node_init_container = {}
+
+
 class Dao:
-    _instance = None
+    _instance: DaoBackend | None = None
+    shared = False
 
     @classmethod
-    def get_instance(cls):
+    def get_instance(cls) -> DaoBackend:
         with _init_lock:
             if Dao._instance is None:
-                Dao._instance = Dao()
+                Dao._instance = _create_backend()
             return Dao._instance
 
     def __init__(self):
-        self.storage = {}  # small memory
-        self.job_results = {}
-        self.node_init_container = {}
+        self.namespaces: dict[str | None, DaoNamespace] = {None: DaoNamespace()}
+        # shared by every namespace, init functions are registered on import
         self.node_init_func = {}
+        # large job results of every namespace, spilled to disk over a budget
+        self.result_spill = ResultSpill(_job_locks)
+
+    """
+    METHODS FOR NAMESPACES
+    """
+
+    def find_namespace(self) -> DaoNamespace | None:
+        """
+        The namespace of the current context if it exists. Reads use it, so a
+        late read of a run already cleared doesn't bring its namespace back.
+        """
+        return self.namespaces.get(_current_namespace.get())
+
+    def get_namespace(self) -> DaoNamespace:
+        """
+        The namespace of the current context, created by the first write.
+        """
+        name = _current_namespace.get()
+        namespace = self.namespaces.get(name)
+        if namespace is None:
+            with _init_lock:
+                namespace = self.namespaces.setdefault(name, DaoNamespace())
+        return namespace
+
+    @contextmanager
+    def use_namespace(self, name: str | None) -> Iterator[None]:
+        """
+        Reads and writes the data of namespace `name` (a jobset id) in the
+        current context (thread or task).
+        """
+        token = _current_namespace.set(name)
+        try:
+            yield
+        finally:
+            _current_namespace.reset(token)
+
+    def clear_namespace(self, name: str | None):
+        with _init_lock:
+            if name is None:
+                namespace = self.namespaces[None]
+                self.namespaces[None] = DaoNamespace()
+            else:
+                namespace = self.namespaces.pop(name, None)
+        if namespace is not None:
+            self.result_spill.discard_all(namespace.job_results)
+
+    def share_node_init_containers(self, source: str | None, target: str | None):
+        """
+        Makes namespace `target` use the node init containers of `source`, so
+        jobsets running variants of one flowchart don't initialize it again.
+        """
+        shared = self.namespaces.get(source)
+        if shared is None:
+            return  # nothing was initialized there, don't bring it to life
+        with self.use_namespace(target):
+            self.get_namespace().node_init_container = shared.node_init_container
+
+    def clear_namespaces(self):
+        with _init_lock:
+            namespaces = self.namespaces
+            self.namespaces = {None: DaoNamespace()}
+        for namespace in namespaces.values():
+            self.result_spill.discard_all(namespace.job_results)
+
+    def read_storage(self, name: str = "storage") -> dict[str, Any]:
+        # a store of the namespace for reading, empty if the namespace doesn't exist
+        namespace = self.find_namespace()
+        return {} if namespace is None else getattr(namespace, name)
+
+    @property
+    def storage(self) -> dict[str, Any]:
+        return self.get_namespace().storage
+
+    @property
+    def memory(self) -> dict[str, tuple[dict[str, Any], Any]]:
+        return self.get_namespace().memory
+
+    @property
+    def job_results(self) -> dict[str, Any]:
+        return self.get_namespace().job_results
+
+    @property
+    def job_consumers(self) -> dict[str, int]:
+        return self.get_namespace().job_consumers
+
+    @property
+    def node_init_container(self) -> dict[str, Any]:
+        return self.get_namespace().node_init_container
 
     """
     METHODS FOR JOB RESULTS
     """
 
     def get_job_result(self, job_id: str) -> Any | None:
-        with _dict_job_lock:
-            res = self.job_results.get(job_id, None)
+        job_results = self.read_storage("job_results")
+        res = job_results.get(job_id, None)
         if res is None:
             raise ValueError(f"Job result with id {job_id} does not exist")
+        self.result_spill.touch(job_results, job_id)
         return res
 
     def post_job_result(self, job_id: str, result: Any):
-        with _dict_job_lock:
-            self.job_results[job_id] = result
+        job_results = self.job_results
+        with _job_locks.for_key(job_id):
+            job_results[job_id] = result
+        self.result_spill.add(job_results, job_id, result)
 
     def clear_job_results(self):
-        with _dict_job_lock:
-            self.job_results.clear()
+        namespace = self.find_namespace()
+        if namespace is None:
+            return
+        with _job_locks.all():
+            namespace.job_results.clear()
+            namespace.job_consumers.clear()
+        self.result_spill.discard_all(namespace.job_results)
 
     def job_exists(self, job_id: str) -> bool:
-        with _dict_job_lock:
-            return job_id in self.job_results.keys()
+        return job_id in self.read_storage("job_results")
 
     def delete_job(self, job_id: str):
-        with _dict_job_lock:
-            self.job_results.pop(job_id, None)
+        namespace = self.find_namespace()
+        if namespace is None:
+            return
+        with _job_locks.for_key(job_id):
+            namespace.job_results.pop(job_id, None)
+            namespace.job_consumers.pop(job_id, None)
+        self.result_spill.discard(namespace.job_results, job_id)
+
+    def set_job_consumers(self, job_id: str, count: int):
+        with _job_locks.for_key(job_id):
+            self.job_consumers[job_id] = count
+
+    def release_job_result(self, job_id: str):
+        """
+        Called each time a consumer is done fetching the result of `job_id`.
+        The result is freed once its last consumer fetched it; results without
+        a consumer count are kept until the job results are cleared.
+        """
+        namespace = self.find_namespace()
+        if namespace is None:
+            return
+        job_results = namespace.job_results
+        job_consumers = namespace.job_consumers
+        if job_id not in job_consumers:
+            return
+        with _job_locks.for_key(job_id):
+            count = job_consumers.get(job_id)
+            if count is None:
+                return
+            if count > 1:
+                job_consumers[job_id] = count - 1
+                return
+            del job_consumers[job_id]
+            job_results.pop(job_id, None)
+        self.result_spill.discard(job_results, job_id)
 
     """
     METHODS FOR SMALL MEMORY
     """
 
     def clear_small_memory(self):
-        with _dict_sm_lock:
-            self.storage.clear()
+        namespace = self.find_namespace()
+        if namespace is None:
+            return
+        namespace.storage.clear()
+        namespace.memory.clear()
 
     def check_if_valid(self, result: Any | None, expected_type: Any):
-        with _dict_sm_lock:
-            if result is not None and not isinstance(result, expected_type):
-                raise ValueError(
-                    f"Expected {expected_type} type, but got {type(result)} instead!"
-                )
+        if result is not None and not isinstance(result, expected_type):
+            raise ValueError(
+                f"Expected {expected_type} type, but got {type(result)} instead!"
+            )
+
+    def write_memory(self, memory_key: str, meta_data: dict[str, Any], value: Any):
+        """
+        Stores `value` with its metadata in one write, readers never see the
+        metadata of one value with another.
+        """
+        self.memory[memory_key] = (meta_data, value)
+
+    def read_memory(self, memory_key: str) -> tuple[dict[str, Any], Any] | None:
+        return self.read_storage("memory").get(memory_key, None)
+
+    def delete_memory(self, memory_key: str):
+        namespace = self.find_namespace()
+        if namespace is not None:
+            namespace.memory.pop(memory_key)
 
     def set_np_array(self, memo_key: str, value: DCNpArrayType):
-        with _dict_sm_lock:
-            self.storage[memo_key] = value
+        self.storage[memo_key] = value
 
     def set_pandas_dataframe(self, key: str, dframe: PandasDataFrame):
-        with _dict_sm_lock:
-            self.storage[key] = dframe
+        self.storage[key] = dframe
 
     def set_str(self, key: str, value: str):
-        with _dict_sm_lock:
-            self.storage[key] = value
+        self.storage[key] = value
 
     def set_bool(self, key: str, value: bool):
-        with _dict_sm_lock:
-            self.storage[key] = value
+        self.storage[key] = value
 
     def get_pd_dataframe(self, key: str) -> PandasDataFrame | None:
-        with _dict_sm_lock:
-            encoded = self.storage.get(key, None)
+        encoded = self.read_storage().get(key, None)
         self.check_if_valid(encoded, PandasDataFrame)
         return encoded
 
     def get_np_array(self, memo_key: str) -> DCNpArrayType | None:
-        with _dict_sm_lock:
-            encoded = self.storage.get(memo_key, None)
+        encoded = self.read_storage().get(memo_key, None)
         self.check_if_valid(encoded, ndarray)
         return encoded
 
     def get_str(self, key: str) -> str | None:
-        with _dict_sm_lock:
-            encoded = self.storage.get(key, None)
-        return encoded
+        return self.read_storage().get(key, None)
 
     def get_obj(self, key: str) -> dict[str, Any] | None:
-        with _dict_sm_lock:
-            r_obj = self.storage.get(key, None)
+        r_obj = self.read_storage().get(key, None)
         self.check_if_valid(r_obj, dict)
         return r_obj
 
     def set_obj(self, key: str, value: dict[str, Any]):
-        with _dict_sm_lock:
-            self.storage[key] = value
+        self.storage[key] = value
 
     def delete_object(self, key: str):
-        with _dict_sm_lock:
-            self.storage.pop(key)
+        namespace = self.find_namespace()
+        if namespace is not None:
+            namespace.storage.pop(key)
 
     def remove_item_from_set(self, key: str, item: Any):
-        with _dict_sm_lock:
-            res = self.storage.get(key, None)
+        res = self.read_storage().get(key, None)
         self.check_if_valid(res, set)
         if not res:
             return
-        with _dict_sm_lock:
-            res.remove(item)
+        res.remove(item)
 
     def add_to_set(self, key: str, value: Any):
-        with _dict_sm_lock:
-            res: set[Any] | None = self.storage.get(key, None)
-        if res is None:
-            res = set()
-            res.add(value)
-            self.storage[key] = res
-            return
+        res: set[Any] = self.storage.setdefault(key, set())
         self.check_if_valid(res, set)
-        with _dict_sm_lock:
-            res.add(value)
+        res.add(value)
 
     def get_set_list(self, key: str) -> list[Any] | None:
-        with _dict_sm_lock:
-            res = self.storage.get(key, None)
+        res = self.read_storage().get(key, None)
         if res is None:
             return None
         self.check_if_valid(res, set)
@@ -169,42 +414,35 @@ class Dao:
 
     # -- for node container --
     def clear_node_init_containers(self):
-        with _dict_node_init_container_lock:
-            self.node_init_container.clear()
+        self.read_storage("node_init_container").clear()
 
     def set_init_container(self, node_id: str, value):
-        with _dict_node_init_container_lock:
-            self.node_init_container[node_id] = value
+        self.node_init_container[node_id] = value
 
     def get_init_container(self, node_id: str):
-        with _dict_node_init_container_lock:
-            res = self.node_init_container.get(node_id, None)
+        res = self.read_storage("node_init_container").get(node_id, None)
         from .node_init import NodeInitContainer  # avoid circular import
 
         self.check_if_valid(res, NodeInitContainer)
         return res
 
     def has_init_container(self, node_id: str) -> bool:
-        with _dict_node_init_container_lock:
-            return node_id in self.node_init_container.keys()
+        return node_id in self.read_storage("node_init_container")
 
     # ------------------------
 
     # -- for node init function --
     def set_init_function(self, node_func, node_init_func):
-        with _dict_node_init_func_lock:
-            self.node_init_func[node_func] = node_init_func
+        self.node_init_func[node_func] = node_init_func
 
     def get_init_function(self, node_func: Callable):
-        with _dict_node_init_func_lock:
-            res = self.node_init_func.get(node_func, None)
+        res = self.node_init_func.get(node_func, None)
         from .node_init import NodeInit  # avoid circular import
 
         self.check_if_valid(res, NodeInit)
         return res
 
     def has_init_function(self, node_func) -> bool:
-        with _dict_node_init_func_lock:
-            return node_func in self.node_init_func.keys()
+        return node_func in self.node_init_func
 
     # ----------------------------
@@ -0,0 +1,364 @@
+import argparse
+import os
+import pickle
+import socket
+import socketserver
+import struct
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+from .CONSTANTS import ATLASVIBE_CACHE_DIR, DAO_SOCKET_ENV
+from .config import logger
+from .dao import Dao, _current_namespace
+from .shared_arrays import dumps_shared, loads_shared
+from .streaming import collect_streams
+
+__all__ = ["DaoServer", "RemoteDao"]
+
+"""
+Job store shared by several processes.
+
+A `DaoServer` keeps a `Dao` and serves it over a Unix socket (POSIX only). A
+`RemoteDao`, the `Dao` singleton of the processes started with
+`ATLASVIBE_DAO_SOCKET` set to the socket path, forwards its calls there, so
+process workers and headless runners see the same job results, small memory
+and node init containers.
+
+Every call is one request and one reply on a connection of the calling thread,
+made of a length header and a `dumps_shared` payload: large arrays are copied
+into shared memory segments and only their handles go through the socket. The
+namespace of the caller (see `Dao.use_namespace`) travels with each request.
+
+Node init functions are registered on import in every process and stay local,
+so do the init containers whose value can't be pickled (a device connection).
+
+    cd pkgs/atlasvibe && python -m atlasvibe.dao_server --socket /tmp/atlasvibe-dao.sock
+"""
+
+_HEADER = struct.Struct("!Q")  # payload size
+
+# the `Dao` methods served to the clients
+REMOTE_METHODS = frozenset(
+    {
+        "clear_namespace",
+        "clear_namespaces",
+        "share_node_init_containers",
+        "get_job_result",
+        "post_job_result",
+        "clear_job_results",
+        "job_exists",
+        "delete_job",
+        "set_job_consumers",
+        "release_job_result",
+        "clear_small_memory",
+        "write_memory",
+        "read_memory",
+        "delete_memory",
+        "clear_node_init_containers",
+        "set_init_container",
+        "get_init_container",
+        "has_init_container",
+    }
+)
+
+
+def send_message(sock: socket.socket, payload: bytes):
+    sock.sendall(_HEADER.pack(len(payload)))
+    sock.sendall(payload)
+
+
+def receive_message(sock: socket.socket) -> Any:
+    (size,) = _HEADER.unpack(_receive_exactly(sock, _HEADER.size))
+    return loads_shared(_receive_exactly(sock, size))
+
+
+def _receive_exactly(sock: socket.socket, size: int) -> bytearray:
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    read = 0
+    while read < size:
+        received = sock.recv_into(view[read:])
+        if received == 0:
+            raise ConnectionError("The job store connection was closed")
+        read += received
+    return buffer
+
+
+class _DaoRequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        dao: Dao = self.server.dao  # type: ignore
+        while True:
+            try:
+                namespace, method, args = receive_message(self.request)
+            except OSError:
+                return  # the client went away
+            try:
+                if method not in REMOTE_METHODS:
+                    raise ValueError(f"Unknown job store method '{method}'")
+                with dao.use_namespace(namespace):
+                    payload = dumps_shared((True, getattr(dao, method)(*args)))
+            except Exception as e:
+                payload = _dumps_error(e)
+            try:
+                send_message(self.request, payload)
+            except OSError:
+                loads_shared(payload)  # frees the shared memory segments
+                return
+
+
+def _dumps_error(error: Exception) -> bytes:
+    try:
+        return dumps_shared((False, error))
+    except Exception:  # the exception itself can't be pickled
+        return dumps_shared((False, ValueError(str(error))))
+
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True  # one thread per connected client thread
+
+    def __init__(self, path: str, dao: Dao):
+        self.dao = dao
+        super().__init__(path, _DaoRequestHandler)
+
+
+def _is_listening(path: str) -> bool:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError:  # refused, nobody serves the socket anymore
+        return False
+    finally:
+        sock.close()
+    return True
+
+
+class DaoServer:
+    """
+    Serves `dao` (a new `Dao` by default) on the Unix socket `path`. Pass
+    `Dao.get_instance()` to share the job store of the current process.
+    Raises `OSError` when another server answers on `path`, a socket file
+    left over by a crashed server is replaced.
+    """
+
+    def __init__(self, path: str, dao: Dao | None = None):
+        self.path = path
+        self.dao = dao if dao is not None else Dao()
+        if os.path.exists(path):
+            if _is_listening(path):
+                raise OSError(f"A job store server is already listening on {path}")
+            os.remove(path)  # left over by a server that didn't shut down
+        self.server = _UnixServer(path, self.dao)
+        self.thread: threading.Thread | None = None
+
+    def start(self) -> "DaoServer":
+        """
+        Serves the clients from a daemon thread, returns right away.
+        """
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, name="dao-server", daemon=True
+        )
+        self.thread.start()
+        logger.info(f"Job store served on {self.path}")
+        return self
+
+    def serve_forever(self):
+        logger.info(f"Job store served on {self.path}")
+        self.server.serve_forever()
+
+    def shutdown(self):
+        if self.thread is not None:
+            self.server.shutdown()
+            self.thread.join()
+            self.thread = None
+        self.server.server_close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class RemoteDao:
+    """
+    `DaoBackend` forwarding the calls to the `DaoServer` listening on `path`.
+    """
+
+    shared = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self.local = threading.local()  # the connection of each thread
+        self.node_init_func = {}
+        # init containers that couldn't be sent, by namespace and node id
+        self.local_init_containers: dict[tuple[str | None, str], Any] = {}
+
+    def connection(self) -> socket.socket:
+        sock: socket.socket | None = getattr(self.local, "socket", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(self.path)
+            except OSError:
+                sock.close()
+                raise
+            self.local.socket = sock
+        return sock
+
+    def call(self, method: str, *args: Any) -> Any:
+        sock = self.connection()
+        payload = dumps_shared((_current_namespace.get(), method, args))
+        try:
+            send_message(sock, payload)
+            ok, value = receive_message(sock)
+        except OSError:
+            # reconnect on the next call, the reply can't be matched anymore
+            self.local.socket = None
+            sock.close()
+            raise
+        if not ok:
+            raise value
+        return value
+
+    """
+    METHODS FOR NAMESPACES
+    """
+
+    @contextmanager
+    def use_namespace(self, name: str | None) -> Iterator[None]:
+        token = _current_namespace.set(name)
+        try:
+            yield
+        finally:
+            _current_namespace.reset(token)
+
+    def clear_namespace(self, name: str | None):
+        self._drop_local_init_containers(name)
+        self.call("clear_namespace", name)
+
+    def clear_namespaces(self):
+        self.local_init_containers.clear()
+        self.call("clear_namespaces")
+
+    def share_node_init_containers(self, source: str | None, target: str | None):
+        self._drop_local_init_containers(target)
+        for (namespace, node_id), value in list(self.local_init_containers.items()):
+            if namespace == source:
+                self.local_init_containers[(target, node_id)] = value
+        self.call("share_node_init_containers", source, target)
+
+    """
+    METHODS FOR JOB RESULTS
+    """
+
+    def get_job_result(self, job_id: str) -> Any | None:
+        return self.call("get_job_result", job_id)
+
+    def post_job_result(self, job_id: str, result: Any):
+        # a lazy stream reads its source in this process, the store gets its data
+        self.call("post_job_result", job_id, collect_streams(result))
+
+    def clear_job_results(self):
+        self.call("clear_job_results")
+
+    def job_exists(self, job_id: str) -> bool:
+        return self.call("job_exists", job_id)
+
+    def delete_job(self, job_id: str):
+        self.call("delete_job", job_id)
+
+    def set_job_consumers(self, job_id: str, count: int):
+        self.call("set_job_consumers", job_id, count)
+
+    def release_job_result(self, job_id: str):
+        self.call("release_job_result", job_id)
+
+    """
+    METHODS FOR SMALL MEMORY
+    """
+
+    def clear_small_memory(self):
+        self.call("clear_small_memory")
+
+    def write_memory(self, memory_key: str, meta_data: dict[str, Any], value: Any):
+        self.call("write_memory", memory_key, meta_data, value)
+
+    def read_memory(self, memory_key: str) -> tuple[dict[str, Any], Any] | None:
+        return self.call("read_memory", memory_key)
+
+    def delete_memory(self, memory_key: str):
+        self.call("delete_memory", memory_key)
+
+    """
+    METHODS FOR NODE INIT
+    """
+
+    # -- for node container --
+    def clear_node_init_containers(self):
+        self._drop_local_init_containers(_current_namespace.get())
+        self.call("clear_node_init_containers")
+
+    def set_init_container(self, node_id: str, value: Any):
+        key = (_current_namespace.get(), node_id)
+        try:
+            self.call("set_init_container", node_id, value)
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            logger.debug(f"Keeping the init container of {node_id} local: {e}")
+            self.local_init_containers[key] = value
+            return
+        self.local_init_containers.pop(key, None)
+
+    def get_init_container(self, node_id: str) -> Any:
+        key = (_current_namespace.get(), node_id)
+        if key in self.local_init_containers:
+            return self.local_init_containers[key]
+        return self.call("get_init_container", node_id)
+
+    def has_init_container(self, node_id: str) -> bool:
+        key = (_current_namespace.get(), node_id)
+        return key in self.local_init_containers or self.call(
+            "has_init_container", node_id
+        )
+
+    def _drop_local_init_containers(self, namespace: str | None):
+        for key in list(self.local_init_containers):
+            if key[0] == namespace:
+                self.local_init_containers.pop(key, None)
+
+    # ------------------------
+
+    # -- for node init function --
+    def set_init_function(self, node_func: Callable, node_init_func: Any):
+        self.node_init_func[node_func] = node_init_func
+
+    def get_init_function(self, node_func: Callable) -> Any:
+        return self.node_init_func.get(node_func, None)
+
+    def has_init_function(self, node_func: Callable) -> bool:
+        return node_func in self.node_init_func
+
+    # ----------------------------
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Job store shared by the processes started with "
+        f"{DAO_SOCKET_ENV} set to its socket"
+    )
+    parser.add_argument(
+        "--socket",
+        default=os.path.join(ATLASVIBE_CACHE_DIR, "dao.sock"),
+        help="path of the Unix socket to listen on",
+    )
+    args = parser.parse_args()
+
+    server = DaoServer(args.socket)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,6 @@ import difflib
 import typing
 import numpy as np
 from pandas import DataFrame as PandasDataFrame
-from box import Box, box_list
 import plotly.graph_objects as go  # type:ignore
 from typing import Union, Literal, get_args, Any, cast
 
@@ -30,6 +29,7 @@ DCType = Literal[
     "Surface",
     "Vector",
     "Stateful",
+    "DataStream",
     "ParametricDataFrame",
     "ParametricGrayscale",
     "ParametricImage",
@@ -61,7 +61,41 @@ DCKwargsValue = Union[
 ExtraType = dict[str, Any] | None
 
 
-class DataContainer(Box):
+class DataContainerKeyError(KeyError, AttributeError):
+    """
+    A missing key, raised by both `dc["key"]` and `dc.key`.
+    """
+
+
+class _Field:
+    """
+    Attribute access to a key of the containers, e.g. `pair.x` for `pair["x"]`.
+    """
+
+    __slots__ = ("key",)
+
+    def __init__(self, key: str):
+        self.key = key
+
+    def __get__(self, dc: Any, owner: Any = None) -> Any:
+        if dc is None:
+            return self
+        try:
+            return dict.__getitem__(dc, self.key)
+        except KeyError:
+            raise DataContainerKeyError(self.key) from None
+
+    def __set__(self, dc: Any, value: Any):
+        dc[self.key] = value
+
+    def __delete__(self, dc: Any):
+        try:
+            del dc[self.key]
+        except KeyError:
+            raise DataContainerKeyError(self.key) from None
+
+
+class DataContainer(dict[str, Any]):
     """
     A class that processes various types of data and supports dot assignment
 
@@ -79,8 +113,13 @@ class DataContainer(Box):
 
     v.type = 'OrderedPair'
 
+    The keys are stored in the dict itself, attributes are only an alias for
+    them: the containers have no instance `__dict__` (see `__slots__`) and the
+    keys annotated on a subclass are fields of the class (see `_Field`).
     """
 
+    __slots__ = ()
+
     allowed_types = list(typing.get_args(DCType))
     allowed_keys = [
         "x",
@@ -133,6 +172,7 @@ class DataContainer(Box):
         "String": ["s"],
         "Boolean": ["b"],
         "Stateful": ["obj"],
+        "DataStream": ["obj"],
     }
 
     SKIP_ARRAYIEFY_TYPES = [
@@ -144,30 +184,42 @@ class DataContainer(Box):
         np.ndarray,
     ]  # value types not to be arrayified
 
+    # keys whose values are stored as given
+    RAW_KEYS = ["type", "extra", "c", "obj"]
+
     type: DCType
 
+    def __init_subclass__(cls, **kwargs: Any):
+        super().__init_subclass__(**kwargs)
+        for key in cls.__dict__.get("__annotations__", {}):
+            if key not in cls.__dict__:
+                setattr(cls, key, _Field(key))
+
     def copy(self):
         # Create an instance of DataContainer class
         copied_instance = DataContainer(**self)
         return copied_instance
 
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            k: v.to_dict() if isinstance(v, DataContainer) else v
+            for k, v in self.items()
+        }
+
     def _ndarrayify(
         self, value: DCKwargsValue
     ) -> Union[
         DCNpArrayType, PandasDataFrame, dict[str, DCNpArrayType], go.Figure, None
     ]:
-        if isinstance(value, int) or isinstance(value, float):
+        if isinstance(value, np.ndarray):
+            return value  # a subclass, e.g. a memory-mapped array
+        elif isinstance(value, int) or isinstance(value, float):
             return np.array([value])
         elif isinstance(value, dict):
             arrayified_value: dict[str, DCNpArrayType] = {}
             for k, v in value.items():
                 arrayified_value[k] = cast(DCNpArrayType, self._ndarrayify(v))
             return arrayified_value
-        elif isinstance(value, box_list.BoxList):
-            arrayified_value: dict[str, DCNpArrayType] = {}
-            for k, v in value.__dict__.items():
-                arrayified_value[k] = cast(DCNpArrayType, self._ndarrayify(v))
-            return arrayified_value
         elif isinstance(value, list):
             return np.array(value)
         elif value is None:
@@ -181,25 +233,41 @@ class DataContainer(Box):
     def __init__(  # type:ignore
         self, type: DCType = "OrderedPair", **kwargs: DCKwargsValue
     ):
-        self.type = type
+        dict.__setitem__(self, "type", type)
         for k, v in kwargs.items():
             self[k] = v
 
-    def __getattribute__(self, __name: str) -> Any:
-        return super().__getattribute__(__name)
+    def __getattr__(self, name: str) -> Any:
+        # only called for the names that aren't attributes of the class
+        try:
+            return self[name]
+        except KeyError:
+            raise DataContainerKeyError(name) from None
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        self[name] = value
 
-    def __getitem__(self, key: str, _ignore_default: bool = False) -> Any:
-        return super().__getitem__(key, _ignore_default)  # type:ignore
+    def __delattr__(self, name: str) -> None:
+        try:
+            del self[name]
+        except KeyError:
+            raise DataContainerKeyError(name) from None
 
     def __setitem__(self, key: str, value: DCKwargsValue) -> None:
-        if (
-            key not in ["type", "extra", "c", "obj"]
-            and type(value) not in self.SKIP_ARRAYIEFY_TYPES
-        ):
-            formatted_value = self._ndarrayify(value)
-            super().__setitem__(key, formatted_value)  # type:ignore
+        if key in _RAW_KEYS or type(value) in _SKIP_ARRAYIFY_TYPES:
+            dict.__setitem__(self, key, value)
         else:
-            super().__setitem__(key, value)  # type: ignore
+            dict.__setitem__(self, key, self._ndarrayify(value))
+
+    def update(self, *args: Any, **kwargs: Any) -> None:  # type:ignore
+        for k, v in dict(*args, **kwargs).items():
+            self[k] = v
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({dict.__repr__(self)})"
+
+    def __str__(self) -> str:
+        return dict.__repr__(self)
 
     def __check_combination(self, key: str, keys: list[str], allowed_keys: list[str]):
         for i in keys:
@@ -246,6 +314,14 @@ class DataContainer(Box):
 
     def validate(self):
         dc_type = self.type
+        keys = _VALID_KEYS.get(dc_type)
+        if keys is not None:
+            required, allowed = keys
+            # a valid container is checked with set operations on the tables
+            # below, the checks one key at a time explain what is wrong
+            present = self.keys() - {"type"}
+            if present <= allowed and required <= present:
+                return
 
         if dc_type not in self.allowed_types:
             closest_type = find_closest_match(dc_type, self.allowed_types)
@@ -270,7 +346,32 @@ class DataContainer(Box):
         self.__check_for_missing_keys(dc_type, dc_keys)
 
 
+for _key in ["type", "extra"]:
+    setattr(DataContainer, _key, _Field(_key))
+
+_RAW_KEYS = frozenset(DataContainer.RAW_KEYS)
+_SKIP_ARRAYIFY_TYPES = frozenset(DataContainer.SKIP_ARRAYIEFY_TYPES)
+
+
+def _valid_keys() -> dict[str, tuple[frozenset[str], frozenset[str]]]:
+    # type -> (required keys, allowed keys), for the types whose allowed keys
+    # can all be used together
+    valid_keys: dict[str, tuple[frozenset[str], frozenset[str]]] = {}
+    for dc_type, type_keys in DataContainer.type_keys_map.items():
+        allowed = frozenset([*type_keys, "extra"])
+        if all(
+            allowed - {key} <= set(DataContainer.combinations[key]) for key in allowed
+        ):
+            valid_keys[dc_type] = (frozenset(type_keys), allowed)
+    return valid_keys
+
+
+_VALID_KEYS = _valid_keys()
+
+
 class OrderedPair(DataContainer):
+    __slots__ = ()
+
     x: DCNpArrayType
     y: DCNpArrayType
 
@@ -281,6 +382,8 @@ class OrderedPair(DataContainer):
 
 
 class ParametricOrderedPair(DataContainer):
+    __slots__ = ()
+
     x: DCNpArrayType
     y: DCNpArrayType
     t: DCNpArrayType
@@ -296,6 +399,8 @@ class ParametricOrderedPair(DataContainer):
 
 
 class OrderedTriple(DataContainer):
+    __slots__ = ()
+
     x: DCNpArrayType
     y: DCNpArrayType
     z: DCNpArrayType
@@ -311,6 +416,8 @@ class OrderedTriple(DataContainer):
 
 
 class ParametricOrderedTriple(DataContainer):
+    __slots__ = ()
+
     x: DCNpArrayType
     y: DCNpArrayType
     z: DCNpArrayType
@@ -330,6 +437,8 @@ class ParametricOrderedTriple(DataContainer):
 
 
 class Surface(DataContainer):
+    __slots__ = ()
+
     x: DCNpArrayType
     y: DCNpArrayType
     z: DCNpArrayType
@@ -350,6 +459,8 @@ class Surface(DataContainer):
 
 
 class ParametricSurface(DataContainer):
+    __slots__ = ()
+
     x: DCNpArrayType
     y: DCNpArrayType
     z: DCNpArrayType
@@ -372,6 +483,8 @@ class ParametricSurface(DataContainer):
 
 
 class Scalar(DataContainer):
+    __slots__ = ()
+
     c: int | float
 
     def __init__(self, c: int | float, extra: ExtraType = None):  # type:ignore
@@ -379,6 +492,8 @@ class Scalar(DataContainer):
 
 
 class ParametricScalar(DataContainer):
+    __slots__ = ()
+
     c: int | float
     t: DCNpArrayType
 
@@ -389,6 +504,8 @@ class ParametricScalar(DataContainer):
 
 
 class Vector(DataContainer):
+    __slots__ = ()
+
     v: DCNpArrayType
 
     def __init__(self, v: DCNpArrayType, extra: ExtraType = None):  # type:ignore
@@ -396,6 +513,8 @@ class Vector(DataContainer):
 
 
 class ParametricVector(DataContainer):
+    __slots__ = ()
+
     v: DCNpArrayType
 
     def __init__(  # type: ignore
@@ -405,6 +524,8 @@ class ParametricVector(DataContainer):
 
 
 class Matrix(DataContainer):
+    __slots__ = ()
+
     m: DCNpArrayType
 
     def __init__(self, m: DCNpArrayType, extra: ExtraType = None):  # type:ignore
@@ -412,6 +533,8 @@ class Matrix(DataContainer):
 
 
 class ParametricMatrix(DataContainer):
+    __slots__ = ()
+
     m: DCNpArrayType
     t: DCNpArrayType
 
@@ -422,6 +545,8 @@ class ParametricMatrix(DataContainer):
 
 
 class DataFrame(DataContainer):
+    __slots__ = ()
+
     m: PandasDataFrame
 
     def __init__(self, df: PandasDataFrame, extra: ExtraType = None):  # type:ignore
@@ -429,6 +554,8 @@ class DataFrame(DataContainer):
 
 
 class ParametricDataFrame(DataContainer):
+    __slots__ = ()
+
     m: PandasDataFrame
     t: DCNpArrayType
 
@@ -439,6 +566,8 @@ class ParametricDataFrame(DataContainer):
 
 
 class Plotly(DataContainer):
+    __slots__ = ()
+
     fig: go.Figure
 
     def __init__(self, fig: go.Figure, extra: ExtraType = None):  # type:ignore
@@ -446,6 +575,8 @@ class Plotly(DataContainer):
 
 
 class ParametricPlotly(DataContainer):
+    __slots__ = ()
+
     fig: go.Figure
     t: DCNpArrayType
 
@@ -456,6 +587,8 @@ class ParametricPlotly(DataContainer):
 
 
 class Image(DataContainer):
+    __slots__ = ()
+
     r: DCNpArrayType
     g: DCNpArrayType
     b: DCNpArrayType
@@ -473,6 +606,8 @@ class Image(DataContainer):
 
 
 class Bytes(DataContainer):
+    __slots__ = ()
+
     b: bytes
 
     def __init__(
@@ -483,6 +618,8 @@ class Bytes(DataContainer):
 
 
 class String(DataContainer):
+    __slots__ = ()
+
     s: str
 
     def __init__(self, s: str):
@@ -490,6 +627,8 @@ class String(DataContainer):
 
 
 class Boolean(DataContainer):
+    __slots__ = ()
+
     b: bool
 
     def __init__(
@@ -500,6 +639,8 @@ class Boolean(DataContainer):
 
 
 class ParametricImage(DataContainer):
+    __slots__ = ()
+
     t: DCNpArrayType
     r: DCNpArrayType
     g: DCNpArrayType
@@ -519,6 +660,8 @@ class ParametricImage(DataContainer):
 
 
 class Grayscale(DataContainer):
+    __slots__ = ()
+
     m: DCNpArrayType
 
     def __init__(self, img: DCNpArrayType, extra: ExtraType = None):  # type:ignore
@@ -526,6 +669,8 @@ class Grayscale(DataContainer):
 
 
 class ParametricGrayscale(DataContainer):
+    __slots__ = ()
+
     m: DCNpArrayType
     t: DCNpArrayType
 
@@ -536,6 +681,8 @@ class ParametricGrayscale(DataContainer):
 
 
 class Stateful(DataContainer):
+    __slots__ = ()
+
     obj: Any
 
     def __init__(self, obj: Any, extra: ExtraType = None):
@@ -2,6 +2,7 @@ from .atlasvibe_instruction import ATLASVIBE_INSTRUCTION
 from .plotly_utils import data_container_to_plotly
 from .data_container import DataContainer, Plotly, String, Bytes
 from .dao import Dao
+from .streaming import DataStream
 from typing import Any, cast, Optional
 
 __all__ = ["get_job_result", "get_next_directions", "get_next_nodes", "get_job_result"]
@@ -75,14 +76,26 @@ def get_frontend_res_obj_from_result(
     node_id: str,
     observe_blocks: list[str],
     result: Optional[dict[str, Any] | DataContainer],
+    plot_max_points: int | None = None,
+    plot_max_pixels: int | None = None,
 ) -> Optional[dict[str, Any]]:
     if result is None:
         return None
 
+    if isinstance(result, DataStream):
+        if node_id not in observe_blocks:
+            return None
+        # iterating the whole stream could take forever, show its first chunk
+        result = result.first()
+        if result is None:
+            return None
+
     # Only return a plotly fig if it is a viz node
     match result:
         case Plotly() | String() | Bytes():
-            plotly_fig = data_container_to_plotly(data=result)
+            plotly_fig = data_container_to_plotly(
+                data=result, max_points=plot_max_points, max_pixels=plot_max_pixels
+            )
             return {
                 "plotly_fig": plotly_fig,
                 "text_blob": get_text_blob_from_dc(result),
@@ -109,7 +122,9 @@ def get_frontend_res_obj_from_result(
         data = None
         match result:
             case Plotly() | String() | Bytes():
-                plotly_fig = data_container_to_plotly(data=result)
+                plotly_fig = data_container_to_plotly(
+                    data=result, max_points=plot_max_points, max_pixels=plot_max_pixels
+                )
                 text_blob = get_text_blob_from_dc(result)
             case DataContainer():
                 if node_id in observe_blocks:
@@ -122,4 +137,6 @@ def get_frontend_res_obj_from_result(
             "text_blob": text_blob,
         }
     keys = list(result.keys())
-    return get_frontend_res_obj_from_result(node_id, observe_blocks, result[keys[0]])
+    return get_frontend_res_obj_from_result(
+        node_id, observe_blocks, result[keys[0]], plot_max_points, plot_max_pixels
+    )
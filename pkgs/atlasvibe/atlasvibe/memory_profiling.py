@@ -0,0 +1,42 @@
+import tracemalloc
+from threading import Lock
+
+__all__ = ["start_memory_tracing", "stop_memory_tracing"]
+
+"""
+Reference counted tracemalloc session shared by the blocks running in this
+process. Tracing is started by the first block asking for it and stopped when
+the last one is done, so it doesn't slow down runs that don't profile memory.
+
+tracemalloc tracks the whole process, so peaks are only approximate when
+several blocks run at the same time.
+"""
+
+_tracing_lock = Lock()
+_tracing_users = 0
+_started_tracing = False
+
+
+def start_memory_tracing():
+    global _tracing_users, _started_tracing
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _started_tracing = True
+        _tracing_users += 1
+        tracemalloc.reset_peak()
+
+
+def stop_memory_tracing() -> int:
+    """
+    Returns the peak of traced memory (in bytes) since the matching
+    `start_memory_tracing` call.
+    """
+    global _tracing_users, _started_tracing
+    with _tracing_lock:
+        peak = tracemalloc.get_traced_memory()[1]
+        _tracing_users -= 1
+        if _tracing_users == 0 and _started_tracing:
+            tracemalloc.stop()
+            _started_tracing = False
+    return peak
@@ -4,9 +4,14 @@ __all__ = ["JobSuccess"]
 
 
 class JobSuccess(JobFeedback):
-    def __init__(self, result, fn, node_id, jobset_id):
+    def __init__(self, result, fn, node_id, jobset_id, profile=None, output=None):
         super().__init__(jobset_id)
         self.result = result
         self.fn = fn
         self.node_id = node_id
         self.jobset_id = jobset_id
+        self.profile = profile  # timings measured by the block wrapper
+        # result of the block when it wasn't posted to the job store
+        self.output = output
+        # responses of the jobs fused with this one, run before it (see `JobInfo.chain`)
+        self.fused: list[JobSuccess] = []
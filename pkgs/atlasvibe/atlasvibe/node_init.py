@@ -37,6 +37,8 @@ class NodeInit:
         res = self.func(**args)
         if res is not None:
             daemon_container.set(res)
+            # the store may hold a copy (see `RemoteDao`), send the value there
+            Dao.get_instance().set_init_container(node_id, daemon_container)
 
 
 # Wrapper for node_init functions, maps the node to the function that will initialize it.
@@ -0,0 +1,102 @@
+import importlib.metadata
+import os
+import re
+import sys
+import threading
+
+try:
+    from packaging.specifiers import InvalidSpecifier, SpecifierSet
+    from packaging.version import InvalidVersion, Version
+except ImportError:  # packaging is vendored by pip but not a dependency
+    SpecifierSet = None
+
+__all__ = ["PackageIndex", "normalize_package_name"]
+
+"""
+Process wide index of the installed distributions.
+
+Listing `importlib.metadata.distributions()` reads the metadata of every
+installed package, which takes hundreds of milliseconds in big environments.
+The index is built once and rebuilt only when a directory of `sys.path` (the
+site-packages) changed or after `invalidate`, e.g. once packages were installed.
+"""
+
+
+def normalize_package_name(name: str) -> str:
+    # PEP 503, `Scikit_Learn` and `scikit-learn` are the same distribution
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+class PackageIndex:
+    _instance = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls):
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = PackageIndex()
+            return cls._instance
+
+    def __init__(self):
+        self.versions: dict[str, str] = {}  # normalized name -> version
+        self.signature: tuple[tuple[str, int], ...] | None = None
+
+    def get_signature(self) -> tuple[tuple[str, int], ...]:
+        """
+        Modification times of the `sys.path` directories, installing or
+        removing a distribution changes the one of its site-packages.
+        """
+        signature: list[tuple[str, int]] = []
+        for path in sys.path:
+            try:
+                signature.append((path, os.stat(path or ".").st_mtime_ns))
+            except OSError:
+                continue
+        return tuple(signature)
+
+    def refresh(self):
+        signature = self.get_signature()
+        with self._lock:
+            if signature == self.signature:
+                return
+            versions: dict[str, str] = {}
+            for dist in importlib.metadata.distributions():
+                name = dist.metadata["Name"]
+                if name:
+                    # the first one on sys.path is the one imported
+                    versions.setdefault(normalize_package_name(name), dist.version)
+            self.versions = versions
+            self.signature = signature
+
+    def invalidate(self):
+        with self._lock:
+            self.signature = None
+
+    def packages(self) -> dict[str, str]:
+        self.refresh()
+        return dict(self.versions)
+
+    def get_version(self, name: str) -> str | None:
+        self.refresh()
+        return self.versions.get(normalize_package_name(name))
+
+    def satisfies(self, name: str, constraint: str | None = None) -> bool:
+        """
+        Whether `name` is installed in a version matching `constraint`, a
+        specifier (`>=1.2,<2`) or a version (`1.2.0`, same as `==1.2.0`).
+        """
+        version = self.get_version(name)
+        if version is None:
+            return False
+        constraint = (constraint or "").strip()
+        if not constraint:
+            return True
+        if constraint[0].isalnum():
+            constraint = f"=={constraint}"
+        if SpecifierSet is None:
+            return constraint.startswith("==") and constraint[2:].strip() == version
+        try:
+            return Version(version) in SpecifierSet(constraint, prereleases=True)
+        except (InvalidSpecifier, InvalidVersion):
+            return False
@@ -1,49 +1,246 @@
 import plotly.express as px
 import plotly.graph_objects as go
 import numpy as np
+from .config import AtlasvibeConfig
 from .data_container import DataContainer
 import pandas as pd
+import math
 from typing import cast, Any
 
+"""
+Converts DataContainers to plotly figures sent to the front-end.
 
-def data_container_to_plotly(data: DataContainer) -> dict[str, Any] | None:
-    data_copy = data.copy()
-    dc_type = data_copy.type
+The front-end can't display more than a few thousand points per trace, so the
+figures are reduced to the resolution set by `AtlasvibeConfig` (or per run):
+lines keep `max_points` points picked with LTTB (OrderedPair, line traces) or
+min-max decimation (Matrix), images and heatmaps are averaged down a pyramid
+to `max_pixels` pixels and surfaces are decimated on their grid. A limit of 0
+disables the reduction.
+"""
+
+# trace keys holding one value per point, reduced with the coordinates
+POINT_KEYS = ("x", "y", "text", "hovertext", "customdata", "ids")
+MARKER_POINT_KEYS = ("color", "size", "symbol", "opacity")
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Largest Triangle Three Buckets: indices of the `max_points` points that
+    best preserve the visual shape of the line, first and last included.
+    """
+    n = len(y)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+    x = np.nan_to_num(np.asarray(x, dtype=np.float64))
+    y = np.nan_to_num(np.asarray(y, dtype=np.float64))  # NaN are picked as 0
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.intp)
+    edges = np.append(edges, n)
+    # bucket i is [edges[i], edges[i + 1]), the last one being the last point
+    sizes = np.maximum(np.diff(edges), 1)
+    avg_x = np.add.reduceat(x, edges[:-1]) / sizes
+    avg_y = np.add.reduceat(y, edges[:-1]) / sizes
+    indices = np.empty(max_points, dtype=np.intp)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for i in range(max_points - 2):
+        start, end = edges[i], edges[i + 1]
+        if start == end:
+            a = start
+        else:
+            xa, ya = x[a], y[a]
+            area = np.abs(
+                (xa - avg_x[i + 1]) * (y[start:end] - ya)
+                - (xa - x[start:end]) * (avg_y[i + 1] - ya)
+            )
+            a = start + int(area.argmax())
+        indices[i + 1] = a
+    return np.unique(indices)
+
+
+def minmax_indices(y: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Indices of the minimum and maximum of each bucket, `y` can be 2D (columns
+    reduced independently, the indices then being per column).
+    """
+    n = len(y)
+    buckets = max_points // 2
+    if max_points >= n or buckets < 1:
+        return np.arange(n) if y.ndim == 1 else np.tile(np.arange(n), (y.shape[1], 1)).T
+    size = math.ceil(n / buckets)
+    buckets = math.ceil(n / size)
+    padded = np.concatenate([y, np.repeat(y[-1:], buckets * size - n, axis=0)])
+    padded = padded.reshape(buckets, size, *y.shape[1:])
+    offsets = (np.arange(buckets) * size).reshape(-1, *([1] * (y.ndim - 1)))
+    indices = np.concatenate(
+        [padded.argmin(axis=1) + offsets, padded.argmax(axis=1) + offsets]
+    )
+    indices = np.minimum(np.sort(indices, axis=0), n - 1)
+    indices[0], indices[-1] = 0, n - 1
+    return indices
+
+
+def pyramid_downscale(image: np.ndarray, max_pixels: int) -> tuple[np.ndarray, int]:
+    """
+    Averages 2x2 blocks of pixels until the image (height, width, ...) holds
+    at most `max_pixels` pixels. Returns the image and its scale factor.
+    """
+    factor = 1
+    dtype = image.dtype
+    while max_pixels > 0 and image.shape[0] * image.shape[1] > max_pixels:
+        if image.shape[0] < 2 or image.shape[1] < 2:
+            break
+        h, w = image.shape[0] // 2 * 2, image.shape[1] // 2 * 2
+        image = image[:h, :w]
+        image = (
+            image[0::2, 0::2].astype(np.float64)
+            + image[1::2, 0::2]
+            + image[0::2, 1::2]
+            + image[1::2, 1::2]
+        ) / 4
+        factor *= 2
+    if factor > 1 and dtype.kind in "iub":
+        image = np.rint(image).astype(dtype)
+    return image, factor
+
+
+def grid_stride(shape: tuple[int, ...], max_pixels: int) -> int:
+    if max_pixels <= 0 or len(shape) < 2 or shape[0] * shape[1] <= max_pixels:
+        return 1
+    return math.ceil(math.sqrt(shape[0] * shape[1] / max_pixels))
+
+
+def _take(values: Any, indices: np.ndarray, n: int) -> Any:
+    if isinstance(values, (np.ndarray, list, tuple, pd.Series, pd.Index)):
+        if len(values) == n:
+            return np.asarray(values)[indices]
+    return values
+
+
+def reduce_line_trace(trace: dict[str, Any], max_points: int) -> None:
+    y = trace.get("y")
+    if y is None or max_points <= 0 or len(y) <= max_points:
+        return
+    y = np.asarray(y)
+    if y.dtype.kind not in "biuf" or y.ndim != 1:
+        return
+    n = len(y)
+    x = trace.get("x")
+    if x is not None and len(x) == n:
+        x = np.asarray(x)
+        if x.dtype.kind == "M":
+            x = x.view(np.int64)
+        elif x.dtype.kind not in "biuf":
+            x = None
+    else:
+        x = None
+    indices = lttb_indices(np.arange(n) if x is None else x, y, max_points)
+    for key in POINT_KEYS:
+        if key in trace:
+            trace[key] = _take(trace[key], indices, n)
+    marker = trace.get("marker")
+    if isinstance(marker, dict):
+        for key in MARKER_POINT_KEYS:
+            if key in marker:
+                marker[key] = _take(marker[key], indices, n)
+
+
+def reduce_grid_trace(trace: dict[str, Any], max_pixels: int, average: bool):
+    z = trace.get("z")
+    if z is None:
+        return
+    z = np.asarray(z)
+    if z.ndim < 2 or z.dtype.kind not in "biuf":
+        return
+    if average:
+        reduced, stride = pyramid_downscale(z, max_pixels)
+    else:
+        stride = grid_stride(z.shape, max_pixels)
+        reduced = z[::stride, ::stride]
+    if stride == 1:
+        return
+    trace["z"] = reduced
+    h, w = reduced.shape[0], reduced.shape[1]
+    for key, size in (("x", w), ("y", h)):
+        coords = trace.get(key)
+        if coords is None:
+            if trace.get("type") == "image":
+                trace[f"d{key}"] = trace.get(f"d{key}", 1) * stride
+                trace[f"{key}0"] = trace.get(f"{key}0", 0) + (stride - 1) / 2
+            continue
+        coords = np.asarray(coords)
+        if coords.ndim == 2:
+            trace[key] = coords[::stride, ::stride][:h, :w]
+        else:
+            trace[key] = coords[::stride][:size]
+
+
+def reduce_figure(fig: dict[str, Any], max_points: int, max_pixels: int):
+    """
+    Reduces the traces of a figure (as a dict) in place.
+    """
+    for trace in fig.get("data", []):
+        trace_type = trace.get("type", "scatter")
+        if trace_type in ("scatter", "scattergl"):
+            reduce_line_trace(trace, max_points)
+        elif trace_type in ("heatmap", "image", "contour"):
+            reduce_grid_trace(trace, max_pixels, average=True)
+        elif trace_type == "surface":
+            reduce_grid_trace(trace, max_pixels, average=False)
+
+
+def data_container_to_plotly(
+    data: DataContainer,
+    max_points: int | None = None,  # points per line, defaults to the config
+    max_pixels: int | None = None,  # pixels per image or grid, defaults to the config
+) -> dict[str, Any] | None:
+    config = AtlasvibeConfig.get_instance()
+    max_points = config.plot_max_points if max_points is None else max_points
+    max_pixels = config.plot_max_pixels if max_pixels is None else max_pixels
+    dc_type = data.type
     fig = go.Figure(layout=dict(template="plotly"))
-    if "x" in data_copy and isinstance(data_copy.x, dict):  # type: ignore
-        data_keys = list(cast(list[str], data_copy.x.keys()))
-        data_copy.x = data_copy.x[data_keys[0]]  # type: ignore
+    x = data.x if "x" in data else None
+    if isinstance(x, dict):
+        data_keys = list(cast(list[str], x.keys()))
+        x = x[data_keys[0]]
 
     match dc_type:
         case "Image":
-            if data_copy.a is None:
-                img_combined = np.stack((data_copy.r, data_copy.g, data_copy.b), axis=2)
+            if data.a is None:
+                img_combined = np.stack((data.r, data.g, data.b), axis=2)
             else:
-                img_combined = np.stack(
-                    (data_copy.r, data_copy.g, data_copy.b, data_copy.a), axis=2
-                )
+                img_combined = np.stack((data.r, data.g, data.b, data.a), axis=2)
+            img_combined, factor = pyramid_downscale(img_combined, max_pixels)
             fig = px.imshow(img=img_combined)  # type:ignore
+            if factor > 1:
+                fig.update_traces(
+                    dx=factor, dy=factor, x0=(factor - 1) / 2, y0=(factor - 1) / 2
+                )
         case "OrderedPair":
-            if data_copy.x is not None and len(data_copy.x) != len(data_copy.y):
-                data_copy.x = np.arange(0, len(data_copy.y), 1)
-            fig = px.line(x=data_copy.x, y=data_copy.y)
+            y = data.y
+            if x is not None and len(x) != len(y):
+                x = np.arange(0, len(y), 1)
+            if max_points > 0 and len(y) > max_points:
+                trace = {"x": x if x is not None else np.arange(len(y)), "y": y}
+                reduce_line_trace(trace, max_points)
+                x, y = trace["x"], trace["y"]
+            fig = px.line(x=x, y=y)
         case "OrderedTriple":
-            fig = px.scatter_3d(x=data_copy.x, y=data_copy.y, z=data_copy.z)
+            fig = px.scatter_3d(x=x, y=data.y, z=data.z)
         case "Scalar":
             fig.add_trace(
                 go.Indicator(
-                    value=data_copy.c,
+                    value=data.c,
                     domain={"y": [0, 1], "x": [0, 1]},
                     number={"valueformat": "f"},
                 )
             )
         case "Vector":
-            df = pd.DataFrame(data_copy.v)
+            df = pd.DataFrame(data.v)
             fig = go.Figure(
                 data=[go.Table(header=dict(values=["Vector"]), cells=dict(values=[df]))]
             )
         case "DataFrame":
-            df = cast(pd.DataFrame, data_copy.m)
+            df = cast(pd.DataFrame, data.m)
             fig = go.Figure(
                 data=[
                     go.Table(
@@ -53,20 +250,28 @@ def data_container_to_plotly(data: DataContainer) -> dict[str, Any] | None:
                 ]
             )
         case "Grayscale" | "Matrix":
-            y_columns: np.ndarray = data_copy.m
+            y_columns: np.ndarray = data.m
+            rows = np.arange(0, y_columns.shape[0])
+            indices = None
+            if max_points > 0 and y_columns.shape[0] > max_points:
+                indices = minmax_indices(y_columns, max_points)
             for i, col in enumerate(y_columns.T):
+                col_x = rows
+                if indices is not None:
+                    col_x = rows[indices[:, i]]
+                    col = col[indices[:, i]]
                 fig.add_trace(
                     go.Scatter(
-                        x=np.arange(0, col.size),
+                        x=col_x,
                         y=col,
                         mode="lines",
                         name=i,
                     )
                 )
         case "Surface":
-            fig = go.Figure(
-                data=[go.Surface(x=data_copy.x, y=data_copy.y, z=data_copy.z)]
-            )
+            surface = {"x": x, "y": data.y, "z": data.z}
+            reduce_grid_trace(surface, max_pixels, average=False)
+            fig = go.Figure(data=[go.Surface(**surface)])
         case "Plotly":
             fig = cast(go.Figure, data.fig)
         case "Bytes" | "String" | "Boolean":
@@ -75,4 +280,7 @@ def data_container_to_plotly(data: DataContainer) -> dict[str, Any] | None:
             raise ValueError(
                 f"unsupported DataContainer type passed to plotly converter function, type: '{dc_type}"
             )
-    return cast(dict[str, Any], fig.to_dict())
+    fig_dict = cast(dict[str, Any], fig.to_dict())
+    if dc_type == "Plotly":
+        reduce_figure(fig_dict, max_points, max_pixels)
+    return fig_dict
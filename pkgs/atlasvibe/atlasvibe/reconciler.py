@@ -6,9 +6,10 @@ For example, the ADD node should make a best effort to do something reasonable w
 For this reason, we've created the `Reconciler` class to handle the process of turning different data types into compatible, easily added objects.
 """
 
-from typing import Tuple
+from typing import Any, Tuple
 
 import numpy
+import pandas
 
 from .data_container import DataContainer
 
@@ -44,23 +45,22 @@ class Reconciler:
         final_r = max(lhs.m.shape[0], rhs.m.shape[0])
         final_c = max(lhs.m.shape[1], rhs.m.shape[1])
 
-        new_lhs = numpy.pad(
-            lhs.m,
-            ((0, final_r - lhs.m.shape[0]), (0, final_c - lhs.m.shape[1])),
-            "constant",
-            constant_values=self.pad,
+        return (
+            self.pad_matrix(lhs, final_r, final_c),
+            self.pad_matrix(rhs, final_r, final_c),
         )
-        new_rhs = numpy.pad(
-            rhs.m,
-            ((0, final_r - rhs.m.shape[0]), (0, final_c - rhs.m.shape[1])),
+
+    def pad_matrix(self, dc: DataContainer, rows: int, cols: int) -> DataContainer:
+        # a matrix already of the final size is returned as is, not copied
+        if dc.m.shape[:2] == (rows, cols):
+            return dc
+        padded = numpy.pad(
+            dc.m,
+            ((0, rows - dc.m.shape[0]), (0, cols - dc.m.shape[1])),
             "constant",
             constant_values=self.pad,
         )
-
-        return (
-            DataContainer(type="Matrix", m=new_lhs),
-            DataContainer(type="Matrix", m=new_rhs),
-        )
+        return DataContainer(type="Matrix", m=padded)
 
     def reconcile_dataframe(
         self, lhs: DataContainer, rhs: DataContainer
@@ -74,10 +74,10 @@ class Reconciler:
     ) -> Tuple[DataContainer, DataContainer]:
         # let's expand the scalar to be a DataFrame the same size as the other DataFrame
         if lhs.type == "DataFrame":
-            new_m = lhs.m.copy()
-            new_m.iloc[:] = rhs.c
-            return lhs, DataContainer(type="DataFrame", m=new_m)
+            return lhs, self.fill_dataframe(lhs.m, rhs.c)
+        return self.fill_dataframe(rhs.m, lhs.c), rhs
 
-        new_m = rhs.m.copy()
-        new_m.iloc[:] = lhs.c
-        return DataContainer(type="DataFrame", m=new_m), rhs
+    def fill_dataframe(self, like: pandas.DataFrame, value: Any) -> DataContainer:
+        # built directly instead of copying `like` and overwriting its values
+        filled = pandas.DataFrame(value, index=like.index, columns=like.columns)
+        return DataContainer(type="DataFrame", m=filled)
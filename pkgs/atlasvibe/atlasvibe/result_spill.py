@@ -0,0 +1,236 @@
+import atexit
+import os
+import shutil
+import tempfile
+import uuid
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable
+
+import numpy as np
+from pandas import DataFrame as PandasDataFrame
+
+from .CONSTANTS import ATLASVIBE_CACHE_DIR
+from .config import AtlasvibeConfig, logger
+from .data_container import DataContainer, Stateful
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:  # DataFrames are then kept in memory
+    pyarrow = None
+
+__all__ = ["ResultSpill", "result_size"]
+
+"""
+Spilling of large job results to disk.
+
+The job results of the `Dao` live in memory until their last consumer fetched
+them. Results of `AtlasvibeConfig.result_spill_threshold` bytes or more are
+tracked here, least recently used first: once they take more than
+`AtlasvibeConfig.result_memory_budget` bytes, the oldest ones are written to
+the cache directory and replaced in the job store by memory-mapped copies,
+arrays as `.npy` files and DataFrames as Arrow IPC files (when pyarrow is
+installed). Blocks get the mapped arrays like any other (read-only) input,
+the operating system pages them in and out as they are read. The files are
+removed with their result.
+"""
+
+
+class _Entry:
+    def __init__(self, results: dict[str, Any], job_id: str, result: Any, size: int):
+        self.results = results  # the job results of the namespace
+        self.job_id = job_id
+        self.result = result
+        self.size = size
+        self.paths: list[str] = []
+        self.discarded = False
+
+
+class ResultSpill:
+    def __init__(self, job_locks: Any, directory: str | None = None):
+        # sharded by job id, held while a job result is replaced, see `Dao`
+        self.job_locks = job_locks
+        self.directory = directory
+        self.lock = Lock()
+        self.spill_lock = Lock()  # one result is written at a time
+        # results in memory, least recently used first
+        self.resident: OrderedDict[tuple[int, str], _Entry] = OrderedDict()
+        self.resident_size = 0
+        self.spilled: dict[tuple[int, str], _Entry] = {}
+        self.spilled_size = 0
+        self.spills = 0
+
+    def add(self, results: dict[str, Any], job_id: str, result: Any):
+        """
+        Tracks the result just posted in `results`, spills the least recently
+        used ones over the memory budget.
+        """
+        config = AtlasvibeConfig.get_instance()
+        size = result_size(result)
+        if size < config.result_spill_threshold and not (self.resident or self.spilled):
+            return  # nothing to track nor to forget, the usual case
+        key = (id(results), job_id)
+        with self.lock:
+            self._discard(key)
+            if size < max(config.result_spill_threshold, 1):
+                return
+            self.resident[key] = _Entry(results, job_id, result, size)
+            self.resident_size += size
+            victims: list[_Entry] = []
+            while self.resident and self.resident_size > config.result_memory_budget:
+                _, victim = self.resident.popitem(last=False)
+                self.resident_size -= victim.size
+                self.spilled[(id(victim.results), victim.job_id)] = victim
+                self.spilled_size += victim.size
+                victims.append(victim)
+        for victim in victims:
+            self.spill(victim)
+
+    def spill(self, entry: _Entry):
+        with self.spill_lock:
+            try:
+                spilled = _map_arrays(entry.result, self.write_array, entry.paths)
+            except Exception as e:
+                logger.warning(f"Couldn't spill the result of {entry.job_id}: {e}")
+                spilled = None
+            with self.job_locks.for_key(entry.job_id):
+                replaced = (
+                    spilled is not None
+                    and entry.results.get(entry.job_id) is entry.result
+                )
+                if replaced:
+                    entry.results[entry.job_id] = spilled
+            entry.result = None  # the mapped copy is in the job store now
+            with self.lock:
+                if entry.discarded:
+                    pass
+                elif replaced:
+                    self.spills += 1
+                    logger.debug(f"spilled {entry.size} bytes of {entry.job_id}")
+                    return
+                else:  # the result was replaced or released meanwhile
+                    self._discard((id(entry.results), entry.job_id))
+            remove_files(entry.paths)
+
+    def touch(self, results: dict[str, Any], job_id: str):
+        if not self.resident:
+            return
+        with self.lock:
+            key = (id(results), job_id)
+            if key in self.resident:
+                self.resident.move_to_end(key)
+
+    def discard(self, results: dict[str, Any], job_id: str):
+        """
+        Forgets the result, removed from the job store, and removes its files.
+        """
+        with self.lock:
+            self._discard((id(results), job_id))
+
+    def discard_all(self, results: dict[str, Any]):
+        with self.lock:
+            for key in [*self.resident, *self.spilled]:
+                if key[0] == id(results):
+                    self._discard(key)
+
+    def _discard(self, key: tuple[int, str]):
+        entry = self.resident.pop(key, None)
+        if entry is not None:
+            self.resident_size -= entry.size
+            return
+        entry = self.spilled.pop(key, None)
+        if entry is not None:
+            self.spilled_size -= entry.size
+            entry.discarded = True
+            remove_files(entry.paths)  # none yet if it is being written
+
+    def get_stats(self) -> dict[str, int]:
+        with self.lock:
+            return {
+                "resident": len(self.resident),
+                "resident_size": self.resident_size,
+                "spilled": len(self.spilled),
+                "spilled_size": self.spilled_size,
+                "spills": self.spills,
+            }
+
+    def get_directory(self) -> str:
+        if self.directory is None:
+            parent = AtlasvibeConfig.get_instance().result_spill_dir or os.path.join(
+                ATLASVIBE_CACHE_DIR, "spill"
+            )
+            os.makedirs(parent, exist_ok=True)
+            # one directory per process, removed when it exits
+            self.directory = tempfile.mkdtemp(prefix=f"{os.getpid()}-", dir=parent)
+            atexit.register(shutil.rmtree, self.directory, True)
+        return self.directory
+
+    def write_array(self, value: Any, paths: list[str]) -> Any:
+        path = os.path.join(self.get_directory(), uuid.uuid4().hex)
+        if isinstance(value, PandasDataFrame):
+            path += ".arrow"
+            paths.append(path)
+            table = pyarrow.Table.from_pandas(value)
+            with pyarrow.OSFile(path, "wb") as sink:
+                with pyarrow.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            mapped = pyarrow.ipc.open_file(pyarrow.memory_map(path)).read_all()
+            return mapped.to_pandas(split_blocks=True)
+        path += ".npy"
+        paths.append(path)
+        np.save(path, value, allow_pickle=False)
+        return np.load(path, mmap_mode="r")
+
+
+def remove_files(paths: list[str]):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass  # still mapped on Windows, removed with the directory
+
+
+def _is_spillable(value: Any) -> bool:
+    if isinstance(value, np.ndarray):
+        return (
+            not isinstance(value, np.memmap)
+            and value.base is None  # not a view of an array kept elsewhere
+            and value.dtype != object
+            and value.nbytes > 0
+        )
+    return pyarrow is not None and isinstance(value, PandasDataFrame)
+
+
+def result_size(value: Any) -> int:
+    # bytes of the arrays and DataFrames of a result that can be spilled
+    if isinstance(value, DataContainer):
+        if isinstance(value, Stateful) or value.type == "DataStream":
+            return 0
+        return sum(result_size(v) for v in value.values())
+    if isinstance(value, dict):
+        return sum(result_size(v) for v in value.values())
+    if not _is_spillable(value):
+        return 0
+    if isinstance(value, PandasDataFrame):
+        return int(value.memory_usage(index=True).sum())
+    return value.nbytes
+
+
+def _map_arrays(
+    value: Any, func: Callable[[Any, list[str]], Any], paths: list[str]
+) -> Any:
+    # the result with its spillable arrays replaced by `func(array, paths)`
+    if isinstance(value, DataContainer):
+        if isinstance(value, Stateful) or value.type == "DataStream":
+            return value
+        values = {k: _map_arrays(v, func, paths) for k, v in value.items()}
+        values.pop("type")
+        mapped = type(value).__new__(type(value))
+        DataContainer.__init__(mapped, type=value.type, **values)
+        return mapped
+    if isinstance(value, dict):
+        return {k: _map_arrays(v, func, paths) for k, v in value.items()}
+    if _is_spillable(value):
+        return func(value, paths)
+    return value
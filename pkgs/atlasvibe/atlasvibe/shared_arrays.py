@@ -0,0 +1,85 @@
+import io
+import pickle
+import sys
+from multiprocessing import shared_memory
+from typing import Any
+
+import numpy as np
+
+__all__ = ["dumps_shared", "loads_shared"]
+
+"""
+Pickle based transport used to move job results between processes.
+
+Large numpy arrays are copied once into a shared memory segment and only the
+segment handle travels through the pickle stream. The receiving side copies the
+array out and unlinks the segment, so each segment is consumed exactly once.
+"""
+
+SHARED_ARRAY_THRESHOLD = 1 << 20  # arrays of 1 MiB or more go through shared memory
+
+# On Windows a segment is destroyed as soon as its last handle is closed, so the
+# producer can't hand it over and exit; fall back to plain pickling there.
+SHARED_MEMORY_SUPPORTED = sys.platform != "win32"
+
+
+def _attach_shared_array(name: str, shape: tuple[int, ...], dtype: np.dtype[Any]):
+    segment = shared_memory.SharedMemory(name=name)
+    try:
+        array = np.ndarray(shape, dtype=dtype, buffer=segment.buf).copy()
+    finally:
+        segment.close()
+        segment.unlink()
+    return array
+
+
+class _SharedArrayPickler(pickle.Pickler):
+    def __init__(self, file: io.BytesIO, threshold: int):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.threshold = threshold
+        self.segments: list[shared_memory.SharedMemory] = []
+
+    def reducer_override(self, obj: Any):
+        if (
+            not isinstance(obj, np.ndarray)
+            or obj.dtype.hasobject
+            or obj.nbytes == 0
+            or obj.nbytes < self.threshold
+        ):
+            return NotImplemented
+        segment = shared_memory.SharedMemory(create=True, size=obj.nbytes)
+        self.segments.append(segment)
+        np.ndarray(obj.shape, dtype=obj.dtype, buffer=segment.buf)[...] = obj
+        return _attach_shared_array, (segment.name, obj.shape, obj.dtype)
+
+
+def dumps_shared(obj: Any, threshold: int = SHARED_ARRAY_THRESHOLD) -> bytes:
+    """
+    Serialize `obj`, moving every numpy array of at least `threshold` bytes
+    into shared memory. The payload must be passed to `loads_shared` exactly
+    once, otherwise the segments are only reclaimed when the interpreter exits.
+    """
+    buffer = io.BytesIO()
+    if not SHARED_MEMORY_SUPPORTED:
+        pickle.dump(obj, buffer, protocol=pickle.HIGHEST_PROTOCOL)
+        return buffer.getvalue()
+
+    pickler = _SharedArrayPickler(buffer, threshold)
+    try:
+        pickler.dump(obj)
+    except Exception:
+        for segment in pickler.segments:
+            segment.close()
+            segment.unlink()
+        raise
+    for segment in pickler.segments:
+        segment.close()
+    return buffer.getvalue()
+
+
+def loads_shared(payload: bytes) -> Any:
+    """
+    Deserialize a payload produced by `dumps_shared`, releasing the shared
+    memory segments it references.
+    """
+    return pickle.loads(payload)
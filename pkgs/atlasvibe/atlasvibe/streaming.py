@@ -0,0 +1,178 @@
+import threading
+from functools import partial
+from queue import Full, Queue
+from typing import Any, Callable, Iterable, Iterator
+
+import numpy as np
+from pandas import DataFrame as PandasDataFrame
+from pandas import concat
+
+from .data_container import DataContainer, ExtraType
+
+__all__ = ["DataStream", "DEFAULT_STREAM_BUFFER", "collect_streams"]
+
+"""
+Chunked dataflow between blocks.
+
+A `DataStream` is a lazy sequence of chunks (DataContainers of one type): it
+holds the function producing them, not the data. A block returns one instead of
+a whole container, e.g. `READ_CSV` with a `chunk_size`, and blocks declared with
+`@atlasvibe(streaming=True)` get it as is, iterate its chunks and usually return
+a stream themselves:
+
+    @atlasvibe(streaming=True)
+    def SCALE(default: OrderedPair, factor: float = 2) -> OrderedPair:
+        if isinstance(default, DataStream):
+            return default.map(lambda chunk: OrderedPair(x=chunk.x, y=chunk.y * factor))
+        return OrderedPair(x=default.x, y=default.y * factor)
+
+Nothing is read until a block consumes the chunks (a sink like `EXPORT_CSV`, or
+a reduction like `TMAX`), one chunk at a time, so the data never has to fit in
+memory. Every iteration runs the pipeline again from its source, so a stream
+can feed several blocks. Blocks that don't handle streams get the stream
+collected into one container. Between streaming blocks, the chunks are
+produced ahead in a thread with at most `stream_buffer` of them waiting (see
+`DataStream.buffered`), so the stages of a pipeline run concurrently in bounded
+memory.
+"""
+
+# chunks read ahead between two streaming blocks
+DEFAULT_STREAM_BUFFER = 4
+
+
+class DataStream(DataContainer):
+    __slots__ = ()
+
+    obj: Callable[[], Iterable[DataContainer]]
+
+    def __init__(  # type:ignore
+        self,
+        source: Callable[..., Iterable[DataContainer]],
+        *args: Any,
+        extra: ExtraType = None,
+        **kwargs: Any,
+    ):
+        """
+        `source(*args, **kwargs)` returns (or is a generator yielding) the chunks,
+        it is called again on every iteration of the stream.
+        """
+        super().__init__(
+            type="DataStream", obj=partial(source, *args, **kwargs), extra=extra
+        )
+
+    def chunks(self) -> Iterator[DataContainer]:
+        return iter(self.obj())
+
+    def map(self, func: Callable[[DataContainer], DataContainer]) -> "DataStream":
+        return DataStream(_map_chunks, self, func)
+
+    def buffered(self, size: int = DEFAULT_STREAM_BUFFER) -> "DataStream":
+        """
+        Same chunks, produced in a thread while they are consumed, at most
+        `size` of them waiting.
+        """
+        return DataStream(_read_ahead, self, size)
+
+    def first(self) -> DataContainer | None:
+        for chunk in self.chunks():
+            return chunk
+        return None
+
+    def collect(self) -> DataContainer:
+        """
+        The whole data as one container: the chunks concatenated.
+        """
+        return concat_chunks(self.chunks())
+
+
+def collect_streams(value: Any) -> Any:
+    # inputs of the blocks that don't handle streams, see `atlasvibe(streaming=...)`
+    if isinstance(value, DataStream):
+        return value.collect()
+    if isinstance(value, list):
+        return [collect_streams(item) for item in value]
+    return value
+
+
+def buffer_streams(value: Any, size: int) -> Any:
+    if isinstance(value, DataStream):
+        return value.buffered(size)
+    if isinstance(value, list):
+        return [buffer_streams(item, size) for item in value]
+    return value
+
+
+def concat_chunks(chunks: Iterable[DataContainer]) -> DataContainer:
+    """
+    Concatenates chunks of the same type along their first axis, the extra of
+    the first chunk is kept.
+    """
+    chunks = list(chunks)
+    if not chunks:
+        raise ValueError("Cannot collect an empty stream")
+    first = chunks[0]
+    values: dict[str, Any] = {}
+    for key in DataContainer.type_keys_map.get(first.type, []):
+        parts = [chunk[key] for chunk in chunks]
+        if isinstance(parts[0], PandasDataFrame):
+            values[key] = concat(parts, ignore_index=True)
+        elif isinstance(parts[0], np.ndarray):
+            values[key] = np.concatenate(parts)
+        else:
+            raise ValueError(f"Chunks of type {first.type} can't be concatenated")
+    if first.get("extra") is not None:
+        values["extra"] = first.extra
+    collected = type(first).__new__(type(first))
+    DataContainer.__init__(collected, type=first.type, **values)
+    return collected
+
+
+def _map_chunks(
+    stream: DataStream, func: Callable[[DataContainer], DataContainer]
+) -> Iterator[DataContainer]:
+    for chunk in stream.chunks():
+        yield func(chunk)
+
+
+class _StreamEnd:
+    def __init__(self, error: BaseException | None = None):
+        self.error = error
+
+
+def _put(queue: Queue[Any], item: Any, stop: threading.Event) -> bool:
+    # gives up when the consumer stopped iterating
+    while not stop.is_set():
+        try:
+            queue.put(item, timeout=0.1)
+            return True
+        except Full:
+            continue
+    return False
+
+
+def _read_ahead(stream: DataStream, size: int) -> Iterator[DataContainer]:
+    chunks: Queue[Any] = Queue(maxsize=max(size, 1))
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for chunk in stream.chunks():
+                if not _put(chunks, chunk, stop):
+                    return
+        except BaseException as e:
+            _put(chunks, _StreamEnd(e), stop)
+            return
+        _put(chunks, _StreamEnd(), stop)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = chunks.get()
+            if isinstance(item, _StreamEnd):
+                if item.error is not None:
+                    raise item.error
+                return
+            yield item
+    finally:
+        stop.set()
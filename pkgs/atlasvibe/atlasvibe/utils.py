@@ -30,6 +30,7 @@ __all__ = [
     "hf_hub_download",
     "snapshot_download",
     "clear_atlasvibe_memory",
+    "clear_jobset_memory",
 ]
 
 
@@ -90,12 +91,18 @@ def set_debug_off():
 
 
 def clear_atlasvibe_memory():
-    Dao.get_instance().clear_job_results()
-    Dao.get_instance().clear_small_memory()
-    Dao.get_instance().clear_node_init_containers()
+    Dao.get_instance().clear_namespaces()
     DeviceConnectionManager.clear()
 
 
+def clear_jobset_memory(jobset_id: str):
+    """
+    Frees the job results, small memory and init containers of one jobset.
+    Device connections are shared between jobsets and stay open.
+    """
+    Dao.get_instance().clear_namespace(jobset_id)
+
+
 class PlotlyJSONEncoder(_json.JSONEncoder):
     """
     Meant to be passed as the `cls` kwarg to json.dumps(obj, cls=..)
@@ -0,0 +1,62 @@
+import argparse
+import pickle
+import timeit
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from atlasvibe import DataContainer, DataFrame, OrderedPair, Scalar
+
+"""
+Measures the cost of creating and validating the data containers returned by
+blocks: small containers (`Scalar`, a short `OrderedPair`) created in hot loops,
+the generic `DataContainer` built from keyword arguments, attribute access and
+a pickle round trip (how results travel between processes). Array sizes are
+kept small so the container overhead dominates.
+
+    cd pkgs/atlasvibe && python -m benchmarks.data_container_bench --number 100000
+"""
+
+
+def make_cases() -> dict[str, Callable[[], object]]:
+    x = np.arange(16.0)
+    y = x * 2
+    frame = pd.DataFrame({"a": x})
+    pair = OrderedPair(x=x, y=y)
+    pickled = pickle.dumps(pair)
+
+    return {
+        "Scalar(c)": lambda: Scalar(c=1.5),
+        "Scalar(c).validate()": lambda: Scalar(c=1.5).validate(),
+        "OrderedPair(x, y)": lambda: OrderedPair(x=x, y=y),
+        "OrderedPair(x, y).validate()": lambda: OrderedPair(x=x, y=y).validate(),
+        "OrderedPair(list, list)": lambda: OrderedPair(x=[1, 2, 3], y=[4, 5, 6]),
+        "DataContainer(type, x, y)": lambda: DataContainer(
+            type="OrderedPair", x=x, y=y
+        ),
+        "DataFrame(df).validate()": lambda: DataFrame(df=frame).validate(),
+        "pair.x + pair.y access": lambda: (pair.x, pair.y, pair.type),
+        "pickle.loads(pair)": lambda: pickle.loads(pickled),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Construction and validation cost of data containers"
+    )
+    parser.add_argument(
+        "--number", type=int, default=100_000, help="calls timed per case"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="timings per case, the best is kept"
+    )
+    args = parser.parse_args()
+
+    for name, case in make_cases().items():
+        best = min(timeit.repeat(case, number=args.number, repeat=args.repeat))
+        print(f"{name:<30} {best / args.number * 1e6:8.2f} us")
+
+
+if __name__ == "__main__":
+    main()
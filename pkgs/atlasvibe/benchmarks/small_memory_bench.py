@@ -0,0 +1,106 @@
+import argparse
+import time
+from threading import Barrier, Thread
+from typing import Any, Callable
+
+import numpy as np
+
+from atlasvibe import JobService, SmallMemory
+
+"""
+Measures the contention on the `Dao` when many workers hit it at once.
+
+Each worker thread plays one node of a flowchart, calling the block body in a
+loop: a LOOP keeping its iteration state in a dict, a PID appending to an array
+of errors, a BATCH_PROCESSOR popping files off a list, all through
+`SmallMemory`, and a producer posting its result and handing it to two
+consumers. The throughput is printed for each number of workers.
+
+    cd pkgs/atlasvibe && python -m benchmarks.small_memory_bench --workers 1 16 32
+"""
+
+MEMORY_KEY = "bench-info"
+
+
+def loop_block(node_id: str, iteration: int):
+    data: dict[str, Any] = SmallMemory().read_memory(node_id, MEMORY_KEY) or {}
+    data["current_iteration"] = data.get("current_iteration", 0) + 1
+    data["is_finished"] = data["current_iteration"] >= 1000
+    SmallMemory().write_to_memory(node_id, MEMORY_KEY, data)
+
+
+def pid_block(node_id: str, iteration: int):
+    data = SmallMemory().read_memory(node_id, MEMORY_KEY)
+    errors = np.zeros(3) if data is None else data
+    SmallMemory().write_to_memory(node_id, MEMORY_KEY, np.append(errors[1:], 0.5))
+
+
+def batch_processor_block(node_id: str, iteration: int):
+    data: dict[str, Any] = SmallMemory().read_memory(node_id, MEMORY_KEY) or {}
+    files = data.get("files") or [f"file_{i}.csv" for i in range(64)]
+    files.pop()
+    SmallMemory().write_to_memory(node_id, MEMORY_KEY, {"files": files})
+
+
+def producer_block(node_id: str, iteration: int):
+    job_service = JobService()
+    job_service.post_job_result(node_id, iteration)
+    job_service.set_job_consumers(node_id, 2)
+    for _ in range(2):
+        job_service.get_job_result(node_id)
+        job_service.release_job_result(node_id)
+
+
+BLOCKS: list[Callable[[str, int], None]] = [
+    loop_block,
+    pid_block,
+    batch_processor_block,
+    producer_block,
+]
+
+
+def run(workers: int, iterations: int) -> float:
+    barrier = Barrier(workers + 1)
+
+    def worker(index: int):
+        block = BLOCKS[index % len(BLOCKS)]
+        node_id = f"{block.__name__}-{index}"
+        barrier.wait()
+        for i in range(iterations):
+            block(node_id, i)
+
+    threads = [Thread(target=worker, args=(i,)) for i in range(workers)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    JobService().reset()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Throughput of SmallMemory and job results under contention"
+    )
+    parser.add_argument(
+        "--workers", type=int, nargs="+", default=[1, 4, 16, 32], help="threads"
+    )
+    parser.add_argument(
+        "--iterations", type=int, default=20_000, help="block calls per worker"
+    )
+    args = parser.parse_args()
+
+    for workers in args.workers:
+        elapsed = run(workers, args.iterations)
+        calls = workers * args.iterations
+        print(
+            f"{workers:>3} workers {calls / elapsed:12.0f} calls/s"
+            f" {elapsed / calls * 1e6:8.2f} us/call"
+        )
+
+
+if __name__ == "__main__":
+    main()
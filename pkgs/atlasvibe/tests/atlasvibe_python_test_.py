@@ -13,3 +13,27 @@ def test_cache_huggingface_to_atlasvibe_decorator():
     assert os.environ.get("HF_HOME") == "test"
     assert test_func() == get_hf_hub_cache_path()
     assert os.environ.get("HF_HOME") == "test"
+
+
+def test_wrapper_reports_step_timings():
+    import numpy as np
+
+    from atlasvibe import OrderedPair, atlasvibe
+
+    @atlasvibe
+    def MAKE_PAIR(size: int = 1000) -> OrderedPair:
+        x = np.arange(size)
+        return OrderedPair(x=x, y=x * 2)
+
+    ctrls = {"size": {"param": "size", "value": 100_000, "type": "int"}}
+    response = MAKE_PAIR(
+        node_id="MAKE_PAIR",
+        job_id="MAKE_PAIR",
+        jobset_id="test",
+        observe_blocks=[],
+        ctrls=ctrls,
+        profile_memory=True,
+    )
+    assert response.profile["function_time"] > 0
+    assert {"fetch_time", "validation_time", "packaging_time"} <= set(response.profile)
+    assert response.profile["peak_memory"] >= 100_000 * 8
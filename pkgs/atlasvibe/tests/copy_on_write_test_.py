@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from atlasvibe import DataFrame, OrderedPair, writable
+from atlasvibe.copy_on_write import (
+    count_copies,
+    read_only_error_hint,
+    read_only_inputs,
+    writable_inputs,
+)
+
+
+def test_read_only_inputs_share_the_arrays():
+    x = np.arange(10.0)
+    pair = OrderedPair(x=x, y=x * 2)
+    frame = DataFrame(df=pd.DataFrame({"a": [1, 2]}))
+
+    shared_pair, [shared_frame] = [read_only_inputs(v) for v in [pair, [frame]]]
+    assert isinstance(shared_pair, OrderedPair)
+    assert np.shares_memory(shared_pair.x, x)
+    with pytest.raises(ValueError, match="read-only"):
+        shared_pair.y[0] = 1
+    # the source of the views stays writable
+    assert pair.y.flags.writeable
+
+    shared_frame.m["b"] = [3, 4]
+    assert list(frame.m.columns) == ["a"]
+
+
+def test_writable_copies_are_counted():
+    pair = read_only_inputs(OrderedPair(x=np.arange(10.0), y=np.arange(10.0)))
+    with count_copies() as copies:
+        y = writable(pair.y)
+        assert writable(y) is y
+        copied = writable_inputs(pair)
+    y += 1
+    copied.x += 1
+    assert copies.copies == 3
+    assert copies.copied_bytes == 3 * 10 * 8
+    np.testing.assert_array_equal(pair.y, np.arange(10.0))
+
+
+def test_copied_inputs_own_their_frames():
+    frame = DataFrame(df=pd.DataFrame({"a": [1.0, 2.0]}))
+    shared = read_only_inputs(frame)
+    with count_copies() as copies:
+        copied = writable_inputs(shared)
+    copied.m.iloc[0, 0] = 5.0
+    assert frame.m.iloc[0, 0] == 1.0
+    assert copies.copies == 1
+
+
+def test_only_numpy_read_only_errors_get_a_hint():
+    with pytest.raises(ValueError) as error:
+        read_only_inputs(OrderedPair(x=np.arange(3.0), y=np.arange(3.0))).y[0] = 1
+    assert "writable(array)" in read_only_error_hint(error.value)
+    assert read_only_error_hint(ValueError("can't open read-only file")) is None
@@ -0,0 +1,80 @@
+import socket
+import sys
+
+import numpy as np
+import pytest
+
+from atlasvibe import OrderedPair
+from atlasvibe.dao import Dao
+from atlasvibe.dao_server import DaoServer, RemoteDao
+from atlasvibe.node_init import NodeInitContainer
+
+pytestmark = pytest.mark.skipif(
+    sys.platform == "win32", reason="the job store server listens on a Unix socket"
+)
+
+
+@pytest.fixture
+def server(tmp_path):
+    server = DaoServer(str(tmp_path / "dao.sock"), Dao()).start()
+    yield server
+    server.shutdown()
+
+
+def test_job_results_are_shared_between_clients(server):
+    producer, consumer = RemoteDao(server.path), RemoteDao(server.path)
+    y = np.arange(2**18, dtype=float)  # 2 MiB, handed over through shared memory
+    producer.post_job_result("producer", OrderedPair(x=y, y=y * 2))
+    producer.set_job_consumers("producer", 1)
+
+    result = consumer.get_job_result("producer")
+    assert np.array_equal(result.y, y * 2)
+    consumer.release_job_result("producer")
+    assert not producer.job_exists("producer")
+
+    with pytest.raises(ValueError):
+        consumer.get_job_result("producer")
+
+
+def test_namespaces_and_small_memory(server):
+    client = RemoteDao(server.path)
+    for jobset_id in ["run_1", "run_2"]:
+        with client.use_namespace(jobset_id):
+            client.write_memory("node-state", {"type": "string"}, jobset_id)
+
+    with client.use_namespace("run_2"):
+        assert client.read_memory("node-state") == ({"type": "string"}, "run_2")
+    client.clear_namespace("run_2")
+    with client.use_namespace("run_2"):
+        assert client.read_memory("node-state") is None
+    with server.dao.use_namespace("run_1"):
+        assert server.dao.read_memory("node-state") == ({"type": "string"}, "run_1")
+
+
+def test_unpicklable_init_containers_stay_local(server):
+    client = RemoteDao(server.path)
+    client.set_init_container("shared", NodeInitContainer(3))
+    client.set_init_container("device", NodeInitContainer(lambda: None))
+
+    assert RemoteDao(server.path).get_init_container("shared").get() == 3
+    assert not RemoteDao(server.path).has_init_container("device")
+    assert client.has_init_container("device")
+
+
+def test_live_socket_is_not_taken_over(server, tmp_path):
+    with pytest.raises(OSError):
+        DaoServer(server.path)
+    client = RemoteDao(server.path)
+    client.write_memory("node-state", {"type": "string"}, "still served")
+    assert client.read_memory("node-state") == ({"type": "string"}, "still served")
+
+    # a socket file nobody listens on anymore is replaced
+    stale = str(tmp_path / "stale.sock")
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.bind(stale)
+    sock.close()
+    replacement = DaoServer(stale).start()
+    try:
+        assert not RemoteDao(stale).job_exists("producer")
+    finally:
+        replacement.shutdown()
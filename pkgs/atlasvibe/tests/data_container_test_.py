@@ -0,0 +1,36 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from atlasvibe import DataContainer, Image, OrderedPair, Scalar
+
+
+def test_dict_and_attribute_access():
+    pair = OrderedPair(x=[1, 2], y=[3, 4])
+    assert isinstance(pair, dict) and not hasattr(pair, "__dict__")
+    assert pair["x"] is pair.x and isinstance(pair.x, np.ndarray)
+    pair.y = [5, 6]
+    np.testing.assert_array_equal(pair["y"], [5, 6])
+    assert dict(**pair).keys() == {"type", "x", "y", "extra"}
+    assert getattr(pair, "t", None) is None
+    with pytest.raises(KeyError):
+        pair.t
+
+    copied = pickle.loads(pickle.dumps(pair))
+    assert isinstance(copied, OrderedPair)
+    np.testing.assert_array_equal(copied.x, pair.x)
+    assert Scalar(c=2).to_dict() == {"type": "Scalar", "c": 2, "extra": None}
+
+
+def test_validation():
+    OrderedPair(x=[1], y=[2]).validate()
+    Image(r=np.zeros(1), g=np.zeros(1), b=np.zeros(1)).validate()
+    with pytest.raises(KeyError, match='"y" key must be provided'):
+        DataContainer(type="OrderedPair", x=[1]).validate()
+    with pytest.raises(ValueError, match="can't have 'x' and 'm' keys together"):
+        DataContainer(type="OrderedPair", x=[1], y=[2], m=[3]).validate()
+    with pytest.raises(KeyError, match='Invalid key "t"'):
+        DataContainer(type="OrderedPair", x=[1], y=[2], t=[3]).validate()
+    with pytest.raises(ValueError, match='Did you mean: "Scalar"'):
+        DataContainer(type="Scalr", c=1).validate()
@@ -0,0 +1,132 @@
+from threading import Thread
+
+import numpy as np
+
+from atlasvibe import JobFailure, OrderedPair, SmallMemory, atlasvibe
+from atlasvibe.atlasvibe_python import fetch_inputs
+from atlasvibe.dao import Dao
+from atlasvibe.job_service import JobService
+from atlasvibe.utils import clear_jobset_memory
+
+
+def test_result_is_freed_after_its_last_consumer():
+    job_service = JobService()
+    job_service.post_job_result("producer", OrderedPair(x=np.arange(3), y=np.ones(3)))
+    job_service.set_job_consumers("producer", 2)
+
+    previous_jobs = [{"job_id": "producer", "input_name": "default", "edge": "default"}]
+    assert "default" in fetch_inputs(previous_jobs)
+    assert job_service.job_exists("producer")
+
+    assert "default" in fetch_inputs(previous_jobs)
+    assert not job_service.job_exists("producer")
+
+
+def test_missing_input_fails_without_releasing_it():
+    @atlasvibe
+    def ADD(a: OrderedPair, b: OrderedPair) -> OrderedPair:
+        return OrderedPair(x=a.x, y=a.y + b.y)
+
+    job_service = JobService()
+    job_service.post_job_result("empty", {})  # nothing to read
+    job_service.post_job_result("producer", OrderedPair(x=np.arange(3), y=np.ones(3)))
+    for job_id in ["empty", "producer"]:
+        job_service.set_job_consumers(job_id, 2)
+
+    response = ADD(
+        node_id="ADD",
+        job_id="ADD",
+        jobset_id="test",
+        observe_blocks=[],
+        previous_jobs=[
+            {"job_id": "empty", "input_name": "a", "edge": "default"},
+            {"job_id": "producer", "input_name": "b", "edge": "default"},
+        ],
+    )
+    assert isinstance(response, JobFailure)
+    # the other consumer of the missing input still gets it
+    assert job_service.dao.job_consumers["empty"] == 2
+    assert job_service.dao.job_consumers["producer"] == 1
+    for job_id in ["empty", "producer"]:
+        job_service.delete_job(job_id)
+
+
+def test_result_without_consumer_count_is_kept():
+    job_service = JobService()
+    job_service.post_job_result("pinned", OrderedPair(x=np.arange(3), y=np.ones(3)))
+    job_service.release_job_result("pinned")
+    assert job_service.job_exists("pinned")
+    job_service.delete_job("pinned")
+
+
+def test_jobsets_have_their_own_namespace():
+    job_service = JobService()
+    for jobset_id in ["bench_1", "bench_2"]:
+        with job_service.dao.use_namespace(jobset_id):
+            job_service.post_job_result("node", jobset_id)
+            SmallMemory().write_to_memory("node", "state", jobset_id)
+    assert not job_service.job_exists("node")
+
+    clear_jobset_memory("bench_1")
+    with job_service.dao.use_namespace("bench_1"):
+        assert not job_service.job_exists("node")
+    with job_service.dao.use_namespace("bench_2"):
+        assert job_service.get_job_result("node") == "bench_2"
+        assert SmallMemory().read_memory("node", "state") == "bench_2"
+    clear_jobset_memory("bench_2")
+
+
+def test_late_reads_dont_bring_back_a_cleared_namespace():
+    dao = Dao()
+    with dao.use_namespace("cancelled"):
+        dao.post_job_result("producer", 1)
+        dao.set_job_consumers("producer", 2)
+    dao.clear_namespace("cancelled")
+
+    with dao.use_namespace("cancelled"):
+        assert not dao.job_exists("producer")
+        dao.release_job_result("producer")
+        assert dao.read_memory("node-state") is None
+        assert not dao.has_init_container("node")
+    assert set(dao.namespaces) == {None}
+
+
+def test_sharing_missing_init_containers_creates_no_namespace():
+    dao = Dao()
+    dao.share_node_init_containers("prepared", "run")
+    assert set(dao.namespaces) == {None}
+
+    with dao.use_namespace("prepared"):
+        dao.set_init_container("node", 1)
+    dao.share_node_init_containers("prepared", "run")
+    with dao.use_namespace("run"):
+        assert dao.has_init_container("node")
+
+
+def test_small_memory_keeps_metadata_with_its_value():
+    memory = SmallMemory()
+    stop = False
+    seen: list[object] = []
+
+    def writer():
+        i = 0
+        while not stop:
+            value = {"i": i} if i % 2 else np.arange(3)
+            memory.write_to_memory("node", "state", value)
+            i += 1
+
+    thread = Thread(target=writer)
+    thread.start()
+    try:
+        for _ in range(2000):
+            seen.append(memory.read_memory("node", "state"))
+    finally:
+        stop = True
+        thread.join()
+    assert all(v is None or isinstance(v, (dict, np.ndarray)) for v in seen)
+
+    memory.write_to_memory("node", "flag", True)
+    assert memory.read_memory("node", "flag") is True
+    memory.delete_object("node", "state")
+    assert memory.read_memory("node", "state") is None
+    memory.clear_memory()
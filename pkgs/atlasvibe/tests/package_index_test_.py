@@ -0,0 +1,48 @@
+import importlib.metadata
+import sys
+
+import numpy as np
+
+from atlasvibe.package_index import PackageIndex
+
+
+def test_version_constraints():
+    index = PackageIndex()
+    assert index.get_version("NumPy") == np.__version__
+    assert index.satisfies("numpy")
+    assert index.satisfies("numpy", np.__version__)
+    assert index.satisfies("numpy", f">={np.__version__},<1000")
+    assert not index.satisfies("numpy", "<1")
+    assert not index.satisfies("numpy", "not a version")
+    assert index.satisfies("Python_Box")  # names are normalized
+    assert not index.satisfies("surely-not-installed-package")
+
+
+def test_index_is_rebuilt_only_when_stale(tmp_path, monkeypatch):
+    calls = []
+    distributions = importlib.metadata.distributions
+
+    def count_distributions():
+        calls.append(None)
+        return distributions()
+
+    monkeypatch.setattr(importlib.metadata, "distributions", count_distributions)
+    index = PackageIndex()
+    for _ in range(3):
+        index.get_version("numpy")
+    assert len(calls) == 1
+
+    index.invalidate()
+    index.get_version("numpy")
+    assert len(calls) == 2
+
+    # a new site-packages directory, or a package installed in one
+    monkeypatch.setattr(sys, "path", sys.path + [str(tmp_path)])
+    index.get_version("numpy")
+    assert len(calls) == 3
+    (tmp_path / "new_package-1.0.dist-info").mkdir()
+    (tmp_path / "new_package-1.0.dist-info" / "METADATA").write_text(
+        "Metadata-Version: 2.1\nName: new-package\nVersion: 1.0\n"
+    )
+    assert index.get_version("new_package") == "1.0"
+    assert len(calls) == 4
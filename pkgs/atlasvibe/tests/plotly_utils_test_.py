@@ -0,0 +1,85 @@
+import numpy as np
+import plotly.graph_objects as go
+
+from atlasvibe import Image, Matrix, OrderedPair, Plotly, Surface
+from atlasvibe.plotly_utils import (
+    data_container_to_plotly,
+    lttb_indices,
+    minmax_indices,
+    pyramid_downscale,
+)
+
+
+def test_lttb_keeps_spikes_and_ends():
+    y = np.zeros(100_000)
+    y[12_345] = 10.0
+    y[67_890] = -10.0
+    indices = lttb_indices(np.arange(len(y)), y, 1000)
+    assert len(indices) <= 1000
+    assert indices[0] == 0 and indices[-1] == len(y) - 1
+    assert 12_345 in indices and 67_890 in indices
+
+
+def test_minmax_keeps_extremes_of_each_column():
+    m = np.random.default_rng(0).normal(size=(10_000, 3))
+    indices = minmax_indices(m, 200)
+    assert indices.shape == (200, 3)
+    for column in range(3):
+        kept = m[indices[:, column], column]
+        assert kept.max() == m[:, column].max()
+        assert kept.min() == m[:, column].min()
+
+
+def test_pyramid_downscale_averages_pixels():
+    image = np.arange(16, dtype=np.float64).reshape(4, 4)
+    reduced, factor = pyramid_downscale(image, 4)
+    assert factor == 2
+    np.testing.assert_array_equal(reduced, [[2.5, 4.5], [10.5, 12.5]])
+
+
+def test_ordered_pair_is_reduced():
+    x = np.linspace(0, 10, 1_000_000)
+    fig = data_container_to_plotly(OrderedPair(x=x, y=np.sin(x)), max_points=2000)
+    assert fig is not None
+    trace = fig["data"][0]
+    assert 1000 < len(trace["y"]) <= 2000
+    assert trace["x"][0] == 0 and trace["x"][-1] == 10
+
+
+def test_zero_limit_keeps_full_resolution():
+    x = np.arange(10_000, dtype=np.float64)
+    fig = data_container_to_plotly(OrderedPair(x=x, y=x), max_points=0)
+    assert fig is not None
+    assert len(fig["data"][0]["y"]) == 10_000
+
+
+def test_matrix_image_and_surface_are_reduced():
+    fig = data_container_to_plotly(Matrix(m=np.ones((50_000, 2))), max_points=500)
+    assert fig is not None
+    assert all(len(trace["y"]) <= 500 for trace in fig["data"])
+
+    channel = np.zeros((1024, 1024), dtype=np.uint8)
+    fig = data_container_to_plotly(
+        Image(r=channel, g=channel, b=channel, a=None), max_pixels=256 * 256
+    )
+    assert fig is not None
+    assert fig["data"][0]["dx"] == 4 and fig["data"][0]["dy"] == 4
+
+    grid = np.arange(400)
+    z = np.ones((400, 400))
+    fig = data_container_to_plotly(Surface(x=grid, y=grid, z=z), max_pixels=100 * 100)
+    assert fig is not None
+    assert np.asarray(fig["data"][0]["z"]).shape == (100, 100)
+    assert len(fig["data"][0]["x"]) == 100
+
+
+def test_plotly_figure_traces_are_reduced():
+    x = np.arange(100_000)
+    figure = go.Figure(
+        data=[go.Scatter(x=x, y=np.sin(x / 1000), marker=dict(color=x), mode="lines")]
+    )
+    fig = data_container_to_plotly(Plotly(fig=figure), max_points=1000)
+    assert fig is not None
+    trace = fig["data"][0]
+    assert len(trace["y"]) <= 1000
+    assert len(trace["marker"]["color"]) == len(trace["y"])
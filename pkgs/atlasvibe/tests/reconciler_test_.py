@@ -76,3 +76,12 @@ class ReconcilerTestCase(unittest.TestCase):
         # function under test
         with self.assertRaises(IrreconcilableContainersException):
             rec_a, rec_b = r.reconcile(dc_a, dc_b)
+
+    def test_matrix_same_size_is_not_copied(self):
+        dc_a = DataContainer(type="Matrix", m=numpy.ones([3, 3]))
+        dc_b = DataContainer(type="Matrix", m=numpy.ones([2, 3]))
+
+        rec_a, rec_b = Reconciler().reconcile(dc_a, dc_b)
+
+        self.assertIs(rec_a, dc_a)
+        self.assertEqual(rec_b.m.shape, (3, 3))
@@ -0,0 +1,60 @@
+import os
+
+import numpy as np
+import pytest
+
+from atlasvibe import AtlasvibeConfig, OrderedPair, Scalar
+from atlasvibe.dao import Dao
+
+MIB = 2**20
+
+
+@pytest.fixture
+def dao(tmp_path):
+    config = AtlasvibeConfig.get_instance()
+    settings = (
+        config.result_spill_threshold,
+        config.result_memory_budget,
+        config.result_spill_dir,
+    )
+    config.result_spill_threshold = MIB
+    config.result_memory_budget = int(2.5 * MIB)
+    config.result_spill_dir = str(tmp_path)
+    dao = Dao()
+    yield dao
+    dao.clear_namespaces()
+    (
+        config.result_spill_threshold,
+        config.result_memory_budget,
+        config.result_spill_dir,
+    ) = settings
+
+
+def make_pair(value: float) -> OrderedPair:
+    y = np.full(MIB // 8, value)
+    return OrderedPair(x=np.arange(y.size, dtype=float), y=y)  # 2 MiB
+
+
+def test_least_recently_used_results_are_spilled(dao):
+    dao.post_job_result("small", Scalar(c=1))
+    dao.post_job_result("a", make_pair(1))
+    assert dao.result_spill.get_stats()["spills"] == 0
+    dao.post_job_result("b", make_pair(2))
+    dao.get_job_result("a")  # now b is the least recently used
+    dao.post_job_result("c", make_pair(3))
+
+    stats = dao.result_spill.get_stats()
+    assert stats["spills"] == 2 and stats["resident"] == 1
+    a, b, c = (dao.get_job_result(job_id) for job_id in "abc")
+    assert isinstance(b, OrderedPair) and isinstance(b.y, np.memmap)
+    assert not isinstance(c.y, np.memmap)
+    assert b.y[0] == 2 and a.y[-1] == 1
+    assert not b.y.flags.writeable
+    assert len(os.listdir(dao.result_spill.get_directory())) == 4
+
+    # the files go with their result
+    dao.set_job_consumers("b", 1)
+    dao.release_job_result("b")
+    dao.delete_job("a")
+    assert os.listdir(dao.result_spill.get_directory()) == []
+    assert dao.result_spill.get_stats()["spilled"] == 0
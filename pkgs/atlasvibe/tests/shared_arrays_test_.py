@@ -0,0 +1,33 @@
+import numpy as np
+
+from atlasvibe import OrderedPair
+from atlasvibe.shared_arrays import dumps_shared, loads_shared
+
+
+def test_small_values_roundtrip_through_pickle():
+    obj = {"a": np.arange(4), "b": "text", "c": [1, 2.5, None]}
+    restored = loads_shared(dumps_shared(obj))
+    assert restored["b"] == "text"
+    assert restored["c"] == [1, 2.5, None]
+    np.testing.assert_array_equal(restored["a"], obj["a"])
+
+
+def test_large_arrays_roundtrip_through_shared_memory():
+    x = np.linspace(0, 10, 500_000)
+    dc = OrderedPair(x=x, y=np.sin(x))
+    payload = dumps_shared({"job": dc}, threshold=1024)
+    # the arrays themselves are not part of the pickle stream
+    assert len(payload) < x.nbytes // 10
+
+    restored = loads_shared(payload)["job"]
+    assert restored.type == "OrderedPair"
+    np.testing.assert_array_equal(restored.x, x)
+    np.testing.assert_array_equal(restored.y, np.sin(x))
+
+
+def test_shared_array_keeps_shape_and_dtype():
+    m = np.arange(64 * 64, dtype=np.float32).reshape(64, 64).T  # non contiguous
+    restored = loads_shared(dumps_shared(m, threshold=1))
+    assert restored.dtype == np.float32
+    assert restored.shape == (64, 64)
+    np.testing.assert_array_equal(restored, m)
@@ -0,0 +1,73 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from atlasvibe import DataFrame, OrderedPair
+from atlasvibe.streaming import DataStream, collect_streams
+
+
+def pair_chunks(count: int, size: int = 4):
+    for i in range(count):
+        x = np.arange(i * size, (i + 1) * size, dtype=float)
+        yield OrderedPair(x=x, y=x * 2)
+
+
+def test_stream_is_lazy_and_reiterable():
+    calls = []
+
+    def source():
+        calls.append(None)
+        yield from pair_chunks(3)
+
+    stream = DataStream(source)
+    assert calls == []
+    doubled = stream.map(lambda chunk: OrderedPair(x=chunk.x, y=chunk.y * 2))
+    np.testing.assert_array_equal(doubled.collect().y, np.arange(12.0) * 4)
+    np.testing.assert_array_equal(stream.collect().x, np.arange(12.0))
+    assert len(calls) == 2
+    assert stream.first().type == "OrderedPair"
+
+
+def test_collect_streams():
+    frames = DataStream(
+        lambda: (DataFrame(df=pd.DataFrame({"a": [i, i + 1]})) for i in range(3))
+    )
+    collected = collect_streams([frames, 1])
+    assert isinstance(collected[0], DataFrame)
+    assert collected[0].m["a"].tolist() == [0, 1, 1, 2, 2, 3]
+    assert collected[1] == 1
+    with pytest.raises(ValueError):
+        DataStream(lambda: iter([])).collect()
+
+
+def test_buffered_stream_reads_ahead_in_bounds():
+    produced = []
+    started = threading.Event()
+
+    def source():
+        for chunk in pair_chunks(100):
+            produced.append(chunk)
+            started.set()
+            yield chunk
+
+    chunks = DataStream(source).buffered(2).chunks()
+    assert next(chunks).x[0] == 0
+    started.wait(1)
+    # the consumed chunk, the ones waiting in the buffer and the one blocked on it
+    assert len(produced) <= 4
+    chunks.close()
+
+    np.testing.assert_array_equal(
+        DataStream(pair_chunks, 10).buffered(3).collect().x, np.arange(40.0)
+    )
+
+
+def test_buffered_stream_raises_the_source_error():
+    def failing():
+        yield from pair_chunks(2)
+        raise RuntimeError("broken file")
+
+    with pytest.raises(RuntimeError, match="broken file"):
+        DataStream(failing).buffered(1).collect()